@@ -1,4 +1,17 @@
-from .ai_rpg import AIRPG
-from .config import AIRPGConfig
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .ai_rpg import AIRPG
+    from .config import AIRPGConfig
 
 __all__ = ["AIRPG", "AIRPGConfig"]
+
+# Module of each public name, imported on first access so e.g. loading the config doesn't pay for LLM clients
+_LAZY_IMPORTS = {"AIRPG": ".ai_rpg", "AIRPGConfig": ".config"}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
@@ -1,249 +1,1097 @@
-from datetime import datetime
-from typing import Any, Dict, List
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from council.llm import LLMFunction, LLMFunctionResponse, LLMMessage, LLMMessageRole, YAMLBlockResponseParser
-from pydantic import Field
+from council.contexts import Consumption
+from council.llm import LLMBase, LLMFunction, LLMFunctionResponse, LLMMessage, LLMParsingException, LLMResponse
 
+from .budget import CompletionEstimate, PromptBudget, get_cost_card
+from .call_policy import LatencyTracker, LLMCallPolicy
+from .concurrency import RequestLimiter, ServerBusyError
 from .config import AIRPGConfig
-from .dice import DiceRoller
-from .generators import generate_inventory, generate_story, generate_world
-from .ui import start_game_ui
-from .utils import get_llm_function, get_prompt, read_generation, save_generation
+from .dice import DiceRoller, DifficultyOdds, analyze_difficulty
+from .generators import generate_inventory, generate_starting_message, generate_story, generate_world
+from .generators.cache import GenerationCache
+from .generators.digest import generate_digest
+from .generators.localization import localize_setup
+from .generators.pool import GameBundle, take_bundle
+from .history import HistoryCompressor
+from .inventory import Inventory, InventoryError
+from .journal import (
+    SAVES_PATH,
+    ResumedState,
+    SessionJournal,
+    export_game_state,
+    load_resumed_state,
+    read_turns_before,
+    turn_messages,
+)
+from .llm_client import LLMStream
+from .memory import RETRIEVED_SETUP_NOTE, MemoryChunk, MemoryIndex, chunk_text, format_memories, memory_path
+from .prompts import Prompt, PromptTemplate, get_prompt_registry
+from .response import AIRPGResponse, AIRPGResponseStreamParser, InventoryChange
+from .session import DEFAULT_SESSION_ID, SessionManager
+from .speculation import Speculation, SpeculationStats, Speculator, response_cost
+from .telemetry import Telemetry, TurnTrace, add_consumptions
+from .tokens import count_tokens, load_tokenizer, tokens_exact, truncate_to_tokens
+from .turn import TurnResult
+from .usage import Admission, UsageLimiter, UsageQuota
+from .utils import (
+    configure_llm_logging,
+    format_language_instructions,
+    get_fallback_llm,
+    get_llm_function,
+    get_llm_with_logging,
+    get_prompt,
+    read_generation,
+    stream_with_logging,
+)
 
 
-class InventoryChange(YAMLBlockResponseParser):
-    """Single change to an item in the player's inventory."""
+class GameSession:
+    """
+    State of a single player's game: inventory, dice roller, accumulated cost and history summary.
+    World, story and starting inventory are shared read-only with the parent AIRPG instance.
+    """
 
-    _name_description = "\n".join(
-        [
-            "Name of the item to change.",
-            "Make sure it's a valid item name, especially if you're responding in a language other than English.",
-        ]
-    )
-    name: str = Field(..., description=_name_description)
-    amount: int = Field(..., description="Change amount, e.g. +1, -5 etc.")
+    COMMANDS = {"/inventory", "/odds", "/budget", "/save", "/export"}
 
+    def __init__(self, game: "AIRPG", session_id: str):
+        self.game = game
+        self.session_id = session_id
+        self.total_cost = 0.0
+        self.prompt_tokens = 0  # prompt tokens billed at the full price
+        self.cached_prompt_tokens = 0  # prompt tokens read from the provider's prefix cache
+        self.completion_tokens = 0
+        self.parse_failures = 0  # game master responses that couldn't be parsed
+        self.inventory_anomalies = 0  # game master responses with inventory changes the player can't make
+        self.dice_roller = DiceRoller.from_config(game.config.difficulty, session_id)
+        self.inventory: Inventory = Inventory(game.starting_inventory, game.item_names)
 
-class AIRPGResponse(YAMLBlockResponseParser):
-    """AI's response to a player's action."""
+        self.call_policy = game.load_call_policy(
+            on_consumptions=self.track_consumptions, response_parser=self.parse_response
+        )
+        self._cost_lock = threading.Lock()  # late hedged responses are tracked from other threads
+        self.history = game.load_history_compressor(on_llm_response=self._on_history_summary)
+        self._history_summary_consumptions: List[Consumption] = []
+        self._journal: Optional[SessionJournal] = None
+        self.summarized_turns = 0  # game turns covered by the history summary, saved with snapshots
+        self._resumed_summarized_turns = 0  # turns summarized before the game was resumed, not in the UI history
+        self.memory = game.load_memory()
+        self.resumed = False  # continues a saved game
+        # chat history of front-ends that don't keep their own, starting like the UI's
+        self.transcript: List[Dict[str, Any]] = [{"role": "assistant", "content": game.starting_message}]
+        self._play_lock = threading.Lock()  # turns of the session are played one at a time, whatever their front-end
+        self._turn_start_cost = 0.0
+        self._pre_roll: Optional[int] = None  # roll of the next turn, rolled ahead for speculated turns
+        self._speculation: Optional[Speculation] = None
+        self.speculation_stats: SpeculationStats = SpeculationStats()
+        self.completion_estimate = CompletionEstimate(game.config.prompt_budget.expected_completion_tokens)
+        self.budget: Optional[PromptBudget] = None  # of the latest turn's prompt
+        self.quota: Optional[UsageQuota] = (
+            game.usage_limiter.session_quota() if game.usage_limiter is not None else None
+        )
 
-    _reasoning_description = "\n".join(
-        [
-            "Your reasoning about the current situation, player action and dice roll.",
-            "It's private and will be not shown to the user.",
-        ]
-    )
-    _message_description = "\n".join(
-        [
-            "Message,",
-            "that will be shown to the user.",
-        ]
-    )
+    def track_cost(self, llm_response: LLMFunctionResponse) -> None:
+        """Accumulate token cost and prompt cache usage from the LLM response if this information is available."""
+        self.track_consumptions(llm_response.consumptions)
 
-    reasoning: str = Field(..., description=_reasoning_description)
-    inventory_changes: List[InventoryChange] = Field(..., description="List of inventory changes.")
-    message: str = Field(..., description=_message_description)
+    def track_consumptions(self, consumptions: Sequence[Consumption]) -> None:
+        """Accumulate token cost and prompt cache usage of an LLM call, and charge them to the usage budgets."""
 
+        tokens, cost = 0, 0.0
+        with self._cost_lock:
+            for consumption in consumptions:
+                if consumption.kind.endswith(":total_tokens_cost"):
+                    self.total_cost += consumption.value
+                    cost += consumption.value
+                elif consumption.kind.endswith(":cache_read_prompt_tokens"):
+                    self.cached_prompt_tokens += int(consumption.value)
+                    tokens += int(consumption.value)
+                elif consumption.kind.endswith(":prompt_tokens"):
+                    self.prompt_tokens += int(consumption.value)
+                    tokens += int(consumption.value)
+                elif consumption.kind.endswith(":completion_tokens"):
+                    self.completion_tokens += int(consumption.value)
+                    tokens += int(consumption.value)
+        if self.quota is not None and self.game.usage_limiter is not None:
+            self.game.usage_limiter.charge(self.quota, tokens, cost)
 
-class Inventory:
-    """Manages the player's in-game inventory."""
+    def _on_history_summary(self, llm_response: LLMFunctionResponse) -> None:
+        self.track_cost(llm_response)
+        self._history_summary_consumptions.extend(llm_response.consumptions)
 
-    def __init__(self, items: Dict[str, int]):
-        self._items = items.copy()
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of prompt tokens served from the provider's prefix cache."""
+        total_prompt_tokens = self.prompt_tokens + self.cached_prompt_tokens
+        return self.cached_prompt_tokens / total_prompt_tokens if total_prompt_tokens else 0.0
 
     @property
-    def items(self) -> Dict[str, int]:
-        return self._items
+    def turns(self) -> int:
+        """Number of turns played, including those before the game was resumed."""
+        return self._journal.turns if self._journal is not None else 0
+
+    @property
+    def journal(self) -> SessionJournal:
+        """Journal of the session, created with the first turn so sessions that never play leave no files."""
+
+        if self._journal is None:
+            header = {
+                "world_description": self.game.world_description,
+                "story": self.game.story,
+                "starting_inventory": self.game.starting_inventory,
+                "starting_message": self.game.starting_message,
+                "language": self.game.config.language,
+                "item_names": self.game.item_names,
+            }
+            self._journal = SessionJournal.create(self.session_id, header, self.game.config.saves, self.game.saves_path)
+            if self.memory is not None:
+                self.memory.path = memory_path(self._journal.path)
+        return self._journal
+
+    def restore(self, state: ResumedState) -> None:
+        """Continue a saved game: restore its inventory, cost and history summary, and keep appending to its journal."""
+
+        self.inventory = Inventory(state.inventory, self.game.item_names)
+        self.total_cost = state.total_cost
+        self.history.summary = state.history_summary
+        self.summarized_turns = self._resumed_summarized_turns = state.summarized_turns
+        self.transcript = turn_messages(state.tail) or self.transcript
+        self.resumed = True
+        self._journal = SessionJournal(
+            state.path, self.game.config.saves, turns=state.turns, turns_since_snapshot=state.turns_since_snapshot
+        )
+        self.memory = self.game.load_memory(state)
+
+    def close(self) -> None:
+        """Force the journal to disk and close it once the session is dropped, turns still in flight reopen it."""
+
+        if self._journal is not None:
+            self._journal.close()
+
+    def _append_snapshot(self) -> None:
+        self.journal.append_snapshot(self.inventory.items, self.total_cost, self.history.summary, self.summarized_turns)
+
+    def save_game_state(self) -> str:
+        """Snapshot the session state into its journal and force it to disk."""
+
+        self._append_snapshot()
+        self.journal.save()
+
+        lines = [
+            f"Game state saved to {self.journal.filename}!",
+            f"Total cost: ${self.total_cost:.4f}",
+            f"Prompt cache hit rate: {self.cache_hit_rate:.0%}",
+        ]
+        if self.game.speculator is not None:
+            stats = self.speculation_stats
+            lines.append(
+                f"Speculated turns hit rate: {stats.hit_rate:.0%} of {stats.hits + stats.misses} turns, "
+                f"${stats.wasted_cost:.4f} spent on unused ones"
+            )
+        return "\n".join(lines)
+
+    def export_game_state(self) -> str:
+        """Save, compact the journal and export it into a full YAML game state."""
+
+        self.save_game_state()
+        self.journal.compact()
+        filename = export_game_state(self.journal.path, prefix=f"game_state_{self.session_id[:8]}_")
+        return f"Game state exported to {filename}!"
+
+    def parse_response(self, llm_response: LLMResponse) -> AIRPGResponse:
+        """
+        Parse a game master response with inventory changes resolved to the player's items.
+        Changes the player can't make are sent back to the game master to correct.
+        """
+
+        try:
+            response = AIRPGResponse.from_response(llm_response)
+        except LLMParsingException:
+            self.parse_failures += 1
+            raise
+        try:
+            inventory_changes = self.inventory.validate(response.inventory_changes)
+        except InventoryError as e:
+            self.inventory_anomalies += 1
+            raise LLMParsingException(f"{e}. Only use items from the current inventory.") from e
+        return response.model_copy(update={"inventory_changes": inventory_changes})
+
+    def apply_inventory_changes(self, changes: List[InventoryChange]) -> List[InventoryChange]:
+        """Apply changes to the inventory, an invalid batch (e.g. a streamed one) is dropped as a whole."""
+
+        try:
+            return self.inventory.update(changes)
+        except InventoryError as e:
+            self.inventory_anomalies += 1
+            print(f"Ignoring inventory changes of session {self.session_id[:8]}: {e}")
+            return []
+
+    def run_command(self, message: str) -> Optional[str]:
+        """Handle `/` commands, returns None if the message is a regular action."""
+
+        if message == "/inventory":
+            return self.inventory.format()
+        elif message == "/odds":
+            return self.game.difficulty_odds.format()
+        elif message == "/budget":
+            budget = self.budget.format() if self.budget is not None else "No turn has been played yet."
+            return "\n".join([budget, self.quota.format()]) if self.quota is not None else budget
+        elif message == "/save":
+            return self.save_game_state()
+        elif message == "/export":
+            return self.export_game_state()
+        return None
+
+    def finish_turn(
+        self, trace: TurnTrace, message: str, roll: int, llm_response: str, inventory_changes: List[InventoryChange]
+    ) -> TurnResult:
+        """Record the turn into telemetry and the journal."""
+
+        result = TurnResult(
+            action=message,
+            message=llm_response,
+            roll=roll,
+            inventory_changes=inventory_changes,
+            cost=self.total_cost - self._turn_start_cost,
+            total_cost=self.total_cost,
+            projected_cost=self.budget.projected_cost if self.budget is not None else None,
+        )
+        response = result.format()
+        with trace.span("journal"):
+            self.journal.append_turn(message, roll, response, inventory_changes, self.total_cost)
+            if self.memory is not None:
+                self.memory.add_turn(message, response)
+            if self.journal.snapshot_due:
+                self._append_snapshot()
+        self.game.record_turn(trace)
+        return result
+
+    def recall(self, message: str, history: List[Dict[str, Any]]) -> str:
+        """Passages relevant to the action and the scene it happens in, leaving out turns already sent verbatim."""
+
+        assert self.memory is not None
+        scene = next((m["content"] for m in reversed(history) if m["role"] == "assistant"), "")
+        chunks = self.memory.search(
+            f"{scene}\n{message}",
+            top_k=self.game.config.memory.top_k,
+            before_turn=self.memory.turns - self.game.config.history.verbatim_turns,
+        )
+        return format_memories(chunks, self.game.config.memory.max_tokens)
+
+    def history_messages(self, history: List[Dict[str, Any]], trace: TurnTrace) -> List[LLMMessage]:
+        """The history for the game master, bounded by summarizing older turns."""
+
+        with trace.span("history") as span:
+            messages = self.history.to_messages(history)
+            if self._history_summary_consumptions:  # the summary was refreshed
+                add_consumptions(span, self._history_summary_consumptions)
+                self._history_summary_consumptions = []
+                self.summarized_turns = self._resumed_summarized_turns + sum(
+                    1
+                    for m in history[: self.history.summarized_messages]
+                    if m["role"] == "user" and m["content"] not in self.COMMANDS
+                )
+            elif not self.history.summary:  # the summary was reset, e.g. because the history was edited
+                self.summarized_turns = self._resumed_summarized_turns = 0
+        return messages
+
+    def action_messages(
+        self, message: str, history: List[Dict[str, Any]], roll: int, trace: TurnTrace
+    ) -> List[LLMMessage]:
+        """Passages relevant to the action if any, and the action with the roll and inventory."""
+
+        messages = []
+        if self.memory is not None:
+            with trace.span("memory"):
+                memories = self.recall(message, history)
+            if memories:
+                messages.append(LLMMessage.user_message(memories))
+
+        with trace.span("prompt"):
+            action = truncate_to_tokens(message, self.game.config.prompt_budget.action_max_tokens)
+            messages.append(
+                LLMMessage.user_message(
+                    self.game.user_prompt_template.format(inventory=self.inventory.format(), roll=roll, action=action)
+                )
+            )
+        return messages
+
+    def take_roll(self) -> int:
+        """Roll the dice for a turn, or take the roll made ahead for speculated turns."""
+
+        roll, self._pre_roll = self._pre_roll, None
+        return roll if roll is not None else self.dice_roller.roll_dice()
+
+    def prepare_turn(
+        self, message: str, history: List[Dict[str, Any]], trace: TurnTrace, degraded: bool = False
+    ) -> Tuple[int, List[LLMMessage]]:
+        """Roll the dice and build the messages for the game master, with a shorter history for degraded turns."""
+
+        self._turn_start_cost = self.total_cost
+        messages = self.history_messages(history, trace)
+        if degraded:
+            messages = self.history.shorten(messages, self.game.config.usage_limits.degraded_history_turns)
+        roll = self.take_roll()
+        action_messages = self.action_messages(message, history, roll, trace)
+        self.budget = self.count_budget(messages, action_messages)
+        return roll, messages + action_messages
+
+    def count_budget(self, history_messages: List[LLMMessage], action_messages: List[LLMMessage]) -> PromptBudget:
+        """Tokens of each section of the prompt with the projected cost of the turn."""
+
+        return PromptBudget(
+            sections={
+                **self.game.system_prompt_tokens,
+                "history": sum(count_tokens(m.content) for m in history_messages),
+                "memories": sum(count_tokens(m.content) for m in action_messages[:-1]),
+                "action": count_tokens(action_messages[-1].content),
+            },
+            completion_tokens=self.completion_estimate.tokens,
+            cost_card=get_cost_card(),
+            exact=tokens_exact(),
+        )
+
+    def check_usage(self) -> Admission:
+        """How the next turn may be played within the usage budgets, without counting it."""
+
+        if self.quota is None or self.game.usage_limiter is None:
+            return Admission()
+        return self.game.usage_limiter.check(self.quota)
+
+    def admit(self) -> Admission:
+        """How the next turn may be played within the usage budgets."""
+
+        if self.quota is None or self.game.usage_limiter is None:
+            return Admission()
+        admission = self.game.usage_limiter.admit(self.quota)
+        if admission.refusal is not None:
+            print(f"Refused a turn of session {self.session_id[:8]}: {admission.refusal}")
+        return admission
+
+    def without_commands(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The history without the `/` commands and their output, which don't change the game."""
+
+        kept: List[Dict[str, Any]] = []
+        in_command = False
+        for message in history:
+            if message["role"] == "user":
+                in_command = message["content"] in self.COMMANDS
+            if not in_command:
+                kept.append(message)
+        return kept
+
+    def speculate(self, history: List[Dict[str, Any]]) -> None:
+        """Generate likely next turns while the player thinks, `history` ends with the latest response."""
+
+        speculator = self.game.speculator
+        if speculator is None or not speculator.can_speculate(self):
+            return
+        if self._pre_roll is None:
+            self._pre_roll = self.dice_roller.roll_dice()
+        self._speculation = speculator.start(self, history, self._pre_roll)
+
+    def take_speculated_turn(
+        self, message: str, history: List[Dict[str, Any]]
+    ) -> Optional[Tuple[int, LLMFunctionResponse[AIRPGResponse], TurnTrace]]:
+        """The roll and game master response speculated for the action, None if it has to be played."""
+
+        speculation, self._speculation = self._speculation, None
+        if speculation is None or self.game.speculator is None:
+            return None
+        speculated = self.game.speculator.resolve(self, speculation, message, history)
+        if speculated is None:
+            return None
+
+        llm_response, self.budget, waited = speculated
+        trace = TurnTrace(self.session_id)
+        # the speculated calls were charged as they returned, the one taken is part of this turn's cost
+        self._turn_start_cost = self.total_cost - response_cost(llm_response)
+        self.completion_estimate.observe(llm_response.consumptions)
+        trace.add_span("speculation", waited, llm_response.consumptions)
+        return self.take_roll(), llm_response, trace
+
+    def play_turn(
+        self,
+        message: str,
+        history: List[Dict[str, Any]],
+        cancelled: Optional[threading.Event] = None,
+        admission: Optional[Admission] = None,
+    ) -> Optional[TurnResult]:
+        """
+        The main game loop function.
+        Processes the user's action, obtains the AI's response, and updates the inventory accordingly.
+
+        If `cancelled` is set by the time the response arrives (e.g. the request timed out), the turn is discarded
+        and None is returned. Turns over the usage budgets are refused with a message like commands,
+        those close to them use the fallback model and a shorter history.
+        """
+
+        command_response = self.run_command(message)
+        if command_response is not None:
+            return TurnResult(action=message, message=command_response, total_cost=self.total_cost)
+        admission = admission or self.admit()
+        if admission.refusal is not None:
+            return TurnResult(action=message, message=admission.refusal, total_cost=self.total_cost)
+
+        speculated = self.take_speculated_turn(message, history)
+        if speculated is not None:
+            roll, llm_response, trace = speculated
+        else:
+            trace = TurnTrace(self.session_id)
+            roll, messages = self.prepare_turn(message, history, trace, degraded=admission.degraded)
+
+            start = time.perf_counter()
+            outcome = self.call_policy.execute(messages, prefer_fallback=admission.degraded)
+            llm_response = outcome.llm_response
+            self.completion_estimate.observe(llm_response.consumptions)
+            # the LLM function parses (and self-corrects) responses itself, so parsing is the time outside LLM calls,
+            # including the logging middleware and waiting for hedged requests
+            llm_span = trace.add_span("llm", llm_response.duration, llm_response.consumptions)
+            llm_span.hedges, llm_span.fallbacks = int(outcome.hedged), int(outcome.fell_back)
+            trace.add_span("parse", max(time.perf_counter() - start - llm_response.duration, 0.0))
+
+        if cancelled is not None and cancelled.is_set():
+            return None
+        response = llm_response.response
+        with trace.span("inventory"):
+            inventory_changes = self.apply_inventory_changes(response.inventory_changes)
+
+        result = self.finish_turn(trace, message, roll, response.message, inventory_changes)
+        self.speculate(
+            [*history, {"role": "user", "content": message}, {"role": "assistant", "content": result.format()}]
+        )
+        return result
+
+    def game_loop(
+        self, message: str, history: List[Dict[str, Any]], cancelled: Optional[threading.Event] = None
+    ) -> str:
+        """`play_turn` formatted for a chat with the given history, empty if the turn was discarded."""
+
+        with self._play_lock:
+            result = self.play_turn(message, history, cancelled)
+        return result.format() if result is not None else ""
+
+    def play(self, message: str, cancelled: Optional[threading.Event] = None) -> Optional[TurnResult]:
+        """
+        `play_turn` for front-ends that don't keep a chat history of their own, like the terminal and the HTTP API.
+        The session keeps it instead.
+        """
+
+        with self._play_lock:
+            result = self.play_turn(message, self.transcript, cancelled)
+            if result is not None:
+                self.transcript.extend(
+                    [{"role": "user", "content": message}, {"role": "assistant", "content": result.format()}]
+                )
+            return result
 
-    def update(self, changes: List[InventoryChange]) -> None:
-        """Update the inventory items based on the list of InventoryChange objects."""
-        for inventory_change in changes:
-            if inventory_change.name not in self.items:
-                self.items[inventory_change.name] = 0
-            self.items[inventory_change.name] += inventory_change.amount
+    def game_loop_stream(
+        self, message: str, history: List[Dict[str, Any]], cancelled: Optional[threading.Event] = None
+    ) -> Iterator[str]:
+        """
+        Streaming version of `game_loop`, yields the response as it grows.
 
-    def format(self) -> str:
-        """String representation of the inventory contents."""
+        The message is shown as soon as the game master starts writing it, reasoning is never shown.
+        Inventory changes are applied once their block is complete. A stream that fails or can't be parsed
+        before changing the inventory is played again without streaming, with self-corrections and the fallback model.
+        Like in `play_turn`, the turn is discarded once `cancelled` is set.
+        The turn holds the session until the stream is exhausted or closed.
+        """
 
-        if not self.items:
-            return "Inventory is empty."
-        return "\n".join(["Inventory content:", *[f"- {item}: {amount}" for item, amount in self._items.items()]])
+        with self._play_lock:
+            yield from self._stream_turn(message, history, cancelled)
 
-    @staticmethod
-    def format_changes(changes: List[InventoryChange]) -> str:
-        """Format a sequence of inventory changes as a string."""
+    def _stream_turn(
+        self, message: str, history: List[Dict[str, Any]], cancelled: Optional[threading.Event]
+    ) -> Iterator[str]:
+        command_response = self.run_command(message)
+        if command_response is not None:
+            yield command_response
+            return
+        admission = self.admit()
+        if not admission.full:
+            # refused, or degraded to the fallback model which isn't streamed
+            result = self.play_turn(message, history, cancelled, admission)
+            yield result.format() if result is not None else ""
+            return
 
-        if not changes:
-            return ""
-        return "\n".join(
-            [
-                "Your inventory has changed:",
-                *[f"- {change.name}: {change.amount:+d}" for change in changes],
-            ]
+        speculated = self.take_speculated_turn(message, history)
+        if speculated is not None:
+            roll, llm_response, trace = speculated
+            if cancelled is not None and cancelled.is_set():
+                return
+            with trace.span("inventory"):
+                speculated_changes = self.apply_inventory_changes(llm_response.response.inventory_changes)
+            yield self._finish_streamed_turn(
+                trace, message, history, roll, llm_response.response.message, speculated_changes
+            )
+            return
+
+        trace = TurnTrace(self.session_id)
+        roll, messages = self.prepare_turn(message, history, trace)
+        roll_line = f"You roll {roll}."
+        yield roll_line
+
+        parser = AIRPGResponseStreamParser()
+        inventory_updated = False
+        inventory_changes: List[InventoryChange] = []
+        shown_message = ""
+        consumptions: Sequence[Consumption] = []
+        hedged = False
+        stream_error: Optional[Exception] = None
+        start = time.perf_counter()
+        parse_duration, inventory_duration = 0.0, 0.0
+        try:
+            streamed = self.call_policy.stream(messages)
+            hedged = streamed.hedged
+            for delta in streamed.stream:
+                parse_start = time.perf_counter()
+                parser.feed(delta)
+                parse_duration += time.perf_counter() - parse_start
+                if parser.inventory_changes is not None and not inventory_updated:
+                    if cancelled is not None and cancelled.is_set():
+                        return
+                    inventory_start = time.perf_counter()
+                    inventory_changes = self.apply_inventory_changes(parser.inventory_changes)
+                    inventory_duration = time.perf_counter() - inventory_start
+                    inventory_updated = True
+                if parser.message != shown_message:
+                    shown_message = parser.message
+                    yield f"{roll_line}\n{shown_message}"
+            consumptions = streamed.stream.consumptions
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            if inventory_updated:
+                raise
+            stream_error = e
+        # time spent by the UI consuming yielded updates is counted as waiting for the LLM
+        llm_span = trace.add_span(
+            "llm", time.perf_counter() - start - parse_duration - inventory_duration, consumptions
         )
+        llm_span.hedges = int(hedged)
+        self.completion_estimate.observe(consumptions)
+
+        response: Optional[AIRPGResponse] = None
+        parse_start = time.perf_counter()
+        if stream_error is None:
+            try:
+                response = parser.finish()
+            except LLMParsingException:
+                self.parse_failures += 1
+        trace.add_span("parse", parse_duration + time.perf_counter() - parse_start)
+
+        if response is None and inventory_updated:
+            # the inventory has changed already, keep the message as it was shown
+            trace.add_span("inventory", inventory_duration)
+            yield self._finish_streamed_turn(trace, message, history, roll, shown_message, inventory_changes)
+            return
+        if response is None:
+            if stream_error is not None:
+                print(
+                    f"Streamed response of session {self.session_id[:8]} failed, retrying without streaming: "
+                    f"{stream_error!r}"
+                )
+            # nothing has been applied yet, retry with the self-correcting non-streaming call
+            outcome = self.call_policy.execute(messages)
+            llm_response = outcome.llm_response
+            llm_span.duration += llm_response.duration
+            llm_span.retries += 1
+            llm_span.hedges += int(outcome.hedged)
+            llm_span.fallbacks = int(outcome.fell_back)
+            add_consumptions(llm_span, llm_response.consumptions)
+            response = llm_response.response
+
+        if cancelled is not None and cancelled.is_set():
+            return
+        if not inventory_updated:
+            with trace.span("inventory"):
+                inventory_changes = self.apply_inventory_changes(response.inventory_changes)
+        else:
+            trace.add_span("inventory", inventory_duration)
+        yield self._finish_streamed_turn(trace, message, history, roll, response.message, inventory_changes)
+
+    def _finish_streamed_turn(
+        self,
+        trace: TurnTrace,
+        message: str,
+        history: List[Dict[str, Any]],
+        roll: int,
+        llm_response: str,
+        inventory_changes: List[InventoryChange],
+    ) -> str:
+        response = self.finish_turn(trace, message, roll, llm_response, inventory_changes).format()
+        self.speculate([*history, {"role": "user", "content": message}, {"role": "assistant", "content": response}])
+        return response
 
 
 class AIRPG:
     """
-    The main AI RPG class which ties together world/story generation, inventory management,
-    and the interactive game loop.
+    The main AI RPG class which ties together world/story generation and per-player game sessions.
+    World, story and starting inventory are generated once and shared by all sessions.
     """
 
     MAIN_PROMPT_FILENAME = "ai-game-master.yaml"
-    STARTING_MESSAGE_PROMPT_FILENAME = "starting-message.yaml"
+    HISTORY_SUMMARY_PROMPT_FILENAME = "history-summary.yaml"
+    EARLIER_TURNS_PAGE_SIZE = 10
 
-    def __init__(self, game_config: AIRPGConfig):
-        """Initialize the AI RPG with a given configuration."""
+    def __init__(self, game_config: AIRPGConfig, resume_from: Optional[str] = None, saves_path: str = SAVES_PATH):
+        """
+        Initialize the AI RPG with a given configuration.
+        Sessions save their games into `saves_path`, the saves directory by default.
+        If `resume_from` is a journal filename from `saves_path` (or a path), the game continues from it instead.
+        """
 
         self.config = game_config
-        self.user_prompt_template = self._load_user_prompt_template()
-        self.total_cost = 0.0
-        self.language_instructions = f"- Respond in {self.config.language}" if self.config.language is not None else ""
-        self.dice_roller = DiceRoller(
-            num_dice=self.config.difficulty.number_of_dice,
-            aggregation=self.config.difficulty.dice_combine_method,
+        self.saves_path = saves_path
+        # before anything is generated, so generators log their calls too
+        self.llm_log_writer = configure_llm_logging(self.config.llm_logging)
+        if self.config.prompts.hot_reload:
+            get_prompt_registry().watch(self.config.prompts.reload_interval)
+        self.language_instructions = format_language_instructions(self.config.language)
+        # at startup from data/tokenizers, so turns never wait for the tokenizer
+        load_tokenizer()
+
+        self.generation_cache = GenerationCache(self.config.cache) if self.config.cache.enabled else None
+        self._prompt_setup: Optional[Tuple[str, str]] = None  # set while loading a bundle, reused from there
+        self.resumed_state = load_resumed_state(os.path.join(self.saves_path, resume_from)) if resume_from else None
+        if self.resumed_state is not None:
+            header = self.resumed_state.header
+            print(f"Resuming {resume_from} after {self.resumed_state.turns} turns")
+            self.world_description = header["world_description"]
+            self.story = header["story"]
+            self.starting_inventory = header["starting_inventory"]
+            self.starting_message = header["starting_message"]
+            self.item_names: Dict[str, str] = header.get("item_names", {})
+        else:
+            bundle = take_bundle(self.config.language) if self.config.generation.use_pool else None
+            if bundle is None:
+                bundle = self._load_bundle()
+            if self.generation_cache is not None:
+                print(f"Generation cache: {self.generation_cache.stats()}")
+            self.world_description = bundle.world_description
+            self.story = bundle.story
+            self.starting_inventory = bundle.starting_inventory
+            self.item_names = {}
+            if self.localizes:
+                assert self.config.language is not None
+                # translated once per language, so the game master doesn't translate the setup every turn
+                localized = localize_setup(
+                    self.world_description,
+                    self.story,
+                    self.starting_inventory,
+                    self.config.language,
+                    source=self.config.generation.story if not self.config.generation.use_pool else None,
+                )
+                self.world_description, self.story = localized.world_description, localized.story
+                self.starting_inventory, self.item_names = localized.starting_inventory, localized.item_names
+                self._prompt_setup = None  # prepared from the translated setup instead
+            self.starting_message = "\n\n".join([bundle.starting_message, Inventory(self.starting_inventory).format()])
+
+        # world and story as sent to the game master, digested and capped to their token budgets
+        self.prompt_world_description, self.prompt_story = self._prompt_setup or self._prepare_prompt_setup(
+            self.world_description, self.story
+        )
+        self.setup_memory_chunks = self._chunk_setup()
+        self._main_system_prompt: Optional[Tuple[Prompt, str]] = None
+        self._system_prompt_tokens: Optional[Tuple[str, Dict[str, int]]] = None
+        self.request_limiter = RequestLimiter(self.config.concurrency)
+        self.llm_latencies = LatencyTracker()
+        # each turn in flight can wait for two game master requests at once when hedging
+        self.hedge_executor = (
+            ThreadPoolExecutor(max_workers=2 * self.config.concurrency.max_in_flight, thread_name_prefix="ai-rpg-hedge")
+            if self.config.llm_calls.hedging
+            else None
+        )
+        self.speculator = Speculator(self.config.speculation) if self.config.speculation.enabled else None
+        self.usage_limiter = UsageLimiter(self.config.usage_limits) if self.config.usage_limits.enabled else None
+        self._unclaimed_resumed_state = self.resumed_state
+        self._resume_lock = threading.Lock()
+        self.sessions: SessionManager[GameSession] = SessionManager(
+            factory=self._create_session, config=self.config.sessions, on_evict=GameSession.close
+        )
+        self.telemetry = (
+            Telemetry(
+                self.config.telemetry,
+                gauges={
+                    "ai_rpg_sessions": lambda: len(self.sessions),
+                    "ai_rpg_pending_requests": lambda: self.request_limiter.pending,
+                    **self._llm_log_gauges(),
+                    **self._speculation_gauges(),
+                    **self._usage_gauges(),
+                },
+            )
+            if self.config.telemetry.enabled
+            else None
         )
 
-        self.world_description = self._load_world()
-        self.story = self._load_story()
-        self.starting_inventory = self._load_inventory()
-        self.inventory = Inventory(self.starting_inventory)
+    def _llm_log_gauges(self) -> Dict[str, Callable[[], float]]:
+        writer = self.llm_log_writer
+        if writer is None:
+            return {}
+        return {
+            "ai_rpg_llm_log_queued_records": lambda: writer.queued,
+            "ai_rpg_llm_log_sampled_out_records": lambda: writer.sampled_out,
+            "ai_rpg_llm_log_dropped_records": lambda: writer.dropped,
+        }
 
-        self.game_loop_llm_func = self._load_main_llm_function()
-        self.starting_message_llm_func = self._load_starting_message_llm_function()
+    def _speculation_gauges(self) -> Dict[str, Callable[[], float]]:
+        if self.speculator is None:
+            return {}
+        stats = self.speculator.stats
+        return {
+            "ai_rpg_speculation_hits": lambda: stats.hits,
+            "ai_rpg_speculation_misses": lambda: stats.misses,
+            "ai_rpg_speculation_hit_rate": lambda: stats.hit_rate,
+            "ai_rpg_speculation_wasted_cost_dollars": lambda: stats.wasted_cost,
+        }
+
+    def _usage_gauges(self) -> Dict[str, Callable[[], float]]:
+        if self.usage_limiter is None:
+            return {}
+        limiter = self.usage_limiter
+        gauges: Dict[str, Callable[[], float]] = {
+            "ai_rpg_degraded_turns": lambda: limiter.degraded_turns,
+            "ai_rpg_refused_turns": lambda: limiter.refused_turns,
+        }
+        tokens, dollars = limiter.global_quota.tokens, limiter.global_quota.dollars
+        if tokens is not None:
+            gauges["ai_rpg_tokens_left_this_minute"] = lambda: tokens.level
+        if dollars is not None:
+            gauges["ai_rpg_dollars_left_today"] = lambda: dollars.level
+        return gauges
+
+    def _create_session(self, session_id: str) -> GameSession:
+        """Create a session, the first one created after resuming a game continues it."""
+
+        session = GameSession(self, session_id)
+        # sessions are built concurrently, only one of them can take the resumed game
+        with self._resume_lock:
+            resumed_state, self._unclaimed_resumed_state = self._unclaimed_resumed_state, None
+        if resumed_state is not None:
+            session.restore(resumed_state)
+        return session
+
+    @functools.cached_property
+    def difficulty_odds(self) -> DifficultyOdds:
+        """Odds of each band of the dice legend, computed once on the first `/odds` command."""
+        return analyze_difficulty(self.config.difficulty)
+
+    def greeting_messages(self, session_id: str = DEFAULT_SESSION_ID) -> List[Dict[str, str]]:
+        """
+        Messages the chat of a session starts with: the latest turns of the resumed game in the session continuing it,
+        the starting message in the others.
+        """
+        return list(self.sessions.get(session_id).transcript)
+
+    def load_earlier_turns(self, offset: int, shown: str, session_id: str = DEFAULT_SESSION_ID) -> Tuple[str, int]:
+        """Page in turns of a resumed game recorded before `offset`, prepending them to the `shown` ones."""
+
+        assert self.resumed_state is not None
+        if not self.sessions.get(session_id).resumed:
+            return shown or "Earlier turns belong to the player continuing the saved game.", offset
+        turns, offset = read_turns_before(self.resumed_state.path, offset, self.EARLIER_TURNS_PAGE_SIZE)
+        if not turns:
+            return shown or "No earlier turns.", offset
+        page = "\n\n".join(f"**> {turn['action']}**\n\n{turn['response']}" for turn in turns)
+        return "\n\n".join(part for part in [page, shown] if part), offset
+
+    def _load_bundle(self) -> GameBundle:
+        """
+        Load or generate the world, story, starting inventory and the starting message.
+        Starting inventory and message only depend on the story, so they are prepared at the same time.
+        """
+
+        world_description = self._load_world()
+        story = self._load_story(world_description)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            inventory_future = executor.submit(self._load_inventory, story)
+            generation = self.config.generation
+            # a translated setup is prepared for the prompt once it's translated
+            self._prompt_setup = (
+                self._prepare_prompt_setup(
+                    world_description,
+                    story,
+                    world_source=(
+                        generation.world if generation.world is not None and generation.world.endswith(".md") else None
+                    ),
+                    story_source=generation.story,
+                )
+                if not self.localizes
+                else None
+            )
+            starting_message_future = executor.submit(
+                generate_starting_message,
+                *(self._prompt_setup or (world_description, story)),
+                self.language_instructions,
+                self.generation_cache,
+            )
+            return GameBundle(
+                world_description=world_description,
+                story=story,
+                starting_inventory=inventory_future.result(),
+                starting_message=starting_message_future.result(),
+                language=self.config.language,
+            )
+
+    @property
+    def localizes(self) -> bool:
+        """Whether the setup is translated into the configured language before the game starts."""
+        return self.config.language is not None and self.config.localize
 
     def _load_world(self) -> str:
         """Load or generate the world description."""
         if self.config.generation.world is not None and self.config.generation.world.endswith(".md"):
             return read_generation(self.config.generation.world)
 
-        return generate_world(self.config.generation.world or "")
+        return generate_world(self.config.generation.world or "", cache=self.generation_cache)
 
-    def _load_story(self) -> str:
+    def _load_story(self, world_description: str) -> str:
         """Load or generate the story based on the world description."""
         if self.config.generation.story is not None:
             return read_generation(self.config.generation.story)
 
-        return generate_story(self.world_description)
+        return generate_story(world_description, cache=self.generation_cache)
 
-    def _load_inventory(self) -> Dict[str, int]:
+    def _load_inventory(self, story: str) -> Dict[str, int]:
         """Load or generate the character's starting inventory based on the story."""
         if self.config.generation.starting_inventory is not None:
             return read_generation(self.config.generation.starting_inventory)
 
-        return generate_inventory(self.story)
+        return generate_inventory(story, cache=self.generation_cache)
+
+    @property
+    def main_system_prompt(self) -> str:
+        """
+        The game master system prompt, formatted again only once its prompt file is reloaded.
+
+        It only depends on the game setup, so it's byte-identical across turns and sessions
+        and can be served from the provider's prefix cache. Per-turn state goes into the user message.
+        Same setup gives a byte-identical prompt, so resumed games hit the prefix cache too.
+        """
+
+        prompt = get_prompt(self.MAIN_PROMPT_FILENAME)
+        if self._main_system_prompt is None or self._main_system_prompt[0] is not prompt:
+            self._main_system_prompt = (prompt, self._format_main_system_prompt(prompt))
+        return self._main_system_prompt[1]
+
+    def _system_prompt_setup(self) -> Tuple[str, str]:
+        """World and story sent in the system prompt, or a note that their passages come with each turn."""
 
-    def _load_main_llm_function(self) -> LLMFunction[AIRPGResponse]:
-        """Prepare the main LLM function for the game loop interactions."""
+        if not self.config.memory.enabled or self.config.memory.setup_in_system_prompt:
+            return self.prompt_world_description, self.prompt_story
+        return RETRIEVED_SETUP_NOTE, RETRIEVED_SETUP_NOTE
 
-        return get_llm_function(
-            prompt_filename=self.MAIN_PROMPT_FILENAME,
-            response_parser=AIRPGResponse.from_response,
+    def _format_main_system_prompt(self, prompt: Prompt) -> str:
+        world_description, story = self._system_prompt_setup()
+        return prompt.system.format(
             dice_legend=self.config.difficulty.dice_legend,
-            world_description=self.world_description,
-            story=self.story,
-            inventory=self.inventory.format(),
+            world_description=world_description,
+            story=story,
             language_instructions=self.language_instructions,
             response_template=AIRPGResponse.to_response_template(),
         )
 
-    def _load_starting_message_llm_function(self) -> LLMFunction[str]:
-        """Prepare an LLM function to generate the starting message for the game."""
+    @property
+    def system_prompt_tokens(self) -> Dict[str, int]:
+        """Tokens of the world, story and the rest of the game master system prompt, counted once per prompt."""
 
-        return get_llm_function(
-            prompt_filename=self.STARTING_MESSAGE_PROMPT_FILENAME,
-            world_description=self.world_description,
-            story=self.story,
-            inventory=self.inventory.format(),
-            language_instructions=self.language_instructions,
-        )
+        system_prompt = self.main_system_prompt
+        if self._system_prompt_tokens is None or self._system_prompt_tokens[0] is not system_prompt:
+            world_description, story = self._system_prompt_setup()
+            world_tokens, story_tokens = count_tokens(world_description), count_tokens(story)
+            sections = {
+                "world": world_tokens,
+                "story": story_tokens,
+                "instructions": count_tokens(system_prompt) - world_tokens - story_tokens,
+            }
+            self._system_prompt_tokens = (system_prompt, sections)
+        return self._system_prompt_tokens[1]
 
-    def _load_user_prompt_template(self) -> str:
-        """Load the user prompt template from a YAML-based prompt config file."""
-        prompt = get_prompt(self.MAIN_PROMPT_FILENAME)
-        return prompt.get_user_prompt_template("default")  # pylint: disable=no-member
+    def _prepare_prompt_setup(
+        self,
+        world_description: str,
+        story: str,
+        world_source: Optional[str] = None,
+        story_source: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """
+        World and story as sent to the game master: replaced by their digests if enabled, and capped.
+        Sources are the generation files they were read from, their digests are cached next to them.
+        """
 
-    @staticmethod
-    def _history_to_messages(history: List[Dict[str, Any]]) -> List[LLMMessage]:
-        """Convert a Gradio-style chat history into a list of LLMMessage objects."""
-        return [LLMMessage(role=LLMMessageRole(m["role"]), content=m["content"]) for m in history]
+        budget = self.config.prompt_budget
+        texts = []
+        for kind, text, source, max_tokens in [
+            ("world", world_description, world_source, budget.world_max_tokens),
+            ("story", story, story_source, budget.story_max_tokens),
+        ]:
+            if budget.digest and count_tokens(text) > budget.digest_max_tokens:
+                text = generate_digest(text, kind, budget.digest_max_tokens, source)
+            capped_text = truncate_to_tokens(text, max_tokens)
+            if capped_text != text:
+                print(f"The {kind} is longer than {max_tokens} tokens, only its beginning is sent to the game master")
+            texts.append(capped_text)
+        return texts[0], texts[1]
 
-    def generate_starting_message(self) -> str:
-        """Generate the first greeting/intro message for the player."""
-        llm_response = self.starting_message_llm_func.execute_with_llm_response()
-        self.track_cost(llm_response)
-        return llm_response.response
+    def _chunk_setup(self) -> List[MemoryChunk]:
+        """World and story passages to retrieve from, when they're not sent in full with every turn."""
 
-    def track_cost(self, llm_response: LLMFunctionResponse) -> None:
-        """Accumulate token cost from the LLM response into self.total_cost if this information is available."""
+        if not self.config.memory.enabled or self.config.memory.setup_in_system_prompt:
+            return []
+        return [
+            MemoryChunk.from_text(text)
+            for source in (self.world_description, self.story)
+            for text in chunk_text(source, self.config.memory.chunk_tokens)
+        ]
 
-        for consumption in llm_response.consumptions:
-            if consumption.kind.endswith("total_tokens_cost"):
-                self.total_cost += consumption.value
-                return
+    def load_memory(self, state: Optional[ResumedState] = None) -> Optional[MemoryIndex]:
+        """Memory index of a session seeded with the world and story passages, with the turns of the resumed game if any."""
 
-    def save_game_state(self, history: List[Dict[str, Any]]) -> str:
-        """Save the current game state into a YAML file."""
+        if not self.config.memory.enabled:
+            return None
+        if state is None:
+            return MemoryIndex(self.setup_memory_chunks)
+        return MemoryIndex.load(
+            memory_path(state.path), self.setup_memory_chunks, journal_path=state.path, journal_turns=state.turns
+        )
 
-        game_state = {
-            "timestamp": datetime.now().isoformat(),
-            "total_cost": self.total_cost,
-            "world_description": self.world_description,
-            "story": self.story,
-            "starting_inventory": self.starting_inventory,
-            "history": [{"role": message["role"], "content": message["content"]} for message in history],
-        }
+    def load_main_llm_function(
+        self,
+        llm: Optional[LLMBase] = None,
+        response_parser: Callable[[LLMResponse], AIRPGResponse] = AIRPGResponse.from_response,
+    ) -> LLMFunction[AIRPGResponse]:
+        """Prepare the main LLM function for the game loop interactions, with the shared LLM by default."""
 
-        filename = save_generation(content=game_state, prefix="game_state_")
+        return LLMFunction(
+            llm=get_llm_with_logging(self.MAIN_PROMPT_FILENAME[:-5], llm),  # remove .yaml
+            response_parser=response_parser,
+            system_message=self.main_system_prompt,
+            max_retries=self.config.llm_calls.max_retries,
+        )
 
-        return f"Game state saved to {filename}!\nTotal cost: ${self.total_cost:.4f}"
+    def load_call_policy(
+        self,
+        on_consumptions: Callable[[Sequence[Consumption]], None],
+        response_parser: Callable[[LLMResponse], AIRPGResponse] = AIRPGResponse.from_response,
+    ) -> LLMCallPolicy[AIRPGResponse]:
+        """Prepare the retry, fallback and hedging policy for the game master calls of a session."""
 
-    @staticmethod
-    def format_response(roll: int, llm_response: str, inventory_changes: List[InventoryChange]) -> str:
-        """Format the final text response for the user, including dice roll info and inventory changes."""
+        fallback_llm = get_fallback_llm()
+        return LLMCallPolicy(
+            config=self.config.llm_calls,
+            llm_function_factory=functools.partial(self.load_main_llm_function, response_parser=response_parser),
+            fallback_llm_function_factory=(
+                functools.partial(self.load_main_llm_function, fallback_llm, response_parser)
+                if fallback_llm is not None
+                else None
+            ),
+            on_consumptions=on_consumptions,
+            latencies=self.llm_latencies,
+            executor=self.hedge_executor,
+            stream_factory=self.stream_main_llm,
+        )
 
-        response_parts = [f"You roll {roll}.", llm_response, ""]
+    def stream_main_llm(self, messages: Sequence[LLMMessage]) -> LLMStream:
+        """Stream a game master response from the shared LLM, logged like the calls of its LLM function."""
+        return stream_with_logging(
+            self.MAIN_PROMPT_FILENAME[:-5], [LLMMessage.system_message(self.main_system_prompt), *messages]
+        )
 
-        if inventory_changes:
-            response_parts.append(Inventory.format_changes(inventory_changes))
+    @property
+    def user_prompt_template(self) -> PromptTemplate:
+        """Game master user prompt template, precompiled by the prompt registry."""
+        return get_prompt(self.MAIN_PROMPT_FILENAME).user_template()
 
-        return "\n".join(response_parts)
+    @property
+    def history_summary_prompt_template(self) -> PromptTemplate:
+        """User prompt template for history summarization, precompiled by the prompt registry."""
+        return get_prompt(self.HISTORY_SUMMARY_PROMPT_FILENAME).user_template()
 
-    def game_loop(self, message: str, history: List[Dict[str, Any]]) -> str:
-        """
-        The main game loop function.
-        Processes the user's action, obtains the AI's response, and updates the inventory accordingly.
+    def load_history_compressor(self, on_llm_response: Callable[[LLMFunctionResponse], None]) -> HistoryCompressor:
+        """Prepare the history compressor that keeps the game loop context of a session bounded."""
+        return HistoryCompressor(
+            config=self.config.history,
+            summary_llm_func=get_llm_function(prompt_filename=self.HISTORY_SUMMARY_PROMPT_FILENAME),
+            summary_user_prompt_template=self.history_summary_prompt_template,
+            on_llm_response=on_llm_response,
+        )
 
-        Compatible with Gradio's ChatInterface signature.
-        """
+    def record_turn(self, trace: TurnTrace) -> None:
+        if self.telemetry is not None:
+            self.telemetry.record(trace)
 
-        if message == "/inventory":
-            return self.inventory.format()
-        elif message == "/save":
-            return self.save_game_state(history)
+    def game_loop(self, message: str, history: List[Dict[str, Any]], session_id: str = DEFAULT_SESSION_ID) -> str:
+        """
+        Route the player's action to the game loop of their session.
 
-        messages = self._history_to_messages(history)
+        Compatible with Gradio's ChatInterface signature, see `with_session_id` for passing the session id.
+        """
+        return self.sessions.get(session_id).game_loop(message, history)
 
-        roll = self.dice_roller.roll_dice()
-        user_message = LLMMessage.user_message(self.user_prompt_template.format(roll=roll, action=message))
-        messages.append(user_message)
+    async def game_loop_stream(
+        self, message: str, history: List[Dict[str, Any]], session_id: str = DEFAULT_SESSION_ID
+    ) -> AsyncIterator[str]:
+        """
+        Streaming version of `agame_loop`, for Gradio's ChatInterface to show the response as it's written.
+        The turn holds a slot of the shared worker pool until it's complete, each update must come within the timeout.
+        """
+        session = self.sessions.get(session_id)
+        try:
+            async for update in self.request_limiter.stream(
+                functools.partial(session.game_loop_stream, message, history), session_id
+            ):
+                yield update
+        except ServerBusyError:
+            yield "The game master is busy with other players right now. Please try again in a moment."
+        except asyncio.TimeoutError:
+            yield "The game master took too long to respond. Please try again."
 
-        llm_response = self.game_loop_llm_func.execute_with_llm_response(messages=messages)
-        response = llm_response.response
+    async def agame_loop(
+        self, message: str, history: List[Dict[str, Any]], session_id: str = DEFAULT_SESSION_ID
+    ) -> str:
+        """
+        Async version of `game_loop` that Gradio can await directly.
 
-        self.inventory.update(response.inventory_changes)
-        self.track_cost(llm_response)
+        The blocking LLM work runs in a bounded worker pool shared by all sessions,
+        with a queue limit and a per-request timeout from the concurrency config.
+        """
+        session = self.sessions.get(session_id)
+        try:
+            return await self.request_limiter.run(functools.partial(session.game_loop, message, history), session_id)
+        except ServerBusyError:
+            return "The game master is busy with other players right now. Please try again in a moment."
+        except asyncio.TimeoutError:
+            return "The game master took too long to respond. Please try again."
 
-        return self.format_response(roll, response.message, response.inventory_changes)
+    async def aplay(self, session: GameSession, message: str) -> Optional[TurnResult]:
+        """
+        Play a turn of a session through the shared worker pool, for front-ends without a chat history of their own.
+        Raises ServerBusyError or asyncio.TimeoutError when the game master can't take the turn.
+        """
+        return await self.request_limiter.run(functools.partial(session.play, message), session.session_id)
 
     def run(self):
         """
         Entry point for running the entire game in a Gradio UI loop.
-        Generates the starting message and then calls the Gradio UI function to begin interactive play.
+        Calls the Gradio UI function with the starting message to begin interactive play.
         """
 
-        print("Generating the starting message...")
-        starting_message = self.generate_starting_message()
+        # imported here so headless uses of the game never load Gradio, which is slow to import
+        from .ui import start_game_ui, with_session_id  # pylint: disable=import-outside-toplevel
 
+        if self.telemetry is not None:
+            self.telemetry.start_server()
         print("Running the UI...")
-        start_game_ui(self.game_loop, greeting_message=starting_message)
+        game_loop = self.game_loop_stream if self.config.streaming else self.agame_loop
+        start_game_ui(
+            with_session_id(game_loop),
+            greeting_messages=self.greeting_messages,
+            concurrency_limit=self.config.concurrency.max_in_flight + self.config.concurrency.max_queued,
+            earlier_turns_pager=self.load_earlier_turns if self.resumed_state is not None else None,
+            earlier_turns_offset=self.resumed_state.tail_offset if self.resumed_state is not None else 0,
+        )
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import uuid
+from http import HTTPStatus
+from typing import Any, Dict, Tuple, Union
+
+from .ai_rpg import AIRPG, GameSession
+from .concurrency import ServerBusyError
+
+Body = Union[Dict[str, Any], str]
+
+# Largest request body accepted, actions are short
+MAX_BODY_SIZE = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class GameAPI:
+    """
+    Minimal HTTP/JSON API over the game engine, served with asyncio streams (HTTP/1.1 with keep-alive).
+
+    - `POST /sessions`: start a session, returns its id and the messages the game starts with
+    - `POST /sessions/{id}/turns` with `{"action": "..."}`: play a turn or a command, returns its structured result
+    - `GET /sessions/{id}`: inventory, cost and number of turns of a session
+    - `GET /metrics`: Prometheus metrics, if telemetry is enabled
+    - `GET /health`: liveness check for load balancers
+
+    Turns run through the game's request limiter, so a full queue answers 503 and a slow game master 504.
+    """
+
+    def __init__(self, game: AIRPG):
+        self.game = game
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Body]:
+        parts = path.strip("/").split("/")
+        if method == "GET" and parts == ["health"]:
+            return HTTPStatus.OK, {"status": "ok", "sessions": len(self.game.sessions)}
+        if method == "GET" and parts == ["metrics"] and self.game.telemetry is not None:
+            return HTTPStatus.OK, self.game.telemetry.format_metrics()
+        if method == "POST" and parts == ["sessions"]:
+            session_id = uuid.uuid4().hex
+            # building a session may resume a saved game or load its memory, so it's kept off the event loop
+            session = await asyncio.get_running_loop().run_in_executor(None, self.game.sessions.get, session_id)
+            return HTTPStatus.CREATED, {"session_id": session_id, "messages": session.transcript}
+        if len(parts) >= 2 and parts[0] == "sessions":
+            found = self.game.sessions.find(parts[1])
+            if found is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown or expired session, start a new one")
+            if method == "GET" and len(parts) == 2:
+                return HTTPStatus.OK, self._session_state(found)
+            if method == "POST" and parts[2:] == ["turns"]:
+                return HTTPStatus.OK, await self._play(found, body)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    def _session_state(self, session: GameSession) -> Dict[str, Any]:
+        return {
+            "session_id": session.session_id,
+            "inventory": session.inventory.items,
+            "total_cost": session.total_cost,
+            "turns": session.turns,
+        }
+
+    async def _play(self, session: GameSession, body: bytes) -> Dict[str, Any]:
+        try:
+            action = json.loads(body)["action"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Expected a JSON body like {"action": "Look around"}') from e
+        if not isinstance(action, str) or not action.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "The action must be a non-empty string")
+
+        try:
+            result = await self.game.aplay(session, action.strip())
+        except ServerBusyError as e:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "The game master is busy, try again later") from e
+        except asyncio.TimeoutError as e:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, "The game master took too long to respond") from e
+        if result is None:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, "The turn was discarded")
+        return result.to_dict()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = await self._serve_request(request_line, reader, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # the client went away
+        finally:
+            writer.close()
+
+    async def _serve_request(
+        self, request_line: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        """Read a request and write its response, returns whether the connection stays open."""
+
+        headers: Dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = False  # until the request line is read
+        try:
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+                length = int(headers.get("content-length", 0))
+                if length < 0:
+                    raise ValueError(f"Negative content length {length}")
+            except ValueError as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request") from e
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            if length > MAX_BODY_SIZE:
+                keep_alive = False  # the body isn't read
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body is too large")
+            body = await reader.readexactly(length) if length else b""
+            status, response = await self.handle(method, target.split("?")[0], body)
+        except HTTPError as e:
+            status, response = e.status, {"error": str(e)}
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Error while serving {request_line!r}: {e}")
+            status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+
+        is_json = isinstance(response, dict)
+        payload = (json.dumps(response, ensure_ascii=False) if is_json else str(response)).encode("utf-8")
+        content_type = "application/json" if is_json else "text/plain; version=0.0.4; charset=utf-8"
+        writer.write(
+            (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+        await writer.drain()
+        return keep_alive
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        print(f"Serving the game API on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def serve_api(game: AIRPG, host: str, port: int) -> None:
+    asyncio.run(GameAPI(game).serve(host, port))
@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from .ai_rpg import AIRPG
+from .concurrency import ServerBusyError
+from .config import AIRPGConfig
+from .paths import LLM_CONFIG_ENV_VAR
+
+PLAYER_ACTIONS = [
+    "Look around",
+    "Search the room for anything useful",
+    "Talk to the nearest person",
+    "Use a torch to light the way",
+    "Walk towards the exit",
+    "Attack the closest enemy",
+    "Rest for a while",
+    "Check my equipment",
+]
+
+
+@dataclass
+class BenchmarkReport:
+    players: int
+    turns_per_player: int
+    completed_turns: int
+    failed_turns: int
+    wall_time: float
+    latencies: List[float]
+    memory_per_session_kb: float
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.completed_turns / self.wall_time if self.wall_time else 0.0
+
+    def percentile(self, q: int) -> float:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[q - 1]
+
+    def format(self) -> str:
+        return "\n".join(
+            [
+                f"Players: {self.players}, turns per player: {self.turns_per_player}",
+                f"Completed turns: {self.completed_turns}, failed turns: {self.failed_turns}",
+                f"Wall time: {self.wall_time:.2f}s",
+                f"Throughput: {self.turns_per_second:.2f} turns/sec",
+                f"Turn latency: p50 {self.percentile(50):.3f}s, p99 {self.percentile(99):.3f}s",
+                f"Memory per session: {self.memory_per_session_kb:.1f} KB",
+            ]
+        )
+
+
+def load_benchmark_game(players: int, llm_config: str, saves_path: str) -> AIRPG:
+    """
+    Game using the given LLM config file from data/config, with room for a session per simulated player.
+    Its games are saved into `saves_path` rather than among the players' saves.
+    """
+
+    os.environ[LLM_CONFIG_ENV_VAR] = llm_config
+    config = AIRPGConfig.load()
+    config.sessions.max_sessions = max(config.sessions.max_sessions, players)
+    config.usage_limits.enabled = False  # measures the game loop, simulated players would run into their budgets
+    config.telemetry.enabled = True  # for the mean duration of each turn span, no metrics endpoint is served
+    return AIRPG(config, saves_path=saves_path)
+
+
+async def play(game: AIRPG, session_id: str, turns: int, rng: random.Random, latencies: List[float]) -> int:
+    """Play `turns` turns as a simulated player through the game's request limiter, returns the number of failures."""
+
+    history: List[Dict[str, Any]] = []
+    session = game.sessions.get(session_id)
+    failures = 0
+    for _ in range(turns):
+        action = rng.choice(PLAYER_ACTIONS)
+        start = time.perf_counter()
+        try:
+            response = await game.request_limiter.run(functools.partial(session.game_loop, action, history), session_id)
+        except (ServerBusyError, asyncio.TimeoutError):
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        history.extend([{"role": "user", "content": action}, {"role": "assistant", "content": response}])
+    return failures
+
+
+async def run_benchmark(game: AIRPG, players: int, turns: int, seed: int = 0) -> BenchmarkReport:
+    """
+    Drive `players` concurrent simulated players through `turns` turns each.
+    Memory is measured with tracemalloc over everything allocated for the sessions and their histories.
+    """
+
+    rng = random.Random(seed)
+    latencies: List[float] = []
+
+    tracemalloc.start()
+    memory_before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    failures = await asyncio.gather(
+        *[play(game, f"benchmark-{i}", turns, random.Random(rng.random()), latencies) for i in range(players)]
+    )
+    wall_time = time.perf_counter() - start
+    memory_after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return BenchmarkReport(
+        players=players,
+        turns_per_player=turns,
+        completed_turns=len(latencies),
+        failed_turns=sum(failures),
+        wall_time=wall_time,
+        latencies=latencies,
+        memory_per_session_kb=(memory_after - memory_before) / players / 1024,
+    )
@@ -0,0 +1,91 @@
+import functools
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+
+from council.contexts import Consumption
+from council.llm import LLMConsumptionCalculatorBase, LLMCostCard
+from council.llm.base.providers.anthropic.anthropic_llm_cost import AnthropicConsumptionCalculator
+from council.llm.base.providers.groq.groq_llm_cost import GroqConsumptionCalculator
+from council.llm.base.providers.openai.openai_llm_cost import OpenAIConsumptionCalculator
+
+from .paths import get_llm_config_path
+from .prompts import LLMConfig, get_prompt_registry
+
+# Providers whose prices council knows, by the key of their settings in the LLM config
+_COST_CALCULATORS: Dict[str, Callable[[str], LLMConsumptionCalculatorBase]] = {
+    "openAISpec": OpenAIConsumptionCalculator,
+    "azureSpec": OpenAIConsumptionCalculator,
+    "anthropicSpec": AnthropicConsumptionCalculator,
+    "groqSpec": GroqConsumptionCalculator,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _find_cost_card(llm_config: LLMConfig) -> Optional[LLMCostCard]:
+    key, spec = llm_config.provider_spec
+    calculator = _COST_CALCULATORS.get(key or "")
+    if calculator is None or spec.get("model") is None:
+        return None
+    return calculator(spec["model"]).find_model_costs()
+
+
+def get_cost_card() -> Optional[LLMCostCard]:
+    """Prices of the configured model, None if they're not known, e.g. for the stand-in."""
+    return _find_cost_card(get_prompt_registry().llm_config(get_llm_config_path()))
+
+
+class CompletionEstimate:
+    """Completion tokens expected from the game master, the average of its responses once there are some."""
+
+    def __init__(self, initial: int):
+        self.initial = initial
+        self._total = 0
+        self._count = 0
+
+    def observe(self, consumptions: Sequence[Consumption]) -> None:
+        for consumption in consumptions:
+            if consumption.kind.endswith(":completion_tokens"):
+                self._total += int(consumption.value)
+                self._count += 1
+
+    @property
+    def tokens(self) -> int:
+        return round(self._total / self._count) if self._count else self.initial
+
+
+@dataclass(frozen=True)
+class PromptBudget:
+    """Tokens of each section of a turn's prompt, counted locally before it's sent, and the projected cost."""
+
+    sections: Dict[str, int]  # in the order they're sent
+    completion_tokens: int
+    cost_card: Optional[LLMCostCard]
+    exact: bool = True  # counted with the model's tokenizer, estimated otherwise
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(self.sections.values())
+
+    @property
+    def projected_cost(self) -> Optional[float]:
+        if self.cost_card is None:
+            return None
+        return self.cost_card.input_cost(self.prompt_tokens) + self.cost_card.output_cost(self.completion_tokens)
+
+    def format(self) -> str:
+        width = max(len(name) for name in self.sections)
+        lines = [f"{name.capitalize():<{width}}  {tokens:>7,} tokens" for name, tokens in self.sections.items()]
+        lines.append(f"{'Prompt':<{width}}  {self.prompt_tokens:>7,} tokens")
+        lines.append(
+            "Token counts: exact, from the model's tokenizer"
+            if self.exact
+            else "Token counts: estimated, the model's tokenizer isn't available"
+        )
+        lines.append(f"Expected response: {self.completion_tokens:,} tokens")
+        projected_cost = self.projected_cost
+        lines.append(
+            f"Projected cost per turn: ${projected_cost:.4f} ({self.cost_card})"
+            if projected_cost is not None
+            else "Projected cost per turn: unknown, the prices of the model aren't known"
+        )
+        return "\n".join(lines)
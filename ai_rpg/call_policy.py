@@ -0,0 +1,248 @@
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, as_completed, wait
+from dataclasses import dataclass
+from typing import Callable, Deque, Generic, Iterator, List, Optional, Sequence, TypeVar
+
+from council.contexts import Consumption
+from council.llm import (
+    ExecuteLLMRequest,
+    LLMBase,
+    LLMFunction,
+    LLMFunctionResponse,
+    LLMMessage,
+    LLMRequest,
+    LLMResponse,
+)
+from council.llm.llm_function.llm_function import FunctionOutOfRetryError
+
+from .config import LLMCallsConfig
+from .llm_client import LLMStream, ObservedLLMStream
+
+T = TypeVar("T")
+
+# Number of latest call latencies the hedging delay is computed from
+LATENCY_WINDOW = 200
+
+
+class LatencyTracker:
+    """Thread-safe rolling window of the latest LLM call latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(int(len(latencies) * q / 100), len(latencies) - 1)]
+
+
+class UsageTrackingMiddleware:
+    """
+    Reports the consumptions of each LLM call as soon as it returns, before its response is parsed,
+    so self-corrected attempts, calls that run out of retries and discarded hedged requests are charged too.
+    """
+
+    def __init__(self, on_consumptions: Callable[[Sequence[Consumption]], None]):
+        self.on_consumptions = on_consumptions
+
+    def __call__(self, llm: LLMBase, execute: ExecuteLLMRequest, request: LLMRequest) -> LLMResponse:
+        response = execute(request)
+        if response.has_result:
+            self.on_consumptions(response.result.consumptions)
+        return response
+
+
+class PrefetchedLLMStream(LLMStream):
+    """Stream whose first delta is read right away, e.g. to know which of two hedged streams starts first."""
+
+    def __init__(self, stream: LLMStream):
+        super().__init__()
+        self._stream = stream
+        self._deltas = iter(stream)
+        self._first = next(self._deltas, None)
+
+    def _iter_deltas(self) -> Iterator[str]:
+        if self._first is not None:
+            yield self._first
+        yield from self._deltas
+        self.consumptions = self._stream.consumptions
+
+
+def _drain(stream: LLMStream) -> None:
+    for _ in stream:
+        pass
+
+
+@dataclass
+class CallOutcome(Generic[T]):
+    llm_response: LLMFunctionResponse[T]
+    hedged: bool = False  # a second request was fired because the first one was slow
+    fell_back: bool = False  # the response comes from the fallback model
+
+
+@dataclass
+class StreamOutcome:
+    stream: LLMStream
+    hedged: bool = False  # a second stream was opened because the first one was slow to start
+
+
+class LLMCallPolicy(Generic[T]):
+    """
+    Runs LLM function calls of a session with a bounded number of self-corrections,
+    falls back to a cheaper model once they're exhausted and optionally hedges slow requests.
+
+    A hedged request is a second identical call fired once the first one takes longer than a percentile
+    of recent latencies. Whichever valid response arrives first is used, and the cost of the other one
+    is still tracked once it completes. Every call is reported to `on_consumptions` by a middleware,
+    including failed attempts, so the final response's consumptions must not be tracked again.
+    Streams are opened with `stream_factory` and reported once they're exhausted, they're hedged on their first delta.
+    """
+
+    def __init__(
+        self,
+        config: LLMCallsConfig,
+        llm_function_factory: Callable[[], LLMFunction[T]],
+        fallback_llm_function_factory: Optional[Callable[[], LLMFunction[T]]],
+        on_consumptions: Callable[[Sequence[Consumption]], None],
+        latencies: LatencyTracker,
+        executor: Optional[Executor],
+        stream_factory: Optional[Callable[[Sequence[LLMMessage]], LLMStream]] = None,
+    ):
+        self.config = config
+        self.on_consumptions = on_consumptions
+        self._llm_function_factory = llm_function_factory
+        self._fallback_llm_function_factory = fallback_llm_function_factory
+        self._stream_factory = stream_factory
+        self.llm_function = self._create(llm_function_factory)
+        self._fallback_llm_function: Optional[LLMFunction[T]] = None
+        self.latencies = latencies
+        self.executor = executor
+
+    def _create(self, factory: Callable[[], LLMFunction[T]]) -> LLMFunction[T]:
+        llm_function = factory()
+        llm_function.add_middleware(UsageTrackingMiddleware(self.on_consumptions))
+        return llm_function
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for the first response before hedging, None if requests aren't hedged."""
+
+        if not self.config.hedging or self.executor is None or len(self.latencies) < self.config.hedge_min_samples:
+            return None
+        return self.latencies.percentile(self.config.hedge_percentile)
+
+    def _observe_late(self, future: "Future[LLMFunctionResponse[T]]") -> None:
+        if not future.cancelled() and future.exception() is None:
+            self.latencies.observe(future.result().duration)
+
+    def execute(self, messages: Sequence[LLMMessage], prefer_fallback: bool = False) -> CallOutcome[T]:
+        """Call the game master, or the fallback model right away with `prefer_fallback` if there's one."""
+
+        if prefer_fallback and self._fallback_llm_function_factory is not None:
+            return self._execute_fallback(messages)
+        try:
+            return self._execute(messages)
+        except FunctionOutOfRetryError:
+            if not self.config.fallback_on_parse_failure or self._fallback_llm_function_factory is None:
+                raise
+            print("Game master response couldn't be parsed, retrying with the fallback model")
+            return self._execute_fallback(messages)
+
+    def stream(self, messages: Sequence[LLMMessage]) -> StreamOutcome:
+        """
+        Stream a response of the main model, charged once it's exhausted. Parsing it and falling back is up to
+        the caller, e.g. by calling `execute` once the stream fails. When hedging, a second stream is opened once
+        the first delta takes longer than the hedging delay of whole calls, the slower one is read to its end
+        in the background so it's charged too.
+        """
+
+        delay = self.hedge_delay()
+        if delay is None:
+            return StreamOutcome(self._open_stream(messages))
+
+        assert self.executor is not None
+        futures = [self.executor.submit(self._start_stream, messages)]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            futures.append(self.executor.submit(self._start_stream, messages))
+
+        errors: List[BaseException] = []
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+                continue
+            for other in futures:
+                if other is not future:
+                    other.add_done_callback(self._drain_late)
+            return StreamOutcome(future.result(), hedged=len(futures) > 1)
+
+        raise errors[0]
+
+    def _open_stream(self, messages: Sequence[LLMMessage]) -> LLMStream:
+        assert self._stream_factory is not None
+
+        def on_done(stream: LLMStream, error: Optional[Exception]) -> None:
+            if error is None:
+                self.on_consumptions(stream.consumptions)
+
+        return ObservedLLMStream(self._stream_factory(messages), on_done)
+
+    def _start_stream(self, messages: Sequence[LLMMessage]) -> LLMStream:
+        return PrefetchedLLMStream(self._open_stream(messages))
+
+    def _drain_late(self, future: "Future[LLMStream]") -> None:
+        if not future.cancelled() and future.exception() is None:
+            assert self.executor is not None
+            self.executor.submit(_drain, future.result())
+
+    def _execute_fallback(self, messages: Sequence[LLMMessage]) -> CallOutcome[T]:
+        assert self._fallback_llm_function_factory is not None
+        if self._fallback_llm_function is None:
+            self._fallback_llm_function = self._create(self._fallback_llm_function_factory)
+        llm_response = self._fallback_llm_function.execute_with_llm_response(messages=messages)
+        return CallOutcome(llm_response, fell_back=True)
+
+    def _execute(self, messages: Sequence[LLMMessage]) -> CallOutcome[T]:
+        delay = self.hedge_delay()
+        if delay is None:
+            llm_response = self.llm_function.execute_with_llm_response(messages=messages)
+            self.latencies.observe(llm_response.duration)
+            return CallOutcome(llm_response)
+
+        # hedged calls can outlive the turn, so each gets its own function: the logging middleware keeps per-call state
+        assert self.executor is not None
+        futures = [
+            self.executor.submit(self._create(self._llm_function_factory).execute_with_llm_response, messages=messages)
+        ]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            futures.append(
+                self.executor.submit(
+                    self._create(self._llm_function_factory).execute_with_llm_response, messages=messages
+                )
+            )
+
+        errors: List[BaseException] = []
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+                continue
+            for other in futures:
+                if other is not future:
+                    other.add_done_callback(self._observe_late)
+            self.latencies.observe(future.result().duration)
+            return CallOutcome(future.result(), hedged=len(futures) > 1)
+
+        raise errors[0]
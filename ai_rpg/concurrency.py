@@ -0,0 +1,170 @@
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Deque, Iterator, Optional, TypeVar, cast
+
+from .config import ConcurrencyConfig
+from .session import DEFAULT_SESSION_ID
+
+T = TypeVar("T")
+
+_EXHAUSTED = object()
+
+
+def _close_iterator(iterator: Iterator[object]) -> None:
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+class ServerBusyError(Exception):
+    """Raised when too many requests are already waiting for the game master."""
+
+
+class RequestLimiter:
+    """
+    Runs blocking LLM work from async code with bounded concurrency.
+
+    At most `max_in_flight` requests are executed at the same time, up to `max_queued` more wait for a free slot,
+    anything beyond that is rejected right away so the server applies backpressure instead of piling up work.
+    Free slots go to the waiting sessions in turn rather than in arrival order, so a player sending many actions
+    at once doesn't hold up the others.
+    """
+
+    def __init__(self, config: ConcurrencyConfig):
+        self.max_in_flight = config.max_in_flight
+        self.max_queued = config.max_queued
+        self.request_timeout = config.request_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="ai-rpg-llm")
+        # all state below is only touched from the event loop thread
+        self._pending = 0  # in-flight and queued requests
+        self._running = 0
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future[None]]]" = OrderedDict()  # session id -> its requests
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def running(self) -> int:
+        """Requests holding a slot, including timed out ones whose work is still executing."""
+        return self._running
+
+    async def run(self, fn: Callable[[threading.Event], T], session_id: str = DEFAULT_SESSION_ID) -> T:
+        """
+        Run `fn` in the worker pool once it's the session's turn for a slot, and await its result.
+
+        `fn` receives an event that is set once the request times out,
+        so it can skip side effects of a result nobody is waiting for anymore.
+        """
+
+        if self._pending >= self.max_in_flight + self.max_queued:
+            raise ServerBusyError(f"{self._pending} requests are already in flight or queued")
+
+        cancelled = threading.Event()
+        self._pending += 1
+        try:
+            return await asyncio.wait_for(self._run(fn, cancelled, session_id), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            cancelled.set()
+            raise
+        finally:
+            self._pending -= 1
+
+    async def stream(
+        self, fn: Callable[[threading.Event], Iterator[T]], session_id: str = DEFAULT_SESSION_ID
+    ) -> AsyncIterator[T]:
+        """
+        Iterate the generator `fn` returns in the worker pool once it's the session's turn for a slot,
+        holding the slot until it's exhausted. Each item must arrive within the request timeout,
+        `fn` receives an event that is set once one doesn't.
+        """
+
+        if self._pending >= self.max_in_flight + self.max_queued:
+            raise ServerBusyError(f"{self._pending} requests are already in flight or queued")
+
+        cancelled = threading.Event()
+        self._pending += 1
+        try:
+            await asyncio.wait_for(self._acquire(session_id), timeout=self.request_timeout)
+            loop = asyncio.get_running_loop()
+            iterator: Optional[Iterator[T]] = None
+            step: Optional["asyncio.Future[object]"] = None
+            exhausted = False
+            try:
+                iterator = fn(cancelled)
+                while True:
+                    step = loop.run_in_executor(self._executor, next, iterator, _EXHAUSTED)
+                    item = await asyncio.wait_for(asyncio.shield(step), timeout=self.request_timeout)
+                    if item is _EXHAUSTED:
+                        exhausted = True
+                        return
+                    yield cast(T, item)
+            finally:
+                if iterator is None or exhausted:
+                    self._release()
+                else:
+                    # left early: close the iterator so it stops its LLM stream, the slot is only free after that
+                    self._close_later(iterator, step)
+        except asyncio.TimeoutError:
+            cancelled.set()
+            raise
+        finally:
+            self._pending -= 1
+
+    def _close_later(self, iterator: Iterator[T], step: Optional["asyncio.Future[object]"]) -> None:
+        """Close `iterator` in the worker pool once its running step returns, then release its slot."""
+
+        loop = asyncio.get_running_loop()
+
+        def close(_: object = None) -> None:
+            closing = loop.run_in_executor(self._executor, _close_iterator, iterator)
+            closing.add_done_callback(lambda _: self._release())
+
+        if step is None or step.done():
+            close()
+        else:
+            step.add_done_callback(close)  # a generator can't be closed while it's executing
+
+    async def _run(self, fn: Callable[[threading.Event], T], cancelled: threading.Event, session_id: str) -> T:
+        await self._acquire(session_id)
+        future = asyncio.get_running_loop().run_in_executor(self._executor, fn, cancelled)
+        # the slot is only free once the work is done, a timed out request keeps a worker thread busy until then
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.shield(future)
+
+    async def _acquire(self, session_id: str) -> None:
+        if self._running < self.max_in_flight and not self._waiting:
+            self._running += 1
+            return
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(session_id, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # the slot was handed over just as the request timed out
+            else:
+                waiters = self._waiting.get(session_id)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiting[session_id]
+            raise
+
+    def _release(self) -> None:
+        """Hand the slot over to the next waiting session, which then waits at the back until its next turn."""
+
+        while self._waiting:
+            session_id, waiters = next(iter(self._waiting.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiting.move_to_end(session_id)
+            else:
+                del self._waiting[session_id]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
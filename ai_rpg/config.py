@@ -1,9 +1,9 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
 import yaml
 
-from .utils import AI_RPG_CONFIG_PATH
+from .paths import AI_RPG_CONFIG_PATH
 
 
 @dataclass
@@ -11,16 +11,24 @@ class GenerationConfig:
     world: Optional[str]
     story: Optional[str]
     starting_inventory: Optional[str]
+    use_pool: bool
 
     @classmethod
     def from_yaml(cls, data: dict) -> "GenerationConfig":
-        return cls(world=data["world"], story=data["story"], starting_inventory=data["starting_inventory"])
+        return cls(
+            world=data["world"],
+            story=data["story"],
+            starting_inventory=data["starting_inventory"],
+            use_pool=data.get("use_pool", False),
+        )
 
 
 @dataclass
 class DifficultyConfig:
     number_of_dice: int
     dice_combine_method: str
+    dice_expression: Optional[str]
+    dice_seed: Optional[int]
     dice_legend: str
 
     @classmethod
@@ -28,17 +36,255 @@ class DifficultyConfig:
         return cls(
             number_of_dice=data["number_of_dice"],
             dice_combine_method=data["dice_combine_method"],
+            dice_expression=data.get("dice_expression"),
+            dice_seed=data.get("dice_seed"),
             dice_legend=data["dice_legend"],
         )
 
 
+@dataclass
+class HistoryConfig:
+    verbatim_turns: int
+    summary_refresh_turns: int
+    max_tokens: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "HistoryConfig":
+        return cls(
+            verbatim_turns=data.get("verbatim_turns", 10),
+            summary_refresh_turns=data.get("summary_refresh_turns", 5),
+            max_tokens=data.get("max_tokens", 6000),
+        )
+
+
+@dataclass
+class MemoryConfig:
+    enabled: bool
+    top_k: int
+    max_tokens: int
+    chunk_tokens: int
+    setup_in_system_prompt: bool
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "MemoryConfig":
+        return cls(
+            enabled=data.get("enabled", False),
+            top_k=data.get("top_k", 4),
+            max_tokens=data.get("max_tokens", 1000),
+            chunk_tokens=data.get("chunk_tokens", 200),
+            setup_in_system_prompt=data.get("setup_in_system_prompt", True),
+        )
+
+
+@dataclass
+class SessionConfig:
+    idle_ttl_minutes: float
+    max_sessions: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "SessionConfig":
+        return cls(idle_ttl_minutes=data.get("idle_ttl_minutes", 60), max_sessions=data.get("max_sessions", 500))
+
+
+@dataclass
+class ConcurrencyConfig:
+    max_in_flight: int
+    max_queued: int
+    request_timeout: float
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "ConcurrencyConfig":
+        return cls(
+            max_in_flight=data.get("max_in_flight", 32),
+            max_queued=data.get("max_queued", 128),
+            request_timeout=data.get("request_timeout", 60),
+        )
+
+
+@dataclass
+class CacheConfig:
+    enabled: bool
+    mode: str
+    variants: int
+    max_size_mb: float
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "CacheConfig":
+        return cls(
+            enabled=data.get("enabled", False),
+            mode=data.get("mode", "exact"),
+            variants=data.get("variants", 3),
+            max_size_mb=data.get("max_size_mb", 50),
+        )
+
+
+@dataclass
+class LLMCallsConfig:
+    max_retries: int
+    fallback_on_parse_failure: bool
+    hedging: bool
+    hedge_percentile: float
+    hedge_min_samples: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "LLMCallsConfig":
+        return cls(
+            max_retries=data.get("max_retries", 2),
+            fallback_on_parse_failure=data.get("fallback_on_parse_failure", True),
+            hedging=data.get("hedging", False),
+            hedge_percentile=data.get("hedge_percentile", 95),
+            hedge_min_samples=data.get("hedge_min_samples", 20),
+        )
+
+
+@dataclass
+class SavesConfig:
+    autosave: bool
+    fsync_every: int
+    snapshot_every: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "SavesConfig":
+        return cls(
+            autosave=data.get("autosave", True),
+            fsync_every=data.get("fsync_every", 10),
+            snapshot_every=data.get("snapshot_every", 50),
+        )
+
+
+@dataclass
+class PromptBudgetConfig:
+    digest: bool
+    digest_max_tokens: int
+    world_max_tokens: int
+    story_max_tokens: int
+    action_max_tokens: int
+    expected_completion_tokens: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "PromptBudgetConfig":
+        return cls(
+            digest=data.get("digest", False),
+            digest_max_tokens=data.get("digest_max_tokens", 500),
+            world_max_tokens=data.get("world_max_tokens", 2000),
+            story_max_tokens=data.get("story_max_tokens", 2000),
+            action_max_tokens=data.get("action_max_tokens", 200),
+            expected_completion_tokens=data.get("expected_completion_tokens", 400),
+        )
+
+
+@dataclass
+class UsageLimitsConfig:
+    enabled: bool
+    session_tokens_per_minute: Optional[float]
+    session_dollars_per_day: Optional[float]
+    global_tokens_per_minute: Optional[float]
+    global_dollars_per_day: Optional[float]
+    degrade_below: float
+    degraded_history_turns: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "UsageLimitsConfig":
+        return cls(
+            enabled=data.get("enabled", False),
+            session_tokens_per_minute=data.get("session_tokens_per_minute"),
+            session_dollars_per_day=data.get("session_dollars_per_day"),
+            global_tokens_per_minute=data.get("global_tokens_per_minute"),
+            global_dollars_per_day=data.get("global_dollars_per_day"),
+            degrade_below=data.get("degrade_below", 0.2),
+            degraded_history_turns=data.get("degraded_history_turns", 2),
+        )
+
+
+@dataclass
+class SpeculationConfig:
+    enabled: bool
+    actions: List[str]
+    suggested_actions: int
+    match_threshold: float
+    max_cost_per_session: float
+    max_in_flight: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "SpeculationConfig":
+        return cls(
+            enabled=data.get("enabled", False),
+            actions=data.get("actions", ["Look around"]),
+            suggested_actions=data.get("suggested_actions", 2),
+            match_threshold=data.get("match_threshold", 0.9),
+            max_cost_per_session=data.get("max_cost_per_session", 0.05),
+            max_in_flight=data.get("max_in_flight", 8),
+        )
+
+
+@dataclass
+class LLMLoggingConfig:
+    enabled: bool
+    queue_size: int
+    sample_above: float
+    sample_every: int
+    max_file_mb: float
+    max_files: int
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "LLMLoggingConfig":
+        return cls(
+            enabled=data.get("enabled", False),
+            queue_size=data.get("queue_size", 1000),
+            sample_above=data.get("sample_above", 0.5),
+            sample_every=data.get("sample_every", 10),
+            max_file_mb=data.get("max_file_mb", 20),
+            max_files=data.get("max_files", 50),
+        )
+
+
+@dataclass
+class PromptsConfig:
+    hot_reload: bool
+    reload_interval: float
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "PromptsConfig":
+        return cls(hot_reload=data.get("hot_reload", False), reload_interval=data.get("reload_interval", 2))
+
+
+@dataclass
+class TelemetryConfig:
+    enabled: bool
+    metrics_port: Optional[int]
+    trace_file: Optional[str]
+
+    @classmethod
+    def from_yaml(cls, data: dict) -> "TelemetryConfig":
+        return cls(
+            enabled=data.get("enabled", False),
+            metrics_port=data.get("metrics_port"),
+            trace_file=data.get("trace_file"),
+        )
+
+
 @dataclass
 class AIRPGConfig:
     """Main configuration object for the AI RPG."""
 
     generation: GenerationConfig
+    cache: CacheConfig
     difficulty: DifficultyConfig
+    history: HistoryConfig
+    memory: MemoryConfig
+    prompt_budget: PromptBudgetConfig
+    sessions: SessionConfig
+    saves: SavesConfig
+    concurrency: ConcurrencyConfig
+    llm_calls: LLMCallsConfig
+    usage_limits: UsageLimitsConfig
+    speculation: SpeculationConfig
+    llm_logging: LLMLoggingConfig
+    prompts: PromptsConfig
+    telemetry: TelemetryConfig
     language: Optional[str]
+    localize: bool
+    streaming: bool
 
     @classmethod
     def from_yaml(cls, path: str) -> "AIRPGConfig":
@@ -46,10 +292,44 @@ class AIRPGConfig:
             data = yaml.safe_load(f)
 
         generation = GenerationConfig.from_yaml(data["generation"])
+        cache = CacheConfig.from_yaml(data.get("cache") or {})
         difficulty = DifficultyConfig.from_yaml(data["difficulty"])
+        history = HistoryConfig.from_yaml(data.get("history") or {})
+        memory = MemoryConfig.from_yaml(data.get("memory") or {})
+        prompt_budget = PromptBudgetConfig.from_yaml(data.get("prompt_budget") or {})
+        sessions = SessionConfig.from_yaml(data.get("sessions") or {})
+        saves = SavesConfig.from_yaml(data.get("saves") or {})
+        concurrency = ConcurrencyConfig.from_yaml(data.get("concurrency") or {})
+        llm_calls = LLMCallsConfig.from_yaml(data.get("llm_calls") or {})
+        usage_limits = UsageLimitsConfig.from_yaml(data.get("usage_limits") or {})
+        speculation = SpeculationConfig.from_yaml(data.get("speculation") or {})
+        llm_logging = LLMLoggingConfig.from_yaml(data.get("llm_logging") or {})
+        prompts = PromptsConfig.from_yaml(data.get("prompts") or {})
+        telemetry = TelemetryConfig.from_yaml(data.get("telemetry") or {})
         language = data.get("language", None)
+        localize = data.get("localize", False)
+        streaming = data.get("streaming", False)
 
-        return cls(generation=generation, difficulty=difficulty, language=language)
+        return cls(
+            generation=generation,
+            cache=cache,
+            difficulty=difficulty,
+            history=history,
+            memory=memory,
+            prompt_budget=prompt_budget,
+            sessions=sessions,
+            saves=saves,
+            concurrency=concurrency,
+            llm_calls=llm_calls,
+            usage_limits=usage_limits,
+            speculation=speculation,
+            llm_logging=llm_logging,
+            prompts=prompts,
+            telemetry=telemetry,
+            language=language,
+            localize=localize,
+            streaming=streaming,
+        )
 
     @classmethod
     def load(cls) -> "AIRPGConfig":
@@ -1,44 +1,293 @@
+import hashlib
 import random
-from typing import List
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
+import numpy as np
 
-class DiceAggregator:
-    """Handles aggregation of multiple dice rolls."""
+from .config import DifficultyConfig
 
-    SUPPORTED_METHODS = {"avg", "min", "max"}
+DEFAULT_SIDES = 20
 
-    def __init__(self, method: str):
-        if method not in self.SUPPORTED_METHODS:
-            raise ValueError(f"Invalid aggregation method: '{method}'. Must be one of {self.SUPPORTED_METHODS}")
-        self.method = method
+# Keep-highest/lowest and averaged dice are distributed exactly by enumerating all outcomes up to this many
+EXACT_OUTCOMES_LIMIT = 1_000_000
 
-    def aggregate(self, rolls: List[int]) -> int:
-        if self.method == "min":
-            return min(rolls)
-        elif self.method == "max":
-            return max(rolls)
+# Monte Carlo samples rolled at once, to bound the memory used by large batches
+BATCH_CHUNK_SIZE = 1_000_000
 
-        return round(sum(rolls) / len(rolls))
+# Spaces are allowed around the operators between terms, not within them
+_TERM_PATTERN = re.compile(r"\s*([+-]?)\s*(?:(\d*)d(\d+)(?:(kh|kl|k)(\d+)|(avg))?|(\d+))", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class DiceTerm:
+    """
+    `count` dice with `sides` sides, e.g. 4d6kh3 keeps the 3 highest of four six-sided dice.
+    With `average`, the dice are combined into their rounded mean instead of their sum.
+    """
+
+    count: int
+    sides: int
+    keep: Optional[int] = None
+    keep_lowest: bool = False
+    average: bool = False
+    sign: int = 1
+
+    def combine(self, rolls: np.ndarray) -> np.ndarray:
+        """Combine a (samples, count) array of rolled dice into the value of the term for each sample."""
+
+        if self.keep is not None:
+            rolls = np.sort(rolls, axis=1)
+            rolls = rolls[:, : self.keep] if self.keep_lowest else rolls[:, self.count - self.keep :]
+        values = np.round(rolls.mean(axis=1)).astype(np.int64) if self.average else rolls.sum(axis=1)
+        return self.sign * values
+
+    def roll(self, rng: random.Random) -> int:
+        rolls = sorted(rng.randint(1, self.sides) for _ in range(self.count))
+        if self.keep is not None:
+            rolls = rolls[: self.keep] if self.keep_lowest else rolls[self.count - self.keep :]
+        return self.sign * (round(sum(rolls) / len(rolls)) if self.average else sum(rolls))
+
+    def roll_batch(self, rng: np.random.Generator, samples: int) -> np.ndarray:
+        return self.combine(rng.integers(1, self.sides + 1, size=(samples, self.count), dtype=np.int32))
+
+    def distribution(self) -> Optional["Distribution"]:
+        """Exact distribution of the term, None if there are too many outcomes to enumerate."""
+
+        if self.keep is None and not self.average:
+            # plain sum of dice, convolve the distribution of a single die
+            die = np.full(self.sides, 1 / self.sides)
+            probabilities = die
+            for _ in range(self.count - 1):
+                probabilities = np.convolve(probabilities, die)
+            distribution = Distribution(low=self.count, probabilities=probabilities)
+            return distribution if self.sign > 0 else distribution.negate()
+        if self.sides**self.count <= EXACT_OUTCOMES_LIMIT:
+            outcomes = np.indices((self.sides,) * self.count, dtype=np.int32).reshape(self.count, -1).T + 1
+            return Distribution.from_samples(self.combine(outcomes))
+        return None
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """Probabilities of consecutive integer values starting at `low`."""
+
+    low: int
+    probabilities: np.ndarray
+
+    @property
+    def high(self) -> int:
+        return self.low + len(self.probabilities) - 1
+
+    @property
+    def mean(self) -> float:
+        return float(np.dot(np.arange(self.low, self.high + 1), self.probabilities))
+
+    @classmethod
+    def from_samples(cls, values: np.ndarray) -> "Distribution":
+        low = int(values.min())
+        counts = np.bincount(values - low)
+        return cls(low=low, probabilities=counts / counts.sum())
+
+    def negate(self) -> "Distribution":
+        return Distribution(low=-self.high, probabilities=self.probabilities[::-1])
+
+    def add(self, other: "Distribution") -> "Distribution":
+        """Distribution of the sum of two independent values."""
+        return Distribution(
+            low=self.low + other.low, probabilities=np.convolve(self.probabilities, other.probabilities)
+        )
+
+    def probability(self, low: int, high: int) -> float:
+        """Probability of a value between `low` and `high` inclusive."""
+
+        start, end = max(low - self.low, 0), min(high - self.low + 1, len(self.probabilities))
+        return float(self.probabilities[start:end].sum()) if start < end else 0.0
+
+
+@dataclass(frozen=True)
+class DiceExpression:
+    """
+    Dice expression in the usual notation, e.g. "1d20", "2d20kh1" (advantage), "2d20kl1" (disadvantage)
+    or "4d6kh3 + 2". The "avg" suffix, e.g. "3d20avg", takes the rounded mean of the dice.
+    """
+
+    text: str
+    terms: Tuple[DiceTerm, ...]
+    modifier: int = 0
+
+    @classmethod
+    def parse(cls, text: str) -> "DiceExpression":
+        terms: List[DiceTerm] = []
+        modifier, position = 0, 0
+        stripped = text.strip()
+        while position < len(stripped):
+            match = _TERM_PATTERN.match(stripped, position)
+            if match is None or (position > 0 and not match.group(1)):
+                raise ValueError(f"Invalid dice expression: '{text}'")
+            sign_text, count_text, sides_text, keep_kind, keep_text, average, constant = match.groups()
+            sign = -1 if sign_text == "-" else 1
+            position = match.end()
+
+            if constant is not None:
+                modifier += sign * int(constant)
+                continue
+            count, sides = int(count_text or 1), int(sides_text)
+            keep = int(keep_text) if keep_text is not None else None
+            if count < 1 or sides < 1 or (keep is not None and not 1 <= keep <= count):
+                raise ValueError(f"Invalid dice in expression '{text}': '{match.group(0).strip()}'")
+            terms.append(
+                DiceTerm(
+                    count=count,
+                    sides=sides,
+                    keep=keep,
+                    keep_lowest=keep_kind is not None and keep_kind.lower() == "kl",
+                    average=average is not None,
+                    sign=sign,
+                )
+            )
+
+        if not terms:
+            raise ValueError(f"Dice expression '{text}' doesn't roll any dice")
+        return cls(text=text, terms=tuple(terms), modifier=modifier)
+
+    @classmethod
+    def from_config(cls, config: DifficultyConfig) -> "DiceExpression":
+        """Expression of the difficulty, built from the number of d20 and how they're combined if not set explicitly."""
+
+        if config.dice_expression is not None:
+            return cls.parse(config.dice_expression)
+
+        methods = {"avg": "avg", "min": "kl1", "max": "kh1"}
+        if config.dice_combine_method not in methods:
+            raise ValueError(
+                f"Invalid aggregation method: '{config.dice_combine_method}'. Must be one of {set(methods)}"
+            )
+        suffix = methods[config.dice_combine_method] if config.number_of_dice > 1 else ""
+        return cls.parse(f"{config.number_of_dice}d{DEFAULT_SIDES}{suffix}")
+
+    @property
+    def dice_count(self) -> int:
+        return sum(term.count for term in self.terms)
+
+    def roll(self, rng: random.Random) -> int:
+        return sum(term.roll(rng) for term in self.terms) + self.modifier
+
+    def roll_batch(self, rng: np.random.Generator, samples: int) -> np.ndarray:
+        """Roll the expression `samples` times at once."""
+
+        values = np.full(samples, self.modifier, dtype=np.int64)
+        for term in self.terms:
+            values += term.roll_batch(rng, samples)
+        return values
+
+    def exact_distribution(self) -> Optional[Distribution]:
+        """Exact distribution of the expression, None if a term has too many outcomes to enumerate."""
+
+        distribution = Distribution(low=self.modifier, probabilities=np.ones(1))
+        for term in self.terms:
+            term_distribution = term.distribution()
+            if term_distribution is None:
+                return None
+            distribution = distribution.add(term_distribution)
+        return distribution
+
+    def sample_distribution(self, samples: int, seed: Optional[int] = None) -> Distribution:
+        """Monte Carlo estimate of the distribution of the expression."""
+
+        rng = np.random.default_rng(seed)
+        chunks = [
+            self.roll_batch(rng, min(BATCH_CHUNK_SIZE, samples - start))
+            for start in range(0, samples, BATCH_CHUNK_SIZE)
+        ]
+        return Distribution.from_samples(np.concatenate(chunks))
 
 
 class DiceRoller:
-    """A class for simulating dice rolls in D&D."""
+    """A class for simulating dice rolls in D&D, with its own random number generator so each session can be seeded."""
 
-    def __init__(self, num_dice: int = 1, aggregation: str = "avg"):
-        self.num_dice = num_dice
-        self.aggregator = DiceAggregator(aggregation)
-        self.sides = 20
+    def __init__(self, expression: DiceExpression, seed: Optional[int] = None):
+        self.expression = expression
+        self.rng = random.Random(seed)
 
-    def _roll_die(self) -> int:
-        """Simulate rolling a single die."""
-        return random.randint(1, self.sides)
+    @classmethod
+    def from_config(cls, config: DifficultyConfig, session_id: Optional[str] = None) -> "DiceRoller":
+        """Roller of the difficulty, seeded from the configured seed and the session so sessions roll differently."""
+
+        seed = config.dice_seed
+        if seed is not None and session_id is not None:
+            seed = int.from_bytes(hashlib.sha256(f"{seed}:{session_id}".encode("utf-8")).digest()[:8], "big")
+        return cls(DiceExpression.from_config(config), seed=seed)
 
     def roll_dice(self) -> int:
-        """
-        Roll self.num_dice number of dice and combine the results.
-
-        For example, if num_dice=2, it will roll 2d20 and then
-        either take the average, the minimum, or the maximum depending on self.aggregation.
-        """
-        rolls = [self._roll_die() for _ in range(self.num_dice)]
-        return self.aggregator.aggregate(rolls)
+        """Roll the dice expression once, e.g. 4d6kh3+2 rolls four d6, keeps the three highest and adds 2."""
+        return self.expression.roll(self.rng)
+
+
+@dataclass(frozen=True)
+class LegendBand:
+    low: int
+    high: int
+    label: str
+
+
+_LEGEND_LINE_PATTERN = re.compile(r"^\s*-\s*(\d+)(?:\s*-\s*(\d+))?\s*:\s*([^.\n]*)", re.MULTILINE)
+
+
+def parse_dice_legend(legend: str) -> List[LegendBand]:
+    """Bands of roll results of a legend with lines like "- 2-5: Critical failure. The worst possible outcome..."."""
+
+    return [
+        LegendBand(low=int(low), high=int(high or low), label=label.strip())
+        for low, high, label in _LEGEND_LINE_PATTERN.findall(legend)
+    ]
+
+
+@dataclass
+class DifficultyOdds:
+    """Probability of each band of the dice legend for a dice expression."""
+
+    expression: str
+    bands: List[Tuple[LegendBand, float]]
+    unmapped: float  # probability of results outside of all bands
+    mean: float
+    samples: Optional[int]  # None for an exact distribution
+
+    def format(self) -> str:
+        method = "exact" if self.samples is None else f"estimated from {self.samples:,} rolls"
+        lines = [f"Odds of rolling {self.expression} ({method}, mean {self.mean:.2f}):"]
+        for band, probability in self.bands:
+            values = str(band.low) if band.low == band.high else f"{band.low}-{band.high}"
+            lines.append(f"- {band.label} ({values}): {probability:.1%}")
+        if self.unmapped > 1e-9:
+            lines.append(f"- Outside of the legend: {self.unmapped:.1%}")
+        return "\n".join(lines)
+
+
+def analyze_difficulty(
+    config: DifficultyConfig,
+    expression: Optional[DiceExpression] = None,
+    samples: int = BATCH_CHUNK_SIZE,
+    seed: Optional[int] = None,
+    exact: bool = True,
+) -> DifficultyOdds:
+    """
+    Outcome distribution of the difficulty's dice against its legend bands.
+    It's computed exactly when the dice allow it, otherwise estimated from `samples` Monte Carlo rolls.
+    """
+
+    expression = expression or DiceExpression.from_config(config)
+    distribution = expression.exact_distribution() if exact else None
+    sampled = distribution is None
+    if distribution is None:
+        distribution = expression.sample_distribution(samples, seed)
+
+    bands = [(band, distribution.probability(band.low, band.high)) for band in parse_dice_legend(config.dice_legend)]
+    return DifficultyOdds(
+        expression=expression.text,
+        bands=bands,
+        unmapped=max(1.0 - sum(probability for _, probability in bands), 0.0),
+        mean=distribution.mean,
+        samples=samples if sampled else None,
+    )
@@ -1,5 +1,6 @@
 from .inventory import generate_inventory
+from .starting_message import generate_starting_message
 from .story import generate_story
 from .world import generate_world
 
-__all__ = ["generate_inventory", "generate_story", "generate_world"]
+__all__ = ["generate_inventory", "generate_starting_message", "generate_story", "generate_world"]
@@ -0,0 +1,134 @@
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from ..config import CacheConfig
+from ..paths import GENERATION_PATH, get_llm_config_path
+from ..prompts import get_prompt_registry
+
+CACHE_PATH = os.path.join(GENERATION_PATH, "cache")
+
+T = TypeVar("T")
+
+
+class GenerationCache:
+    """
+    Local content-addressed cache of generations.
+
+    Entries are keyed by a hash of the prompt file, the LLM config and the input text,
+    and stored as JSON files in a directory sharded by the first two characters of the key.
+    In `exact` mode, a cached generation is reused as is.
+    In `sample` mode, up to `variants` generations are accumulated per key and then sampled from.
+    Once the cache grows over `max_size_mb`, least recently used entries are evicted. The directory is scanned once
+    for the entries' sizes, which are then kept up to date as entries are written.
+    """
+
+    MODES = {"exact", "sample"}
+
+    def __init__(self, config: CacheConfig, path: str = CACHE_PATH):
+        if config.mode not in self.MODES:
+            raise ValueError(f"Invalid cache mode: '{config.mode}'. Must be one of {self.MODES}")
+
+        self.mode = config.mode
+        self.variants = config.variants
+        self.max_size_bytes = int(config.max_size_mb * 1024 * 1024)
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None  # entry path -> size, least recently used first
+        self._total_size = 0
+
+    @staticmethod
+    def key(prompt_filename: str, input_text: str) -> str:
+        # files are hashed once by the registry, keys of entries cached before it still match
+        registry = get_prompt_registry()
+        digest = hashlib.sha256()
+        for part_digest in [
+            registry.prompt(prompt_filename).file.digest,
+            registry.llm_config(get_llm_config_path()).file.digest,
+            hashlib.sha256(input_text.encode("utf-8")).digest(),
+        ]:
+            digest.update(part_digest)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def _read_variants(self, key: str) -> List[Any]:
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["variants"]
+        except FileNotFoundError:
+            return []
+
+    def _write_variants(self, key: str, variants: List[Any]) -> None:
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"variants": variants}, f, ensure_ascii=False)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        entries = self._index()
+        self._total_size += size - entries.pop(path, 0)
+        entries[path] = size
+
+    def _index(self) -> "OrderedDict[str, int]":
+        """Sizes of the cached entries, least recently used first, read from the directory on first use."""
+
+        if self._entries is None:
+            stats = [(os.stat(path), path) for path in glob.glob(os.path.join(self.path, "*", "*.json"))]
+            stats.sort(key=lambda entry: entry[0].st_mtime)
+            self._entries = OrderedDict((path, stat.st_size) for stat, path in stats)
+            self._total_size = sum(self._entries.values())
+        return self._entries
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits into max_size_bytes."""
+
+        entries = self._index()
+        while entries and self._total_size > self.max_size_bytes:
+            path, size = entries.popitem(last=False)
+            self._total_size -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # removed by another process sharing the cache
+
+    def get_or_generate(self, prompt_filename: str, input_text: str, generate: Callable[[], T]) -> T:
+        """Return a cached generation for the inputs or call `generate` and cache its result."""
+
+        key = self.key(prompt_filename, input_text)
+        with self._lock:
+            variants = self._read_variants(key)
+            required_variants = 1 if self.mode == "exact" else self.variants
+            if len(variants) >= required_variants:
+                self.hits += 1
+                path = self._entry_path(key)
+                os.utime(path)  # mark as recently used, also for the next scan
+                entries = self._index()
+                if path in entries:
+                    entries.move_to_end(path)
+                print(f"Reusing cached generation for {prompt_filename}")
+                return variants[-1] if self.mode == "exact" else random.choice(variants)
+            self.misses += 1
+
+        generation = generate()
+
+        with self._lock:
+            variants = self._read_variants(key)  # could've been updated by a parallel generation
+            self._write_variants(key, variants + [generation])
+            self._evict()
+
+        return generation
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
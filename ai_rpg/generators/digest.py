@@ -0,0 +1,47 @@
+import hashlib
+import os
+from typing import Optional
+
+from ..paths import GENERATION_PATH
+from ..utils import format_duration_and_cost, get_llm_function, save_str
+
+PROMPT_FILENAME = "setup-digest.yaml"
+DIGEST_SUFFIX = ".digest.md"
+
+
+def digest_path(text: str, source: Optional[str] = None) -> str:
+    """The digest of a generation file is saved next to it, others are named after their content."""
+
+    if source is not None:
+        return os.path.join(GENERATION_PATH, f"{os.path.splitext(source)[0]}{DIGEST_SUFFIX}")
+    return os.path.join(
+        GENERATION_PATH, f"digest_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}{DIGEST_SUFFIX}"
+    )
+
+
+def generate_digest(text: str, kind: str, max_tokens: int, source: Optional[str] = None) -> str:
+    """
+    Compressed canonical digest of the world or story, generated once and reused while the text doesn't change.
+    `source` is the generation file the text was read from, if any.
+    """
+
+    path = digest_path(text, source)
+    header = f"<!-- digest of {hashlib.sha256(text.encode('utf-8')).hexdigest()} in {max_tokens} tokens -->\n"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        if content.startswith(header):
+            return content[len(header) :]
+    except FileNotFoundError:
+        pass
+
+    llm_func = get_llm_function(PROMPT_FILENAME, kind=kind, max_tokens=max_tokens)
+    print(f"Generating {kind} digest...")
+
+    llm_response = llm_func.execute_with_llm_response(user_message=text)
+    digest = llm_response.response
+
+    print(f"Generated {kind} digest {format_duration_and_cost(llm_response)}")
+    save_str(content=header + digest, path=path)
+
+    return digest
@@ -1,9 +1,12 @@
-from typing import Dict
+from typing import Dict, Optional
 
 from council.llm import JSONResponseParser, LLMParsingException
 from pydantic import Field
 
 from ..utils import format_duration_and_cost, get_llm_function, save_generation
+from .cache import GenerationCache
+
+PROMPT_FILENAME = "inventory-generation.yaml"
 
 
 class InventoryGenerationResponse(JSONResponseParser):
@@ -21,10 +24,14 @@ class InventoryGenerationResponse(JSONResponseParser):
             raise LLMParsingException("Inventory cannot contain items with zero or negative quantity")
 
 
-def generate_inventory(story: str) -> Dict[str, int]:
-    """Generate an initial inventory based on a story."""
+def generate_inventory(story: str, cache: Optional[GenerationCache] = None) -> Dict[str, int]:
+    """Generate an initial inventory based on a story, possibly reusing a cached one."""
+
+    if cache is not None:
+        return cache.get_or_generate(PROMPT_FILENAME, story, generate=lambda: generate_inventory(story))
+
     llm_func = get_llm_function(
-        "inventory-generation.yaml",
+        PROMPT_FILENAME,
         InventoryGenerationResponse.from_response,
         response_template=InventoryGenerationResponse.to_response_template(),
     )
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from council.llm import JSONResponseParser, LLMParsingException
+from pydantic import Field
+
+from ..inventory import item_key
+from ..paths import GENERATION_PATH
+from ..utils import format_duration_and_cost, get_llm_function, read_yaml, save_yaml
+
+ITEMS_PROMPT_FILENAME = "item-localization.yaml"
+TEXT_PROMPT_FILENAME = "setup-localization.yaml"
+
+_NON_WORD_PATTERN = re.compile(r"\W+")
+
+
+class ItemLocalizationResponse(JSONResponseParser):
+    item_names: Dict[str, str] = Field(
+        description="Dict[str, str], each item name exactly as given mapped to its translation."
+    )
+
+    def validator(self) -> None:
+        translations = self.item_names.values()  # pylint: disable=no-member
+        if len({item_key(name) for name in translations}) < len(self.item_names):
+            raise LLMParsingException("Each item must have a distinct translation")
+
+
+@dataclass
+class LocalizedSetup:
+    """World, story and starting inventory translated into a language, with the translations of item names."""
+
+    language: str
+    source: str  # hash of the setup it was translated from
+    world_description: str
+    story: str
+    starting_inventory: Dict[str, int]
+    item_names: Dict[str, str]  # name in the original setup -> localized name
+
+
+def localization_path(language: str, source_digest: str, source: Optional[str] = None) -> str:
+    """The localization of a story file is saved next to it, others are named after their content."""
+
+    suffix = f".{_NON_WORD_PATTERN.sub('-', language.casefold()).strip('-')}.yaml"
+    if source is not None:
+        return os.path.join(GENERATION_PATH, f"{os.path.splitext(source)[0]}{suffix}")
+    return os.path.join(GENERATION_PATH, f"localized_{source_digest[:16]}{suffix}")
+
+
+def localize_item_names(names: List[str], language: str) -> Dict[str, str]:
+    """Translations of the item names, names the model leaves out are kept as they are."""
+
+    if not names:
+        return {}
+    llm_func = get_llm_function(
+        ITEMS_PROMPT_FILENAME,
+        ItemLocalizationResponse.from_response,
+        language=language,
+        response_template=ItemLocalizationResponse.to_response_template(),
+    )
+    print(f"Translating item names into {language}...")
+
+    llm_response = llm_func.execute_with_llm_response(
+        user_message=json.dumps(names, ensure_ascii=False), response_format={"type": "json_object"}
+    )
+    translations = llm_response.response.item_names
+
+    print(f"Translated item names {format_duration_and_cost(llm_response)}")
+    return {name: translations.get(name) or name for name in names}
+
+
+def localize_text(text: str, kind: str, language: str, item_names: Dict[str, str]) -> str:
+    llm_func = get_llm_function(
+        TEXT_PROMPT_FILENAME,
+        kind=kind,
+        language=language,
+        item_names="\n".join(f"  - {name}: {localized}" for name, localized in item_names.items()) or "  - none",
+    )
+    print(f"Translating {kind} into {language}...")
+
+    llm_response = llm_func.execute_with_llm_response(user_message=text)
+
+    print(f"Translated {kind} {format_duration_and_cost(llm_response)}")
+    return llm_response.response
+
+
+def localize_setup(
+    world_description: str,
+    story: str,
+    starting_inventory: Dict[str, int],
+    language: str,
+    source: Optional[str] = None,
+) -> LocalizedSetup:
+    """
+    Translate the setup once per language, reusing the translation while the setup doesn't change.
+    `source` is the story file the setup was read from, if any. When it changes, items keep their earlier translations,
+    so item names stay the same across versions of the setup.
+    """
+
+    source_digest = hashlib.sha256(
+        json.dumps([world_description, story, starting_inventory], sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    path = localization_path(language, source_digest, source)
+    cached: Dict[str, Any] = read_yaml(path) if os.path.exists(path) else {}
+    if cached.get("source") == source_digest and cached.get("language") == language:
+        return LocalizedSetup(**cached)
+
+    known_names = cached.get("item_names", {}) if cached.get("language") == language else {}
+    item_names = {name: known_names[name] for name in starting_inventory if name in known_names}
+    item_names.update(localize_item_names([name for name in starting_inventory if name not in item_names], language))
+
+    localized_inventory: Dict[str, int] = {}
+    for name, amount in starting_inventory.items():
+        localized_inventory[item_names[name]] = localized_inventory.get(item_names[name], 0) + amount
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        world_future = executor.submit(localize_text, world_description, "world", language, item_names)
+        story_future = executor.submit(localize_text, story, "story", language, item_names)
+        localized = LocalizedSetup(
+            language=language,
+            source=source_digest,
+            world_description=world_future.result(),
+            story=story_future.result(),
+            starting_inventory=localized_inventory,
+            item_names=item_names,
+        )
+
+    save_yaml(content=asdict(localized), path=path)
+    return localized
@@ -0,0 +1,97 @@
+import glob
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from ..paths import GENERATION_PATH
+from ..utils import format_language_instructions, read_yaml, save_yaml, unique_filename
+from .inventory import generate_inventory
+from .starting_message import generate_starting_message
+from .story import generate_story
+from .world import generate_world
+
+POOL_PATH = os.path.join(GENERATION_PATH, "pool")
+USED_POOL_PATH = os.path.join(POOL_PATH, "used")
+
+
+@dataclass
+class GameBundle:
+    """Complete setup to start a game from: world, story, starting inventory and opening message."""
+
+    world_description: str
+    story: str
+    starting_inventory: Dict[str, int]
+    starting_message: str
+    language: Optional[str]
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "GameBundle":
+        data = read_yaml(path)
+        return cls(
+            world_description=data["world_description"],
+            story=data["story"],
+            starting_inventory=data["starting_inventory"],
+            starting_message=data["starting_message"],
+            language=data.get("language"),
+        )
+
+
+def generate_bundle(setting: str, language: Optional[str]) -> GameBundle:
+    """Run the whole generation pipeline: world -> story -> (inventory, starting message)."""
+
+    world_description = generate_world(setting)
+    story = generate_story(world_description)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # both only depend on the story, so they are generated at the same time
+        inventory_future = executor.submit(generate_inventory, story)
+        starting_message_future = executor.submit(
+            generate_starting_message, world_description, story, format_language_instructions(language)
+        )
+        return GameBundle(
+            world_description=world_description,
+            story=story,
+            starting_inventory=inventory_future.result(),
+            starting_message=starting_message_future.result(),
+            language=language,
+        )
+
+
+def save_bundle(bundle: GameBundle) -> str:
+    os.makedirs(POOL_PATH, exist_ok=True)
+    filename = unique_filename(path=POOL_PATH, prefix="bundle_", extension=".yaml")
+    save_yaml(content=asdict(bundle), path=os.path.join(POOL_PATH, filename))
+    return filename
+
+
+def pregenerate_bundles(count: int, setting: str, language: Optional[str], max_workers: int) -> List[str]:
+    """Generate `count` bundles in parallel into the pool, returns their filenames."""
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(generate_bundle, setting, language) for _ in range(count)]
+        return [save_bundle(future.result()) for future in futures]
+
+
+def take_bundle(language: Optional[str]) -> Optional[GameBundle]:
+    """
+    Take a random bundle for the given language out of the pool, None if there are none left.
+    Taken bundles are moved to the `used` subdirectory, so concurrent games never start from the same one.
+    """
+
+    candidates = glob.glob(os.path.join(POOL_PATH, "bundle_*.yaml"))
+    random.shuffle(candidates)
+    os.makedirs(USED_POOL_PATH, exist_ok=True)
+
+    for path in candidates:
+        try:
+            bundle = GameBundle.from_yaml(path)
+            if bundle.language != language:
+                continue
+            os.rename(path, os.path.join(USED_POOL_PATH, os.path.basename(path)))
+        except FileNotFoundError:
+            continue  # taken by another game in the meantime
+        print(f"Starting from pre-generated {os.path.basename(path)}")
+        return bundle
+
+    return None
@@ -0,0 +1,34 @@
+from typing import Optional
+
+from ..utils import format_duration_and_cost, get_llm_function
+from .cache import GenerationCache
+
+PROMPT_FILENAME = "starting-message.yaml"
+
+
+def generate_starting_message(
+    world_description: str, story: str, language_instructions: str = "", cache: Optional[GenerationCache] = None
+) -> str:
+    """Generate the opening message of the game based on the world and story, possibly reusing a cached one."""
+
+    if cache is not None:
+        return cache.get_or_generate(
+            PROMPT_FILENAME,
+            "\n".join([world_description, story, language_instructions]),
+            generate=lambda: generate_starting_message(world_description, story, language_instructions),
+        )
+
+    llm_func = get_llm_function(
+        PROMPT_FILENAME,
+        world_description=world_description,
+        story=story,
+        language_instructions=language_instructions,
+    )
+    print("Generating starting message...")
+
+    llm_response = llm_func.execute_with_llm_response()
+    starting_message = llm_response.response
+
+    print(f"Generated starting message {format_duration_and_cost(llm_response)}")
+
+    return starting_message
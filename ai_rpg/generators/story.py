@@ -1,10 +1,20 @@
+from typing import Optional
+
 from ..utils import format_duration_and_cost, get_llm_function, save_generation
+from .cache import GenerationCache
+
+PROMPT_FILENAME = "story-generation.yaml"
+
 
+def generate_story(world_description: str, cache: Optional[GenerationCache] = None) -> str:
+    """Generate a story based on a world description, possibly reusing a cached one."""
 
-def generate_story(world_description: str) -> str:
-    """Generate a story based on a world description."""
+    if cache is not None:
+        return cache.get_or_generate(
+            PROMPT_FILENAME, world_description, generate=lambda: generate_story(world_description)
+        )
 
-    llm_func = get_llm_function("story-generation.yaml")
+    llm_func = get_llm_function(PROMPT_FILENAME)
     print("Generating main character and story...")
 
     llm_response = llm_func.execute_with_llm_response(user_message=world_description)
@@ -1,10 +1,18 @@
+from typing import Optional
+
 from ..utils import format_duration_and_cost, get_llm_function, save_generation
+from .cache import GenerationCache
+
+PROMPT_FILENAME = "world-generation.yaml"
+
 
+def generate_world(setting: str, cache: Optional[GenerationCache] = None) -> str:
+    """Generate a world description, possibly reusing a cached one."""
 
-def generate_world(setting: str) -> str:
-    """Generate a world description."""
+    if cache is not None:
+        return cache.get_or_generate(PROMPT_FILENAME, setting, generate=lambda: generate_world(setting))
 
-    llm_func = get_llm_function("world-generation.yaml")
+    llm_func = get_llm_function(PROMPT_FILENAME)
     print("Generating world description...")
 
     llm_response = llm_func.execute_with_llm_response(user_message=setting)
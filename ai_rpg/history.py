@@ -0,0 +1,105 @@
+from typing import Any, Callable, Dict, List, Sequence
+
+from council.llm import LLMFunction, LLMFunctionResponse, LLMMessage, LLMMessageRole
+
+from .config import HistoryConfig
+from .prompts import PromptTemplate
+from .tokens import count_tokens
+
+
+class HistoryCompressor:
+    """
+    Keeps the game master's context bounded for long sessions.
+
+    The latest turns are sent verbatim, older turns are folded into a "story so far" summary.
+    The summary is cached and only refreshed once enough turns have accumulated outside the verbatim window.
+    """
+
+    SUMMARY_HEADER = "# Story So Far"
+
+    def __init__(
+        self,
+        config: HistoryConfig,
+        summary_llm_func: LLMFunction[str],
+        summary_user_prompt_template: PromptTemplate,
+        on_llm_response: Callable[[LLMFunctionResponse], None],
+    ):
+        self.config = config
+        self.summary_llm_func = summary_llm_func
+        self.summary_user_prompt_template = summary_user_prompt_template
+        self.on_llm_response = on_llm_response
+
+        self.summary = ""
+        self.summarized_messages = 0  # number of history messages already folded into the summary
+
+    def reset(self) -> None:
+        self.summary = ""
+        self.summarized_messages = 0
+
+    @staticmethod
+    def _format_events(history: Sequence[Dict[str, Any]]) -> str:
+        return "\n\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in history)
+
+    def _fold(self, history: List[Dict[str, Any]], until: int) -> None:
+        """Fold history[self.summarized_messages:until] into the summary."""
+        if until <= self.summarized_messages:
+            return
+
+        user_message = self.summary_user_prompt_template.format(
+            summary=self.summary or "Nothing happened yet.",
+            events=self._format_events(history[self.summarized_messages : until]),
+        )
+        llm_response = self.summary_llm_func.execute_with_llm_response(user_message=user_message)
+        self.on_llm_response(llm_response)
+
+        self.summary = llm_response.response
+        self.summarized_messages = until
+
+    def _verbatim_start(self, history: List[Dict[str, Any]]) -> int:
+        return max(0, len(history) - 2 * self.config.verbatim_turns)
+
+    def _to_messages(self, history: List[Dict[str, Any]]) -> List[LLMMessage]:
+        messages = []
+        if self.summary:
+            messages.append(LLMMessage.user_message(f"{self.SUMMARY_HEADER}\n\n{self.summary}"))
+        messages.extend(
+            LLMMessage(role=LLMMessageRole(m["role"]), content=m["content"])
+            for m in history[self.summarized_messages :]
+        )
+        return messages
+
+    @staticmethod
+    def _count_tokens(messages: List[LLMMessage]) -> int:
+        return sum(count_tokens(message.content) for message in messages)
+
+    def to_messages(self, history: List[Dict[str, Any]]) -> List[LLMMessage]:
+        """Convert a Gradio-style chat history into a bounded list of LLMMessage objects."""
+
+        if len(history) < self.summarized_messages:
+            # history was edited or belongs to a new game, cached summary is no longer valid
+            self.reset()
+
+        verbatim_start = self._verbatim_start(history)
+        if verbatim_start - self.summarized_messages >= 2 * self.config.summary_refresh_turns:
+            self._fold(history, until=verbatim_start)
+
+        messages = self._to_messages(history)
+        if self._count_tokens(messages) <= self.config.max_tokens:
+            return messages
+
+        # over budget between refreshes: fold everything outside the verbatim window right away
+        self._fold(history, until=verbatim_start)
+        messages = self._to_messages(history)
+
+        # still over budget: drop the oldest verbatim messages, keeping the summary and the latest exchange
+        first_verbatim = 1 if self.summary else 0
+        while self._count_tokens(messages) > self.config.max_tokens and len(messages) - first_verbatim > 2:
+            messages.pop(first_verbatim)
+
+        return messages
+
+    def shorten(self, messages: List[LLMMessage], turns: int) -> List[LLMMessage]:
+        """Messages of `to_messages` cut down to the summary and the latest `turns` exchanges, to save tokens."""
+
+        first_verbatim = 1 if self.summary else 0
+        return messages[:first_verbatim] + messages[max(first_verbatim, len(messages) - 2 * turns) :]
@@ -0,0 +1,172 @@
+import difflib
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from .response import InventoryChange
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_item_name(name: str) -> str:
+    """Fold case, Unicode compatibility forms, accents and whitespace, so spelling variants of a name match."""
+
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WHITESPACE_PATTERN.sub(" ", without_accents.casefold()).strip()
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or not word.isalpha() or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return f"{word[:-3]}y"
+    if word.endswith(("sses", "ches", "shes", "xes", "zes")):
+        return word[:-2]
+    return word[:-1] if word.endswith("s") else word
+
+
+def item_key(name: str) -> str:
+    """Normalized name with each word in the singular, so "Torches" and "torch" are the same item."""
+    return " ".join(_singular(word) for word in normalize_item_name(name).split(" "))
+
+
+def _is_misspelling(key: str, other: str, cutoff: float) -> bool:
+    """
+    Whether two item keys only differ by typos in their longer words,
+    numbers and short words must match exactly so "Key to Room 13" isn't "Key to Room 12" nor "Iron Key" "Iron Keg".
+    """
+
+    words, other_words = key.split(" "), other.split(" ")
+    if len(words) != len(other_words):
+        return False
+    for word, other_word in zip(words, other_words):
+        if word == other_word:
+            continue
+        if min(len(word), len(other_word)) < Inventory.FUZZY_MIN_WORD_LENGTH or not (
+            word.isalpha() and other_word.isalpha()
+        ):
+            return False
+        if difflib.SequenceMatcher(None, word, other_word).ratio() < cutoff:
+            return False
+    return True
+
+
+class InventoryError(ValueError):
+    """Raised when a batch of inventory changes can't be applied."""
+
+
+class Inventory:
+    """
+    Manages the player's in-game inventory.
+
+    Items are indexed by their normalized singular name, so changes to "healing potion" or "Healing  Potions"
+    apply to an existing "Healing Potion" instead of creating a duplicate.
+    Misspelled names are only matched when removing items, an addition that isn't an exact match is a new item.
+    Changes are applied in atomic batches: either all changes of a response are valid and applied, or none.
+    Aliases map other names of items to the names shown, e.g. their names in the setup before it was translated.
+    """
+
+    FUZZY_MATCH_CUTOFF = 0.8  # minimal similarity of each misspelled word to match an item
+    FUZZY_MIN_WORD_LENGTH = 5  # shorter words must be spelled right, "key" and "keg" are different items
+
+    def __init__(self, items: Dict[str, int], aliases: Optional[Dict[str, str]] = None):
+        self._items: Dict[str, int] = {}
+        self._index: Dict[str, str] = {}  # item key -> name as displayed
+        self._aliases = {item_key(alias): name for alias, name in (aliases or {}).items()}
+        self._formatted: Optional[str] = None
+        for name, amount in items.items():
+            if amount > 0:
+                self._items[name] = amount
+                self._index[item_key(name)] = name
+
+    @property
+    def items(self) -> Dict[str, int]:
+        return dict(self._items)
+
+    def resolve(self, name: str, fuzzy: bool = False) -> Optional[str]:
+        """Name of the existing item the given name refers to, if any, `fuzzy` also matches misspellings of it."""
+
+        key = item_key(name)
+        if key in self._aliases:
+            key = item_key(self._aliases[key])
+        if key in self._index:
+            return self._index[key]
+        if not fuzzy:
+            return None
+        candidates = [other for other in self._index if _is_misspelling(key, other, self.FUZZY_MATCH_CUTOFF)]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda other: difflib.SequenceMatcher(None, key, other).ratio())
+        return self._index[best]
+
+    def validate(self, changes: List[InventoryChange]) -> List[InventoryChange]:
+        """
+        Resolve names of the changes to existing items and check that the batch can be applied as a whole,
+        raises InventoryError if it would remove items the player doesn't have.
+        """
+
+        resolved: List[InventoryChange] = []
+        amounts: Dict[str, int] = {}
+        batch_index: Dict[str, str] = {}  # new items added earlier in the same batch
+        for change in changes:
+            if change.amount == 0:
+                continue
+            key = item_key(change.name)
+            name = (
+                self.resolve(change.name, fuzzy=change.amount < 0)
+                or batch_index.get(key)
+                or self._aliases.get(key)
+                or change.name.strip()
+            )
+            batch_index[item_key(name)] = name
+            amount = amounts.get(name, self._items.get(name, 0)) + change.amount
+            if amount < 0:
+                available = amounts.get(name, self._items.get(name, 0))
+                raise InventoryError(
+                    f"Can't change '{change.name}' by {change.amount:+d}, the player has {available} of it"
+                )
+            amounts[name] = amount
+            resolved.append(InventoryChange(name=name, amount=change.amount))
+        return resolved
+
+    def update(self, changes: List[InventoryChange]) -> List[InventoryChange]:
+        """Apply a batch of changes atomically, returns them with names resolved to existing items."""
+
+        resolved = self.validate(changes)
+        for change in resolved:
+            amount = self._items.get(change.name, 0) + change.amount
+            if amount > 0:
+                self._items[change.name] = amount
+                self._index[item_key(change.name)] = change.name
+            else:
+                self._items.pop(change.name, None)
+                self._index.pop(item_key(change.name), None)
+        if resolved:
+            self._formatted = None
+        return resolved
+
+    def format(self) -> str:
+        """String representation of the inventory contents, rendered again only once they change."""
+
+        if self._formatted is None:
+            if not self._items:
+                self._formatted = "Inventory is empty."
+            else:
+                self._formatted = "\n".join(
+                    ["Inventory content:", *[f"- {item}: {amount}" for item, amount in self._items.items()]]
+                )
+        return self._formatted
+
+    @staticmethod
+    def format_changes(changes: List[InventoryChange]) -> str:
+        """Format a sequence of inventory changes as a string."""
+
+        if not changes:
+            return ""
+        return "\n".join(
+            [
+                "Your inventory has changed:",
+                *[f"- {change.name}: {change.amount:+d}" for change in changes],
+            ]
+        )
@@ -0,0 +1,320 @@
+import itertools
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .config import SavesConfig
+from .paths import GENERATION_PATH
+from .response import InventoryChange
+from .utils import save_generation, unique_filename
+
+SAVES_PATH = os.path.join(GENERATION_PATH, "saves")
+
+# Size of blocks the journal is read backwards in
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def encode_record(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def read_journal(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.loads(f.readline())
+
+
+def iter_records_reversed(path: str, end: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (offset, record) pairs from `end` (the end of the file by default) backwards,
+    reading blocks of the file so only the part that is iterated over is ever read.
+    """
+
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END) if end is None else end
+        remainder = b""
+        while position > 0:
+            read_size = min(READ_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b"\n")
+            offsets = list(itertools.accumulate((len(line) + 1 for line in lines[:-1]), initial=position))
+            # the first line may start in the previous block, unless it's the start of the file
+            first = 0 if position == 0 else 1
+            remainder = lines[0]
+            for offset, line in reversed(list(zip(offsets[first:], lines[first:]))):
+                if line.strip():
+                    yield offset, json.loads(line)
+
+
+def compact_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop all snapshots but the latest one, the rest of the records are kept in order."""
+
+    snapshot_indices = [i for i, record in enumerate(records) if record["type"] == "snapshot"]
+    superseded = set(snapshot_indices[:-1])
+    return [record for i, record in enumerate(records) if i not in superseded]
+
+
+class SessionJournal:
+    """
+    Append-only save of a single session, one compact JSON record per line.
+
+    The header with the world, story and starting inventory is written once,
+    then each turn adds a record with the player's action, the roll, the response and inventory changes,
+    and each save as well as every `snapshot_every` turns add a snapshot of the state, so games can be resumed quickly.
+    With autosave, records are appended as they come and fsynced in batches of `fsync_every`,
+    otherwise they are kept in memory until the next `save`.
+    The file is kept open for appending until the journal is closed.
+    """
+
+    def __init__(self, path: str, config: SavesConfig, turns: int = 0, turns_since_snapshot: int = 0):
+        self.path = path
+        self.autosave = config.autosave
+        self.fsync_every = config.fsync_every
+        self.snapshot_every = config.snapshot_every
+        self.turns = turns
+        self.turns_since_snapshot = turns_since_snapshot
+        self._pending: List[str] = []
+        self._unsynced = 0
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.path)
+
+    @classmethod
+    def create(
+        cls, session_id: str, header: Dict[str, Any], config: SavesConfig, saves_path: str = SAVES_PATH
+    ) -> "SessionJournal":
+        os.makedirs(saves_path, exist_ok=True)
+        filename = unique_filename(path=saves_path, prefix=f"game_{session_id[:8]}_", extension=".jsonl")
+        journal = cls(os.path.join(saves_path, filename), config)
+        journal.append({"type": "header", "timestamp": datetime.now().isoformat(), **header})
+        journal.flush(fsync=True)
+        return journal
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(encode_record(record))
+            self._unsynced += 1
+            if self.autosave:
+                self._flush(fsync=self._unsynced >= self.fsync_every)
+
+    def append_turn(
+        self, action: str, roll: int, response: str, inventory_changes: List[InventoryChange], total_cost: float
+    ) -> None:
+        """Append a turn, `total_cost` is the cost of the game so far so it's known without a snapshot."""
+
+        record: Dict[str, Any] = {
+            "type": "turn",
+            "action": action,
+            "roll": roll,
+            "response": response,
+            "total_cost": total_cost,
+        }
+        if inventory_changes:
+            record["inventory_changes"] = [{"name": c.name, "amount": c.amount} for c in inventory_changes]
+        self.append(record)
+        self.turns += 1
+        self.turns_since_snapshot += 1
+
+    @property
+    def snapshot_due(self) -> bool:
+        return self.turns_since_snapshot >= self.snapshot_every
+
+    def append_snapshot(
+        self, inventory: Dict[str, int], total_cost: float, history_summary: str, summarized_turns: int
+    ) -> None:
+        """
+        Snapshot the state that can't be cheaply rebuilt from the latest turns,
+        `summarized_turns` is the number of first turns covered by `history_summary`.
+        """
+
+        self.append(
+            {
+                "type": "snapshot",
+                "timestamp": datetime.now().isoformat(),
+                "turn": self.turns,
+                "inventory": inventory,
+                "total_cost": total_cost,
+                "history_summary": history_summary,
+                "summarized_turns": summarized_turns,
+            }
+        )
+        self.turns_since_snapshot = 0
+
+    def flush(self, fsync: bool) -> None:
+        with self._lock:
+            self._flush(fsync)
+
+    def _flush(self, fsync: bool) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.writelines(self._pending)
+        self._pending = []
+        # readers of the journal such as the pager and exports see every flushed record
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def save(self) -> None:
+        """Write all pending records and make sure they're on disk."""
+        self.flush(fsync=True)
+
+    def close(self) -> None:
+        """Save and close the file, a record appended later reopens it."""
+
+        with self._lock:
+            self._flush(fsync=True)
+            self._close_file()
+
+    def compact(self) -> None:
+        """Rewrite the journal without superseded snapshots, atomically replacing the file."""
+
+        with self._lock:
+            self._flush(fsync=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(encode_record(record) for record in compact_records(read_journal(self.path)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # the open handle still points to the replaced file
+            self._close_file()
+
+
+@dataclass
+class ResumedState:
+    """State of a saved game, rebuilt from its header, latest snapshot and the turns after it."""
+
+    path: str
+    header: Dict[str, Any]
+    inventory: Dict[str, int]
+    total_cost: float
+    turns: int
+    turns_since_snapshot: int
+    history_summary: str
+    summarized_turns: int
+    tail: List[Dict[str, Any]]  # turn records not covered by the summary
+    tail_offset: int  # offset of the first tail record, earlier turns are paged in from there
+
+
+def load_resumed_state(path: str) -> ResumedState:
+    """
+    Rebuild the state of a saved game by reading the journal backwards only down to its latest snapshot
+    and the turns the snapshot's summary doesn't cover.
+    With periodic snapshots, this doesn't depend on the length of the game.
+    """
+
+    header = read_header(path)
+    tail: List[Dict[str, Any]] = []
+    tail_offset = os.path.getsize(path)
+    snapshot: Optional[Dict[str, Any]] = None
+    latest_cost: Optional[float] = None
+    turns_after_snapshot = 0
+    for offset, record in iter_records_reversed(path):
+        if latest_cost is None:
+            latest_cost = record.get("total_cost")
+        if record["type"] == "snapshot":
+            snapshot = snapshot or record
+        elif record["type"] == "turn":
+            if snapshot is None:
+                turns_after_snapshot += 1
+            elif snapshot["turn"] - (len(tail) - turns_after_snapshot) <= snapshot["summarized_turns"]:
+                break  # everything earlier is covered by the summary
+            tail.append(record)
+            tail_offset = offset
+    tail.reverse()
+
+    if snapshot is None:
+        # no snapshot yet, the whole game is in the tail
+        inventory, total_cost, history_summary, summarized_turns = dict(header["starting_inventory"]), 0.0, "", 0
+        turns = len(tail)
+    else:
+        inventory, total_cost = dict(snapshot["inventory"]), snapshot["total_cost"]
+        history_summary, summarized_turns = snapshot["history_summary"], snapshot["summarized_turns"]
+        turns = snapshot["turn"] + turns_after_snapshot
+
+    if latest_cost is not None:
+        # turns of earlier journals don't record the cost, it's the one of their latest snapshot
+        total_cost = latest_cost
+
+    for record in tail[len(tail) - turns_after_snapshot :]:
+        for change in record.get("inventory_changes", []):
+            inventory[change["name"]] = inventory.get(change["name"], 0) + change["amount"]
+
+    return ResumedState(
+        path=path,
+        header=header,
+        inventory=inventory,
+        total_cost=total_cost,
+        turns=turns,
+        turns_since_snapshot=turns_after_snapshot,
+        history_summary=history_summary,
+        summarized_turns=summarized_turns,
+        tail=tail,
+        tail_offset=tail_offset,
+    )
+
+
+def turn_messages(turns: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Chat messages of turn records, the player's action followed by the response."""
+    return [
+        message
+        for turn in turns
+        for message in [{"role": "user", "content": turn["action"]}, {"role": "assistant", "content": turn["response"]}]
+    ]
+
+
+def read_turns_before(path: str, offset: int, count: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Page in up to `count` turns recorded before `offset`, returns them in order with the offset of the first one."""
+
+    turns: List[Dict[str, Any]] = []
+    for record_offset, record in iter_records_reversed(path, end=offset):
+        if len(turns) == count:
+            break
+        if record["type"] == "turn":
+            turns.append(record)
+            offset = record_offset
+    turns.reverse()
+    return turns, offset
+
+
+def export_game_state(path: str, prefix: Optional[str] = None) -> str:
+    """Export a journal into the full YAML game state format used by earlier saves, returns its filename."""
+
+    records = read_journal(path)
+    header = records[0]
+    snapshots = [record for record in records if record["type"] == "snapshot"]
+    history = []
+    total_cost = 0.0
+    for record in records:
+        # turns record the cost so far, the ones after the latest snapshot are counted too
+        total_cost = record.get("total_cost", total_cost)
+        if record["type"] == "turn":
+            history.append({"role": "user", "content": record["action"]})
+            history.append({"role": "assistant", "content": record["response"]})
+
+    game_state = {
+        "timestamp": snapshots[-1]["timestamp"] if snapshots else header["timestamp"],
+        "total_cost": total_cost,
+        "world_description": header["world_description"],
+        "story": header["story"],
+        "starting_inventory": header["starting_inventory"],
+        "history": history,
+    }
+    return save_generation(content=game_state, prefix=prefix or "game_state_")
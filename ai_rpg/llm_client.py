@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Final, Iterator, List, Optional, Protocol, Sequence, cast, runtime_checkable
+
+import httpx
+from council.contexts import Consumption, LLMContext
+from council.llm import (
+    LLMBase,
+    LLMCallException,
+    LLMCallTimeoutException,
+    LLMFallback,
+    LLMMessage,
+    LLMMessageTokenCounterBase,
+    LLMResult,
+    OpenAILLM,
+)
+from council.llm.base.providers.openai.openai_chat_completions_llm import OpenAIChatCompletionsModel
+from council.llm.base.providers.openai.openai_chat_gpt_configuration import OpenAIChatGPTConfiguration
+from council.llm.base.providers.openai.openai_llm_cost import OpenAIConsumptionCalculator, Usage
+
+# Connection pool limits of the shared HTTP client
+MAX_CONNECTIONS: Final[int] = 100
+MAX_KEEPALIVE_CONNECTIONS: Final[int] = 20
+
+
+class PooledOpenAIProvider:
+    """
+    OpenAI chat completions provider that reuses connections of a single httpx.Client.
+
+    Council's OpenAILLM opens a new client (and TLS connection) for every request,
+    which adds a handshake to each turn and doesn't scale to many concurrent sessions.
+    """
+
+    def __init__(self, config: OpenAIChatGPTConfiguration, name: Optional[str] = None):
+        self.config = config
+        self._name = name
+        self._headers = {"Authorization": f"Bearer {config.api_key.unwrap()}", "Content-Type": "application/json"}
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    timeout=self.config.timeout.unwrap(),
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+                    ),
+                )
+            return self._client
+
+    @property
+    def uri(self) -> str:
+        return self.config.api_host.unwrap() + "/v1/chat/completions"
+
+    def post_request(self, payload: dict[str, Any]) -> httpx.Response:
+        try:
+            return self.client.post(url=self.uri, headers=self._headers, json=payload)
+        except httpx.TimeoutException as e:
+            raise LLMCallTimeoutException(timeout=self.config.timeout.unwrap(), llm_name=self._name) from e
+        except httpx.HTTPStatusError as e:
+            raise LLMCallException(code=e.response.status_code, error=e.response.text, llm_name=self._name) from e
+
+    def stream_request(self, payload: dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Post a streaming request and yield the parsed server-sent event chunks."""
+        try:
+            with self.client.stream("POST", url=self.uri, headers=self._headers, json=payload) as response:
+                if response.status_code != httpx.codes.OK:
+                    response.read()
+                    raise LLMCallException(code=response.status_code, error=response.text, llm_name=self._name)
+
+                for line in response.iter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[len("data: ") :]
+                    if data == "[DONE]":
+                        return
+                    yield json.loads(data)
+        except httpx.TimeoutException as e:
+            raise LLMCallTimeoutException(timeout=self.config.timeout.unwrap(), llm_name=self._name) from e
+
+
+class LLMStream:
+    """
+    Iterable over text deltas of a streamed completion.
+    Full text and consumptions are available once the stream is exhausted.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.consumptions: List[Consumption] = []
+
+    def __iter__(self) -> Iterator[str]:
+        for delta in self._iter_deltas():
+            self.text += delta
+            yield delta
+
+    def _iter_deltas(self) -> Iterator[str]:
+        raise NotImplementedError()
+
+
+class ObservedLLMStream(LLMStream):
+    """
+    Stream passing the deltas of another one through, `on_done` is called with the stream once it's exhausted,
+    or with the exception it failed with. Streams consumed only in part are never reported.
+    """
+
+    def __init__(self, stream: LLMStream, on_done: Callable[["ObservedLLMStream", Optional[Exception]], None]):
+        super().__init__()
+        self._stream = stream
+        self._on_done = on_done
+
+    def _iter_deltas(self) -> Iterator[str]:
+        try:
+            yield from self._stream
+        except Exception as e:
+            self._on_done(self, e)
+            raise
+        self.consumptions = self._stream.consumptions
+        self._on_done(self, None)
+
+
+class CompletedLLMStream(LLMStream):
+    """Stream of a non-streaming LLM: the whole completion comes as a single delta."""
+
+    def __init__(self, result: LLMResult):
+        super().__init__()
+        self._result = result
+        self.consumptions = list(result.consumptions)
+
+    def _iter_deltas(self) -> Iterator[str]:
+        yield self._result.first_choice
+
+
+class OpenAILLMStream(LLMStream):
+    def __init__(self, provider: PooledOpenAIProvider, payload: Dict[str, Any]):
+        super().__init__()
+        self._provider = provider
+        self._payload = payload
+
+    def _iter_deltas(self) -> Iterator[str]:
+        start = time.time()
+        model, usage = "", None
+        for chunk in self._provider.stream_request(self._payload):
+            model = chunk.get("model") or model
+            usage = chunk.get("usage") or usage
+            for choice in chunk.get("choices", []):
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    yield content
+
+        if usage is not None:
+            calculator = OpenAIConsumptionCalculator(model)
+            self.consumptions = calculator.get_consumptions(time.time() - start, Usage.from_dict(usage))
+
+
+@runtime_checkable
+class StreamingLLM(Protocol):
+    def stream_chat_request(self, messages: Sequence[LLMMessage], **kwargs: Any) -> LLMStream: ...
+
+
+class PooledOpenAILLM(OpenAIChatCompletionsModel):
+    """OpenAI LLM on top of a pooled HTTP client, with support for streaming completions."""
+
+    def __init__(
+        self,
+        config: OpenAIChatGPTConfiguration,
+        token_counter: Optional[LLMMessageTokenCounterBase],
+        name: Optional[str] = None,
+    ):
+        self.pooled_provider = PooledOpenAIProvider(config, name)
+        super().__init__(config, self.pooled_provider.post_request, token_counter=token_counter, name=name)
+
+    def stream_chat_request(self, messages: Sequence[LLMMessage], **kwargs: Any) -> LLMStream:
+        payload = self._build_payload(messages)
+        payload.update(kwargs)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        return OpenAILLMStream(self.pooled_provider, payload)
+
+
+def stream_chat_request(llm: LLMBase, messages: Sequence[LLMMessage], **kwargs: Any) -> LLMStream:
+    """
+    Stream a completion from LLMs that support it,
+    others return their whole completion as a single delta once it's ready.
+    """
+
+    if isinstance(llm, StreamingLLM):
+        return llm.stream_chat_request(messages, **kwargs)
+
+    return CompletedLLMStream(llm.post_chat_request(LLMContext.empty(), messages, **kwargs))
+
+
+def with_connection_pool(llm: LLMBase) -> LLMBase:
+    """Rebuild OpenAI LLMs (including ones behind a fallback) on top of a pooled HTTP client."""
+
+    if isinstance(llm, LLMFallback):
+        retry_before_fallback = llm._retry_before_fallback  # pylint: disable=protected-access
+        return LLMFallback(with_connection_pool(llm.llm), with_connection_pool(llm.fallback), retry_before_fallback)
+
+    if not isinstance(llm, OpenAILLM):
+        return llm
+
+    return PooledOpenAILLM(
+        cast(OpenAIChatGPTConfiguration, llm.configuration),
+        token_counter=llm._token_counter,  # pylint: disable=protected-access
+        name=llm._name,  # pylint: disable=protected-access
+    )
@@ -0,0 +1,278 @@
+import atexit
+import glob
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from council.llm import ExecuteLLMRequest, LLMBase, LLMMessage, LLMMessageRole, LLMRequest, LLMResponse
+
+from .config import LLMLoggingConfig
+from .llm_client import LLMStream, ObservedLLMStream
+
+LOG_FILE_PREFIX = "llm_"
+LOG_FILE_EXTENSION = ".jsonl.gz"
+
+# Streams whose latest messages are remembered to log only what was added, least recently logged are forgotten
+MAX_TRACKED_STREAMS = 1024
+
+_Message = Tuple[str, str]  # role and content
+
+
+@dataclass
+class LLMCallRecord:
+    """A call handed to the writer, messages are kept as references and only serialized in the background."""
+
+    component: str
+    stream: str
+    messages: List[LLMMessage]
+    start: float
+    duration: float
+    response: Optional[str] = None
+    consumptions: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class _StreamState:
+    system: Optional[str]  # system prompt of the latest logged call, compared by identity first
+    system_hash: Optional[str]
+    messages: List[_Message]
+
+
+class LLMLogWriter:
+    """
+    Writes LLM calls into gzip-compressed JSONL files from a background thread.
+
+    Turns only put a record into a bounded queue. Once the queue is fuller than `sample_above`, only every
+    `sample_every`-th record is kept, and records are dropped when it's full, so logging never slows turns down.
+    Each system prompt is written once per file and referenced by its hash, and each call only logs the messages
+    added since the previous call of its stream, e.g. the new turn of a session.
+    Files are rotated once they reach `max_file_mb` of uncompressed JSON, only the latest `max_files` are kept.
+    """
+
+    def __init__(self, config: LLMLoggingConfig, path: str):
+        self.config = config
+        self.path = path
+        self.max_file_bytes = int(config.max_file_mb * 1024 * 1024)
+
+        self.written = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self._submissions = itertools.count(1)
+        self._queue: "queue.Queue[Optional[LLMCallRecord]]" = queue.Queue(maxsize=config.queue_size)
+        self._file: Optional[IO[str]] = None
+        self._file_bytes = 0
+        self._system_prompts: Set[str] = set()  # hashes already written to the current file
+        self._streams: "OrderedDict[str, _StreamState]" = OrderedDict()
+        self._thread = threading.Thread(target=self._run, name="ai-rpg-llm-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, record: LLMCallRecord) -> bool:
+        """Queue a record without blocking, False if it was sampled out or dropped."""
+
+        submission = next(self._submissions)
+        if self._queue.qsize() > self.config.sample_above * self.config.queue_size:
+            if submission % self.config.sample_every:
+                self.sampled_out += 1
+                return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write the queued records and close the current file."""
+
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                record = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self._flush()
+                continue
+            if record is None:
+                break
+            try:
+                self._write(record)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Failed to write an LLM log record: {e!r}")
+            if self._queue.empty():
+                self._flush()  # readable up to here even if the process dies
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            self._file.buffer.flush(zlib.Z_SYNC_FLUSH)  # type: ignore[attr-defined]
+
+    def _write_line(self, data: Dict[str, Any]) -> None:
+        line = json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+        assert self._file is not None
+        self._file.write(line)
+        self._file_bytes += len(line)
+
+    def _open_file(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        timestamp = time.strftime("%Y-%m-%d_%H-%M-%S")
+        for i in itertools.count():
+            path = os.path.join(self.path, f"{LOG_FILE_PREFIX}{timestamp}{f'_{i}' if i else ''}{LOG_FILE_EXTENSION}")
+            try:
+                self._file = gzip.open(path, "xt", encoding="utf-8")
+                break
+            except FileExistsError:
+                continue
+        self._file_bytes = 0
+        # every file can be read on its own
+        self._system_prompts.clear()
+        self._streams.clear()
+        self._remove_old_files()
+
+    def _remove_old_files(self) -> None:
+        paths = sorted(
+            glob.glob(os.path.join(self.path, f"{LOG_FILE_PREFIX}*{LOG_FILE_EXTENSION}")), key=os.path.getmtime
+        )
+        for path in paths[: max(len(paths) - self.config.max_files, 0)]:
+            os.remove(path)
+
+    def _write(self, record: LLMCallRecord) -> None:
+        if self._file is not None and self._file_bytes >= self.max_file_bytes:
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self._open_file()
+
+        system = next((m.content for m in record.messages if m.is_of_role(LLMMessageRole.System)), None)
+        messages = [(m.role.value, m.content) for m in record.messages if not m.is_of_role(LLMMessageRole.System)]
+
+        state = self._streams.pop(record.stream, None)
+        if state is not None and state.system is system:
+            system_hash = state.system_hash
+        else:
+            system_hash = hashlib.sha256(system.encode("utf-8")).hexdigest()[:16] if system is not None else None
+        if system_hash is not None and system_hash not in self._system_prompts:
+            self._write_line({"type": "system_prompt", "hash": system_hash, "content": system})
+            self._system_prompts.add(system_hash)
+
+        reused = 0
+        if state is not None and state.system_hash == system_hash:
+            for previous, current in zip(state.messages, messages):
+                if previous != current:
+                    break
+                reused += 1
+        self._streams[record.stream] = _StreamState(system=system, system_hash=system_hash, messages=messages)
+        if len(self._streams) > MAX_TRACKED_STREAMS:
+            self._streams.popitem(last=False)
+
+        self._write_line(
+            {
+                "type": "call",
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.start)),
+                "component": record.component,
+                "stream": record.stream,
+                "system_prompt": system_hash,
+                "reused_messages": reused,
+                "messages": [{"role": role, "content": content} for role, content in messages[reused:]],
+                "response": record.response,
+                "duration": round(record.duration, 4),
+                "consumptions": record.consumptions,
+                "error": record.error,
+            }
+        )
+        self.written += 1
+
+
+class AsyncLLMLoggingMiddleware:
+    """Logs LLM calls through the shared background writer, each middleware is a stream of related calls."""
+
+    _stream_ids = itertools.count()
+
+    def __init__(self, writer: LLMLogWriter, component_name: str):
+        self.writer = writer
+        self.component_name = component_name
+        self.stream = f"{component_name}-{next(self._stream_ids)}"
+
+    def __call__(self, llm: LLMBase, execute: ExecuteLLMRequest, request: LLMRequest) -> LLMResponse:
+        start = time.time()
+        record = LLMCallRecord(
+            component=self.component_name,
+            stream=self.stream,
+            messages=list(request.messages),
+            start=start,
+            duration=0.0,
+        )
+        try:
+            response = execute(request)
+        except Exception as e:
+            record.duration = time.time() - start
+            record.error = repr(e)
+            self.writer.submit(record)
+            raise
+
+        record.duration = response.duration
+        if response.has_result:
+            record.response = response.result.first_choice
+            record.consumptions = [
+                {"kind": c.kind, "value": c.value, "unit": c.unit} for c in response.result.consumptions
+            ]
+        self.writer.submit(record)
+        return response
+
+    def log_stream(self, messages: Sequence[LLMMessage], stream: LLMStream) -> LLMStream:
+        """Log a streamed call once it's complete or failed, like the calls going through the middleware."""
+
+        record = LLMCallRecord(
+            component=self.component_name,
+            stream=self.stream,
+            messages=list(messages),
+            start=time.time(),
+            duration=0.0,
+        )
+
+        def on_done(done: LLMStream, error: Optional[Exception]) -> None:
+            record.duration = time.time() - record.start
+            if error is not None:
+                record.error = repr(error)
+            else:
+                record.response = done.text
+                record.consumptions = [{"kind": c.kind, "value": c.value, "unit": c.unit} for c in done.consumptions]
+            self.writer.submit(record)
+
+        return ObservedLLMStream(stream, on_done)
+
+
+def read_call_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Call records of a log file, a file cut short by a crash is read up to its last complete record."""
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                data = json.loads(line)
+                if data["type"] == "call":
+                    yield data
+        except (EOFError, json.JSONDecodeError):
+            return
@@ -0,0 +1,200 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .journal import read_turns_before
+from .tokens import count_tokens
+
+MEMORY_HEADER = "# Relevant Memories"
+
+# Stands in for the world and story in the system prompt when only their relevant passages are sent
+RETRIEVED_SETUP_NOTE = f"Passages relevant to each action are provided under {MEMORY_HEADER}."
+
+# Terms found in more than this share of passages barely affect the ranking and are skipped when searching
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+_TERM_PATTERN = re.compile(r"\w+")
+_PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [term for term in _TERM_PATTERN.findall(text.casefold()) if len(term) > 2 or term.isdigit()]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split text into passages of whole paragraphs, or whole sentences of paragraphs longer than `max_tokens`."""
+
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_PATTERN.split(text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            pieces.extend([paragraph] if count_tokens(paragraph) <= max_tokens else _SENTENCE_PATTERN.split(paragraph))
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and count_tokens(chunks[-1]) + count_tokens(piece) <= max_tokens:
+            chunks[-1] = f"{chunks[-1]}\n\n{piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+@dataclass(frozen=True)
+class MemoryChunk:
+    text: str
+    terms: Dict[str, int]
+    turn: Optional[int] = None  # index of the game turn, None for world and story passages
+
+    @classmethod
+    def from_text(cls, text: str, turn: Optional[int] = None) -> "MemoryChunk":
+        return cls(text=text, terms=dict(Counter(tokenize(text))), turn=turn)
+
+    @property
+    def length(self) -> int:
+        return sum(self.terms.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"turn": self.turn, "text": self.text, "terms": self.terms}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemoryChunk":
+        return cls(text=data["text"], terms=data["terms"], turn=data["turn"])
+
+
+class MemoryIndex:
+    """
+    Local BM25 (TF-IDF) index over passages of the world, story and past turns of a session.
+
+    Each turn is added as a single passage: its term counts go to an inverted index and a line to the on-disk file,
+    so adding a turn doesn't depend on the length of the game. Searching only visits passages sharing a term
+    with the query. Term counts are stored with the passages, so loading the index doesn't tokenize them again.
+    A saved index is read in the background, searching and adding turns wait until it's read.
+    """
+
+    K1 = 1.2  # term frequency saturation
+    B = 0.75  # passage length normalization
+
+    def __init__(self, chunks: Iterable[MemoryChunk] = (), path: Optional[str] = None):
+        self.path = path
+        self.chunks: List[MemoryChunk] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}  # term -> (chunk index, term count) pairs
+        self.total_length = 0
+        self._turns = 0
+        self._loaded = threading.Event()
+        self._loaded.set()
+        for chunk in chunks:
+            self._add(chunk)
+
+    @classmethod
+    def load(
+        cls, path: str, chunks: Iterable[MemoryChunk] = (), journal_path: Optional[str] = None, journal_turns: int = 0
+    ) -> "MemoryIndex":
+        """
+        Load the turns saved at `path` after the given world and story passages in a background thread,
+        so resuming a game doesn't wait for them. The latest of the `journal_turns` turns of the journal
+        that are missing from the index, e.g. because they were played without memory, are indexed once.
+        """
+
+        index = cls(chunks, path)
+        index._loaded.clear()
+        # turns appended to the journal from now on are added by the session
+        journal_end = os.path.getsize(journal_path) if journal_path is not None else 0
+        threading.Thread(
+            target=index._load, args=(journal_path, journal_end, journal_turns), name="ai-rpg-memory", daemon=True
+        ).start()
+        return index
+
+    def _load(self, journal_path: Optional[str], journal_end: int, journal_turns: int) -> None:
+        try:
+            if self.path is not None and os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            self._add(MemoryChunk.from_dict(json.loads(line)))
+            if journal_path is not None and self._turns < journal_turns:
+                turns, _ = read_turns_before(journal_path, journal_end, journal_turns - self._turns)
+                for record in turns:
+                    self._add_turn(record["action"], record["response"])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Failed to load the memory index {self.path}, continuing with the turns read: {e!r}")
+        finally:
+            self._loaded.set()
+
+    @property
+    def turns(self) -> int:
+        """Number of turns indexed."""
+        self._loaded.wait()
+        return self._turns
+
+    def _add(self, chunk: MemoryChunk) -> None:
+        chunk_index = len(self.chunks)
+        self.chunks.append(chunk)
+        for term, count in chunk.terms.items():
+            self.postings.setdefault(term, []).append((chunk_index, count))
+        self.total_length += chunk.length
+        if chunk.turn is not None:
+            self._turns = max(self._turns, chunk.turn + 1)
+
+    def add_turn(self, action: str, response: str) -> None:
+        self._loaded.wait()
+        self._add_turn(action, response)
+
+    def _add_turn(self, action: str, response: str) -> None:
+        chunk = MemoryChunk.from_text(f"Player: {action}\nGame master: {response}", turn=self._turns)
+        self._add(chunk)
+        if self.path is not None:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(chunk.to_dict(), ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def search(self, query: str, top_k: int, before_turn: Optional[int] = None) -> List[MemoryChunk]:
+        """
+        The `top_k` passages most relevant to the query, most relevant first.
+        Turns from `before_turn` on are skipped, e.g. because they're already sent verbatim.
+        """
+
+        self._loaded.wait()
+        if not self.chunks:
+            return []
+        average_length = self.total_length / len(self.chunks)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings or len(postings) > MAX_DOCUMENT_FREQUENCY * len(self.chunks):
+                continue
+            idf = math.log(1 + (len(self.chunks) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_index, count in postings:
+                chunk = self.chunks[chunk_index]
+                if before_turn is not None and chunk.turn is not None and chunk.turn >= before_turn:
+                    continue
+                normalization = self.K1 * (1 - self.B + self.B * chunk.length / average_length)
+                scores[chunk_index] = scores.get(chunk_index, 0.0) + idf * count * (self.K1 + 1) / (
+                    count + normalization
+                )
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [self.chunks[chunk_index] for chunk_index, _ in best]
+
+
+def memory_path(journal_path: str) -> str:
+    """Path of the memory index of a saved game, next to its journal."""
+    return f"{os.path.splitext(journal_path)[0]}.memory.jsonl"
+
+
+def format_memories(chunks: List[MemoryChunk], max_tokens: int) -> str:
+    """
+    Retrieved passages as a prompt section, the least relevant ones are left out if over the token budget.
+    World and story passages come first, then turns in the order they were played.
+    """
+
+    chunks = list(chunks)
+    while chunks and count_tokens("\n\n".join(chunk.text for chunk in chunks)) > max_tokens:
+        chunks.pop()
+    chunks.sort(key=lambda chunk: -1 if chunk.turn is None else chunk.turn)
+    return "\n\n".join([MEMORY_HEADER, *[chunk.text for chunk in chunks]]) if chunks else ""
@@ -0,0 +1,27 @@
+import os
+from typing import Final
+
+# Base paths
+BASE_PATH: Final[str] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DATA_PATH: Final[str] = os.path.join(BASE_PATH, "data")
+
+# Data subdirectories
+CONFIG_PATH: Final[str] = os.path.join(DATA_PATH, "config")
+PROMPTS_PATH: Final[str] = os.path.join(DATA_PATH, "prompts")
+GENERATION_PATH: Final[str] = os.path.join(DATA_PATH, "generation")
+TOKENIZERS_PATH: Final[str] = os.path.join(DATA_PATH, "tokenizers")
+
+# Log directory
+LOGS_PATH: Final[str] = os.path.join(BASE_PATH, "logs")
+
+# Config files
+LLM_CONFIG_PATH: Final[str] = os.path.join(CONFIG_PATH, "llm-config.yaml")
+AI_RPG_CONFIG_PATH: Final[str] = os.path.join(CONFIG_PATH, "ai-rpg-config.yaml")
+
+# Environment variable to use another LLM config file from the config directory, e.g. llm-standin-config.yaml
+LLM_CONFIG_ENV_VAR: Final[str] = "AI_RPG_LLM_CONFIG"
+
+
+def get_llm_config_path() -> str:
+    filename = os.environ.get(LLM_CONFIG_ENV_VAR)
+    return os.path.join(CONFIG_PATH, filename) if filename else LLM_CONFIG_PATH
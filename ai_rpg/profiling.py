@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+from .paths import BASE_PATH
+
+_IMPORT_TIME_PREFIX = "import time:"
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_seconds: float
+    cumulative_seconds: float  # including the modules it imported
+
+
+def profile_imports(modules: Sequence[str]) -> List[ImportTiming]:
+    """Time importing the modules in a fresh interpreter, from the report of Python's `-X importtime` option."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=BASE_PATH,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith(_IMPORT_TIME_PREFIX) or "[us]" in line:
+            continue  # other output, or the header of the report
+        self_us, cumulative_us, module = line[len(_IMPORT_TIME_PREFIX) :].split("|")
+        timings.append(ImportTiming(module.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return timings
+
+
+def format_import_profile(timings: List[ImportTiming], top: int = 15) -> str:
+    """Total import time, with the slowest top-level packages and the slowest modules on their own."""
+
+    packages: Dict[str, float] = defaultdict(float)
+    for timing in timings:
+        packages[timing.module.split(".")[0]] += timing.self_seconds
+    slowest_packages = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    slowest_modules = sorted(timings, key=lambda timing: timing.self_seconds, reverse=True)[:top]
+
+    return "\n".join(
+        [
+            f"Imported {len(timings)} modules in {sum(packages.values()):.2f}s",
+            "Slowest packages:",
+            *[f"- {package}: {seconds:.3f}s" for package, seconds in slowest_packages],
+            "Slowest modules:",
+            *[f"- {timing.module}: {timing.self_seconds:.3f}s" for timing in slowest_modules],
+        ]
+    )
@@ -0,0 +1,238 @@
+import copy
+import functools
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import yaml
+from council.llm import LLMConfigObject
+from council.prompt import LLMPromptConfigObject
+
+from .paths import PROMPTS_PATH
+from .standin import STAND_IN_SPEC_KEY
+
+_CONVERSIONS: Dict[str, Callable[[Any], str]] = {"r": repr, "s": str, "a": ascii}
+
+
+class PromptTemplate:
+    """`str.format` template parsed once, formatting it only substitutes the fields."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._parts: List[Tuple[str, Optional[str], Optional[str], Optional[str]]] = list(Formatter().parse(text))
+        for _, name, _, _ in self._parts:
+            if name is not None and not name.isidentifier():
+                raise ValueError(f"Unsupported template field '{{{name}}}', only named fields are allowed")
+        self.fields: FrozenSet[str] = frozenset(name for _, name, _, _ in self._parts if name is not None)
+
+    def format(self, **kwargs: Any) -> str:
+        chunks = []
+        for literal, name, format_spec, conversion in self._parts:
+            chunks.append(literal)
+            if name is None:
+                continue
+            value = kwargs[name]
+            if conversion:
+                value = _CONVERSIONS[conversion](value)
+            chunks.append(format(value, format_spec) if format_spec else str(value))
+        return "".join(chunks)
+
+
+@dataclass(frozen=True)
+class LoadedFile:
+    path: str
+    mtime_ns: int = field(compare=False)
+    digest: bytes  # sha256 of the content, part of the generation cache keys
+
+    @classmethod
+    def read(cls, path: str) -> Tuple["LoadedFile", bytes]:
+        with open(path, "rb") as f:
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            content = f.read()
+        return cls(path=path, mtime_ns=mtime_ns, digest=hashlib.sha256(content).digest()), content
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """A validated prompt file with its system and user templates compiled."""
+
+    file: LoadedFile
+    system: PromptTemplate
+    user: Optional[PromptTemplate]
+
+    @classmethod
+    def load(cls, path: str) -> "Prompt":
+        file, content = LoadedFile.read(path)
+        values = yaml.safe_load(content)
+        if not isinstance(values, dict) or values.get("kind") != "LLMPrompt":
+            raise ValueError(f"{path} is not an LLMPrompt config")
+        config = LLMPromptConfigObject.from_dict(values)
+        # pylint: disable=no-member
+        system = PromptTemplate(config.get_system_prompt_template())
+        user = PromptTemplate(config.get_user_prompt_template()) if config.has_user_prompt_template else None
+        return cls(file=file, system=system, user=user)
+
+    def user_template(self) -> PromptTemplate:
+        if self.user is None:
+            raise ValueError(f"{os.path.basename(self.file.path)} has no user prompt template")
+        return self.user
+
+
+@dataclass(frozen=True, eq=False)
+class LLMConfig:
+    """A validated LLM config file, the parsed YAML is copied before each use as council mutates it."""
+
+    file: LoadedFile
+    values: Dict[str, Any]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, LLMConfig) and self.file == other.file
+
+    def __hash__(self) -> int:
+        return hash(self.file)
+
+    @classmethod
+    def load(cls, path: str) -> "LLMConfig":
+        file, content = LoadedFile.read(path)
+        values = yaml.safe_load(content)
+        if not isinstance(values, dict) or values.get("kind") != "LLMConfig":
+            raise ValueError(f"{path} is not an LLMConfig")
+        config = cls(file=file, values=values)
+        if not config.is_stand_in:
+            config.to_config_object()  # council doesn't know the stand-in provider, others are validated here
+        return config
+
+    @property
+    def provider(self) -> Dict[str, Any]:
+        return copy.deepcopy(self.values["spec"]["provider"])
+
+    @property
+    def is_stand_in(self) -> bool:
+        return STAND_IN_SPEC_KEY in self.values["spec"]["provider"]
+
+    @property
+    def provider_spec(self) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Key and settings of the main provider, e.g. `openAISpec` and its model."""
+
+        for key, value in self.values["spec"]["provider"].items():
+            if key.endswith("Spec") and isinstance(value, dict):
+                return key, value
+        return None, {}
+
+    @property
+    def model(self) -> Optional[str]:
+        """Model of the main provider, None for the stand-in."""
+        key, spec = self.provider_spec
+        return spec.get("model") if key != STAND_IN_SPEC_KEY else None
+
+    def to_config_object(self) -> LLMConfigObject:
+        return LLMConfigObject.from_dict(copy.deepcopy(self.values))
+
+
+class PromptRegistry:
+    """
+    Process-wide registry of the prompt files and LLM configs.
+
+    Every prompt in the prompts directory is read, validated and compiled once, LLM configs on their first use,
+    so building games and sessions never reads them again. `reload_changed` picks up edited files,
+    a file that no longer validates is reported and its previous version is kept.
+    """
+
+    def __init__(self, prompts_path: str = PROMPTS_PATH):
+        self.prompts_path = prompts_path
+        self._prompts: Dict[str, Prompt] = {}
+        self._llm_configs: Dict[str, LLMConfig] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._seen_mtimes: Dict[str, int] = {}  # path -> modification time of the last version read, valid or not
+        for filename in self._prompt_filenames():
+            self._prompts[filename] = Prompt.load(os.path.join(prompts_path, filename))
+
+    def _prompt_filenames(self) -> List[str]:
+        return sorted(filename for filename in os.listdir(self.prompts_path) if filename.endswith(".yaml"))
+
+    def prompt(self, filename: str) -> Prompt:
+        try:
+            return self._prompts[filename]
+        except KeyError:
+            raise ValueError(f"Unknown prompt {filename}, expected one of {sorted(self._prompts)}") from None
+
+    def digests(self) -> Dict[str, str]:
+        """Content hash of each prompt, to tell which prompts differ between runs."""
+        return {filename: prompt.file.digest.hex() for filename, prompt in sorted(self._prompts.items())}
+
+    def llm_config(self, path: str) -> LLMConfig:
+        config = self._llm_configs.get(path)
+        if config is None:
+            with self._lock:
+                config = self._llm_configs.get(path) or LLMConfig.load(path)
+                self._llm_configs[path] = config
+        return config
+
+    def _is_modified(self, path: str, loaded: Optional[LoadedFile]) -> bool:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return False  # keep using the loaded version
+        if mtime_ns == self._seen_mtimes.get(path, loaded.mtime_ns if loaded is not None else None):
+            return False
+        self._seen_mtimes[path] = mtime_ns  # an invalid version is only reported once
+        return True
+
+    def reload_changed(self) -> List[str]:
+        """Reload prompts and LLM configs modified since they were loaded, returns the reloaded paths."""
+
+        reloaded = []
+        with self._lock:
+            for filename in self._prompt_filenames():
+                path = os.path.join(self.prompts_path, filename)
+                loaded = self._prompts.get(filename)
+                if not self._is_modified(path, loaded.file if loaded is not None else None):
+                    continue
+                try:
+                    prompt = Prompt.load(path)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    print(f"Keeping the previous version of prompt {filename}, the edited one is invalid: {e!r}")
+                    continue
+                self._prompts[filename] = prompt
+                if loaded is None or prompt.file.digest != loaded.file.digest:
+                    reloaded.append(path)
+
+            for path, loaded_config in list(self._llm_configs.items()):
+                if not self._is_modified(path, loaded_config.file):
+                    continue
+                try:
+                    config = LLMConfig.load(path)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    print(f"Keeping the previous version of {path}, the edited one is invalid: {e!r}")
+                    continue
+                self._llm_configs[path] = config
+                if config.file.digest != loaded_config.file.digest:
+                    reloaded.append(path)
+
+        for path in reloaded:
+            print(f"Reloaded {os.path.basename(path)}")
+        return reloaded
+
+    def watch(self, interval: float) -> None:
+        """Check for modified files every `interval` seconds in a background thread, once per process."""
+
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name="ai-rpg-prompts", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            self.reload_changed()
+
+
+@functools.cache
+def get_prompt_registry() -> PromptRegistry:
+    return PromptRegistry()
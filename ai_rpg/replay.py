@@ -0,0 +1,22 @@
+import uuid
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .ai_rpg import AIRPG, GameSession
+from .journal import read_journal
+
+
+def replay_game(game: AIRPG, journal_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Play the actions of a saved game again in a new session, yields each action with its new response.
+    The game is expected to be set up from the same journal, so the world, story and inventory match.
+    """
+
+    # created directly rather than through the session manager, so the saved game isn't continued
+    session = GameSession(game, f"replay-{uuid.uuid4()}")
+    history: List[Dict[str, Any]] = []
+    for record in read_journal(journal_path):
+        if record["type"] != "turn":
+            continue
+        response = session.game_loop(record["action"], history)
+        history.extend([{"role": "user", "content": record["action"]}, {"role": "assistant", "content": response}])
+        yield record["action"], response
@@ -0,0 +1,127 @@
+import re
+from typing import Dict, List, Optional
+
+import yaml
+from council.llm import LLMParsingException, YAMLBlockResponseParser
+from council.utils import CodeParser
+from pydantic import Field
+
+
+class InventoryChange(YAMLBlockResponseParser):
+    """Single change to an item in the player's inventory."""
+
+    _name_description = "\n".join(
+        [
+            "Name of the item to change.",
+            "Make sure it's a valid item name, especially if you're responding in a language other than English.",
+        ]
+    )
+    name: str = Field(..., description=_name_description)
+    amount: int = Field(..., description="Change amount, e.g. +1, -5 etc.")
+
+
+class AIRPGResponse(YAMLBlockResponseParser):
+    """AI's response to a player's action."""
+
+    _reasoning_description = "\n".join(
+        [
+            "Your reasoning about the current situation, player action and dice roll.",
+            "It's private and will be not shown to the user.",
+        ]
+    )
+    _message_description = "\n".join(
+        [
+            "Message,",
+            "that will be shown to the user.",
+        ]
+    )
+
+    reasoning: str = Field(..., description=_reasoning_description)
+    inventory_changes: List[InventoryChange] = Field(..., description="List of inventory changes.")
+    message: str = Field(..., description=_message_description)
+
+
+class AIRPGResponseStreamParser:
+    """
+    Incrementally parses a streamed AIRPGResponse YAML block.
+
+    Fields are expected in the template order: `reasoning`, `inventory_changes` and `message`.
+    `reasoning` is never exposed, `inventory_changes` become available as soon as their block is closed
+    and `message` grows as its lines arrive.
+    """
+
+    FIELDS = ("reasoning", "inventory_changes", "message")
+    _FIELD_PATTERN = re.compile(rf"^({'|'.join(FIELDS)}):(.*)$")
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.inventory_changes: Optional[List[InventoryChange]] = None
+
+        self._partial_line = ""
+        self._in_block = False
+        self._field: Optional[str] = None
+        self._field_lines: Dict[str, List[str]] = {}
+
+    def feed(self, delta: str) -> None:
+        """Consume the next piece of the completion."""
+
+        self.text += delta
+        *lines, self._partial_line = (self._partial_line + delta).split("\n")
+        for line in lines:
+            self._process_line(line)
+
+    def _process_line(self, line: str) -> None:
+        if line.startswith("```"):
+            if self._in_block:
+                self._close_field()
+            self._in_block = not self._in_block
+            return
+
+        if not self._in_block:
+            return
+
+        match = self._FIELD_PATTERN.match(line)
+        if match is not None:
+            self._close_field()
+            self._field = match.group(1)
+            self._field_lines[self._field] = [line]
+        elif self._field is not None:
+            self._field_lines[self._field].append(line)
+
+    def _close_field(self) -> None:
+        if self._field == "inventory_changes" and self.inventory_changes is None:
+            try:
+                data = yaml.safe_load("\n".join(self._field_lines[self._field]))
+                self.inventory_changes = [
+                    InventoryChange.create_and_validate(**change) for change in data["inventory_changes"] or []
+                ]
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass  # left for the final parse to report
+        self._field = None
+
+    @property
+    def message(self) -> str:
+        """Part of the message received so far."""
+
+        lines = self._field_lines.get("message")
+        if not lines:
+            return ""
+
+        header = lines[0][len("message:") :].strip()
+        body = lines[1:]
+        if self._field == "message" and self._partial_line.startswith(" "):
+            body = body + [self._partial_line]  # indented, so it can't be the closing fence
+
+        if header.startswith(("|", ">")):
+            return "\n".join(line[2:] if line.startswith("  ") else line.strip() for line in body).strip()
+
+        # inline scalar, possibly quoted and wrapped over several lines
+        return " ".join([header, *(line.strip() for line in body)]).strip().strip('"')
+
+    def finish(self) -> AIRPGResponse:
+        """Parse the complete response, raising LLMParsingException if it's invalid."""
+
+        yaml_block = CodeParser.find_first("yaml", self.text)
+        if yaml_block is None:
+            raise LLMParsingException("yaml block is not found")
+        return AIRPGResponse.create_and_validate(**AIRPGResponse.parse(yaml_block.code))
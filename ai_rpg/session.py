@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+from .config import SessionConfig
+
+DEFAULT_SESSION_ID = "default"
+
+T = TypeVar("T")
+
+
+@dataclass
+class _SessionEntry(Generic[T]):
+    session: "Future[T]"  # resolved once the factory has built the session
+    last_access: float
+
+
+class SessionManager(Generic[T]):
+    """
+    Thread-safe registry of per-player sessions keyed by session id.
+
+    Sessions are created lazily on first access and evicted after an idle TTL,
+    or in least recently used order once the number of sessions exceeds the cap.
+    Sessions are built outside the lock, so a slow one doesn't hold up other players,
+    and requests for a session being built wait for it. Evicted sessions are passed to `on_evict`.
+    """
+
+    def __init__(
+        self, factory: Callable[[str], T], config: SessionConfig, on_evict: Optional[Callable[[T], None]] = None
+    ):
+        self._factory = factory
+        self._on_evict = on_evict
+        self._ttl_seconds = config.idle_ttl_minutes * 60
+        self._max_sessions = config.max_sessions
+        self._sessions: OrderedDict[str, _SessionEntry[T]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> T:
+        """Return the session for a given id, creating it if needed."""
+
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._evict_expired(now)
+
+            entry = self._sessions.get(session_id)
+            created = entry is None
+            if entry is None:
+                entry = _SessionEntry(session=Future(), last_access=now)
+                self._sessions[session_id] = entry
+                evicted.extend(self._evict_over_capacity())
+            else:
+                entry.last_access = now
+                self._sessions.move_to_end(session_id)
+
+        self._evict(evicted)
+        if created:
+            try:
+                entry.session.set_result(self._factory(session_id))
+            except BaseException as e:
+                with self._lock:
+                    if self._sessions.get(session_id) is entry:
+                        del self._sessions[session_id]
+                entry.session.set_exception(e)
+                raise
+        return entry.session.result()
+
+    def find(self, session_id: str) -> Optional[T]:
+        """Return the session for a given id if it's active, None instead of creating it."""
+
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry.last_access = now
+                self._sessions.move_to_end(session_id)
+
+        self._evict(evicted)
+        if entry is None or entry.session.exception() is not None:  # waits for a session still being built
+            return None
+        return entry.session.result()
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        self._evict([entry] if entry is not None else [])
+
+    def sessions(self) -> Dict[str, T]:
+        """Snapshot of the currently active sessions, without those still being built."""
+        with self._lock:
+            return {
+                session_id: entry.session.result()
+                for session_id, entry in self._sessions.items()
+                if entry.session.done() and entry.session.exception() is None
+            }
+
+    def _evict_expired(self, now: float) -> List[_SessionEntry[T]]:
+        expired: List[str] = []
+        for session_id, entry in self._sessions.items():
+            if now - entry.last_access < self._ttl_seconds:
+                break  # entries are ordered by last access
+            expired.append(session_id)
+
+        return [self._sessions.pop(session_id) for session_id in expired]
+
+    def _evict_over_capacity(self) -> List[_SessionEntry[T]]:
+        evicted = []
+        while len(self._sessions) > self._max_sessions:
+            evicted.append(self._sessions.popitem(last=False)[1])
+        return evicted
+
+    def _evict(self, entries: List[_SessionEntry[T]]) -> None:
+        """Pass the evicted sessions to `on_evict` outside the lock, those still being built once they're done."""
+
+        if self._on_evict is None:
+            return
+        on_evict = self._on_evict
+
+        def evict(future: "Future[T]") -> None:
+            if future.exception() is None:
+                on_evict(future.result())
+
+        for entry in entries:
+            entry.session.add_done_callback(evict)
@@ -0,0 +1,282 @@
+import dataclasses
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Protocol
+
+from .ai_rpg import AIRPG, GameSession
+from .benchmark import PLAYER_ACTIONS
+from .dice import DiceRoller
+from .paths import GENERATION_PATH, get_llm_config_path
+from .prompts import get_prompt_registry
+from .speculation import parse_suggestions, response_cost, suggest_actions
+from .tokens import tokens_exact
+from .utils import save_str
+
+SIMULATIONS_PATH = os.path.join(GENERATION_PATH, "simulations")
+
+# Share of the scripted player's actions using an item of their inventory
+USE_ITEM_PROBABILITY = 0.3
+
+# Actions the LLM player picks from, a single suggestion would make all games with the same scene alike
+LLM_PLAYER_SUGGESTIONS = 3
+
+
+class PlayerAgent(Protocol):
+    cost: float
+
+    def next_action(self, session: GameSession) -> str: ...
+
+
+class ScriptedPlayer:
+    """Picks the benchmark's actions or uses an item of the inventory, with its own seeded random generator."""
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.cost = 0.0
+
+    def next_action(self, session: GameSession) -> str:
+        items = list(session.inventory.items)
+        if items and self.rng.random() < USE_ITEM_PROBABILITY:
+            return f"Use my {self.rng.choice(items)}"
+        return self.rng.choice(PLAYER_ACTIONS)
+
+
+class LLMPlayer(ScriptedPlayer):
+    """
+    Picks one of the actions the fallback model suggests for the latest scene, like speculated turns.
+    Plays a scripted action when no suggestion can be had.
+    """
+
+    def next_action(self, session: GameSession) -> str:
+        scene = session.transcript[-1]["content"]
+        try:
+            llm_response = suggest_actions(
+                session.game.config.language, scene, session.inventory.format(), count=LLM_PLAYER_SUGGESTIONS
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Failed to suggest an action for session {session.session_id}: {e}")
+            return super().next_action(session)
+        self.cost += response_cost(llm_response)
+        suggestions = parse_suggestions(llm_response.response, LLM_PLAYER_SUGGESTIONS)
+        return self.rng.choice(suggestions) if suggestions else super().next_action(session)
+
+
+PLAYER_AGENTS: Dict[str, Callable[[int], PlayerAgent]] = {"scripted": ScriptedPlayer, "llm": LLMPlayer}
+
+
+@dataclass
+class TurnRecord:
+    game: int
+    turn: int
+    action: str
+    latency: float
+    roll: Optional[int] = None
+    prompt_tokens: int = 0  # billed, including those read from the prefix cache
+    budget_tokens: int = 0  # of the game master prompt, counted locally before it's sent
+    completion_tokens: int = 0
+    cost: float = 0.0
+    parse_failures: int = 0  # responses the game master had to correct or that fell back
+    inventory_anomalies: int = 0  # game master responses with inventory changes the player can't make
+    response_words: int = 0
+    error: Optional[str] = None  # the turn failed with this exception
+
+
+@dataclass
+class SimulationReport:
+    """
+    Per-turn records of simulated games with what they were played with, saved as JSON to compare runs:
+    the same seed, games and turns against another revision of the prompts or config.
+    """
+
+    label: str
+    model: str
+    player: str
+    games: int
+    turns_per_game: int
+    seed: int
+    wall_time: float
+    prompts: Dict[str, str]  # prompt filename -> content hash
+    exact_token_counts: bool = True  # local counts come from the model's tokenizer, estimated otherwise
+    player_cost: float = 0.0
+    turns: List[TurnRecord] = field(default_factory=list)
+
+    @property
+    def completed_turns(self) -> List[TurnRecord]:
+        return [turn for turn in self.turns if turn.error is None]
+
+    def metrics(self) -> Dict[str, float]:
+        """Aggregates compared between runs, per completed turn unless stated otherwise."""
+
+        completed = self.completed_turns
+        latencies = sorted(turn.latency for turn in completed)
+        last_turns = [turn for turn in completed if turn.turn == self.turns_per_game]
+
+        def mean(values: List[float]) -> float:
+            return statistics.fmean(values) if values else 0.0
+
+        return {
+            "completed_turns": len(completed),
+            "failed_turns": len(self.turns) - len(completed),
+            "prompt_tokens": mean([turn.prompt_tokens for turn in completed]),
+            "last_turn_prompt_tokens": mean([turn.prompt_tokens for turn in last_turns]),
+            "budget_tokens": mean([turn.budget_tokens for turn in completed]),
+            "completion_tokens": mean([turn.completion_tokens for turn in completed]),
+            "response_words": mean([turn.response_words for turn in completed]),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p99": percentile(latencies, 99),
+            "parse_failure_rate": mean([turn.parse_failures for turn in completed]),
+            "inventory_anomaly_rate": mean([turn.inventory_anomalies for turn in completed]),
+            "cost_per_turn": mean([turn.cost for turn in completed]),
+            "total_cost": sum(turn.cost for turn in self.turns),
+        }
+
+    def format(self) -> str:
+        metrics = self.metrics()
+        return "\n".join(
+            [
+                f"Simulation {self.label}: {self.games} games of {self.turns_per_game} turns, {self.player} player, "
+                f"model {self.model}, seed {self.seed}",
+                f"Completed turns: {metrics['completed_turns']:.0f}, failed turns: {metrics['failed_turns']:.0f}",
+                f"Wall time: {self.wall_time:.2f}s",
+                f"Prompt tokens per turn: {metrics['prompt_tokens']:.0f}, "
+                f"on the last turn: {metrics['last_turn_prompt_tokens']:.0f}",
+                f"Prompt tokens counted before sending: {metrics['budget_tokens']:.0f} per turn, "
+                f"{'exact' if self.exact_token_counts else 'estimated, the model tokenizer was not available'}",
+                f"Completion tokens per turn: {metrics['completion_tokens']:.0f}",
+                f"Response words per turn: {metrics['response_words']:.0f}",
+                f"Turn latency: p50 {metrics['latency_p50']:.3f}s, p99 {metrics['latency_p99']:.3f}s",
+                f"Parse failures per turn: {metrics['parse_failure_rate']:.3f}",
+                f"Inventory anomalies per turn: {metrics['inventory_anomaly_rate']:.3f}",
+                f"Cost: ${metrics['total_cost']:.4f}, ${metrics['cost_per_turn']:.4f} per turn, "
+                f"${self.player_cost:.4f} for the LLM player",
+            ]
+        )
+
+    def format_comparison(self, baseline: "SimulationReport") -> str:
+        """Metrics of this run next to the baseline's, with the prompts that changed in between."""
+
+        lines = [f"{'Metric':<24} {baseline.label[:14]:>14} {self.label[:14]:>14} {'Change':>8}"]
+        baseline_metrics = baseline.metrics()
+        for name, value in self.metrics().items():
+            before = baseline_metrics.get(name, 0.0)
+            change = f"{(value - before) / before:+.0%}" if before else "-"
+            lines.append(f"{name:<24} {before:>14.4g} {value:>14.4g} {change:>8}")
+
+        changed = sorted(
+            filename
+            for filename in set(self.prompts) | set(baseline.prompts)
+            if self.prompts.get(filename) != baseline.prompts.get(filename)
+        )
+        lines.append(f"Changed prompts: {', '.join(changed) if changed else 'none'}")
+        differences = [
+            f"{name} {getattr(baseline, name)} -> {getattr(self, name)}"
+            for name in ["model", "player", "games", "turns_per_game", "seed"]
+            if getattr(baseline, name) != getattr(self, name)
+        ]
+        if differences:
+            lines.append(f"Not comparable turn for turn: {', '.join(differences)}")
+        return "\n".join(lines)
+
+    def save(self) -> str:
+        """Save into data/generation/simulations, returns the path."""
+
+        os.makedirs(SIMULATIONS_PATH, exist_ok=True)
+        path = os.path.join(SIMULATIONS_PATH, f"{self.label}.json")
+        save_str(content=json.dumps({**asdict(self), "metrics": self.metrics()}, indent=2), path=path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "SimulationReport":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.pop("metrics")
+        data["turns"] = [TurnRecord(**turn) for turn in data["turns"]]
+        return cls(**data)
+
+
+def percentile(values: List[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def play_game(game: AIRPG, index: int, turns: int, player: PlayerAgent, seed: int) -> List[TurnRecord]:
+    """Play a game in its own session with seeded dice, recording each turn."""
+
+    session = game.sessions.get(f"simulation-{index}")
+    session.dice_roller = DiceRoller.from_config(dataclasses.replace(game.config.difficulty, dice_seed=seed))
+    records = []
+    for turn in range(1, turns + 1):
+        action = player.next_action(session)
+        prompt_tokens = session.prompt_tokens + session.cached_prompt_tokens
+        completion_tokens, total_cost = session.completion_tokens, session.total_cost
+        parse_failures, inventory_anomalies = session.parse_failures, session.inventory_anomalies
+        record = TurnRecord(game=index, turn=turn, action=action, latency=0.0)
+
+        start = time.perf_counter()
+        try:
+            result = session.play(action)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            record.error = f"{type(e).__name__}: {e}"
+        else:
+            assert result is not None  # only cancelled turns are discarded
+            record.roll = result.roll
+            record.response_words = len(result.message.split())
+            record.budget_tokens = session.budget.prompt_tokens if session.budget is not None else 0
+        record.latency = time.perf_counter() - start
+
+        # late hedged and discarded speculated responses count towards the turn they arrive in
+        record.prompt_tokens = session.prompt_tokens + session.cached_prompt_tokens - prompt_tokens
+        record.completion_tokens = session.completion_tokens - completion_tokens
+        record.cost = session.total_cost - total_cost
+        record.parse_failures = session.parse_failures - parse_failures
+        record.inventory_anomalies = session.inventory_anomalies - inventory_anomalies
+        records.append(record)
+    return records
+
+
+def run_simulation(
+    game: AIRPG, games: int, turns: int, player: str = "scripted", seed: int = 0, label: Optional[str] = None
+) -> SimulationReport:
+    """
+    Play `games` games of `turns` turns in parallel, each in its own session, with the given player agent.
+    Games are seeded from `seed`, so runs with the same seed roll the same dice and script the same actions.
+    """
+
+    rng = random.Random(seed)
+    seeds = [rng.randrange(2**32) for _ in range(games)]
+    players = [PLAYER_AGENTS[player](game_seed) for game_seed in seeds]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=games, thread_name_prefix="ai-rpg-simulation") as executor:
+        futures = [executor.submit(play_game, game, i, turns, players[i], seeds[i]) for i in range(games)]
+        records = [record for future in futures for record in future.result()]
+    wall_time = time.perf_counter() - start
+
+    llm_config = get_prompt_registry().llm_config(get_llm_config_path())
+    return SimulationReport(
+        label=label or time.strftime("%Y%m%d-%H%M%S"),
+        model=llm_config.model or "stand-in",
+        player=player,
+        games=games,
+        turns_per_game=turns,
+        seed=seed,
+        wall_time=wall_time,
+        prompts=get_prompt_registry().digests(),
+        exact_token_counts=tokens_exact(),
+        player_cost=sum(agent.cost for agent in players),
+        turns=records,
+    )
+
+
+def load_report(path: str) -> SimulationReport:
+    """A saved report, by path or by label from data/generation/simulations."""
+
+    if not os.path.exists(path):
+        path = os.path.join(SIMULATIONS_PATH, f"{path}.json")
+    return SimulationReport.load(path)
@@ -0,0 +1,233 @@
+import difflib
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from council.llm import LLMFunction, LLMFunctionResponse, StringResponseParser
+
+from .budget import PromptBudget
+from .call_policy import UsageTrackingMiddleware
+from .config import SpeculationConfig
+from .response import AIRPGResponse
+from .telemetry import TurnTrace
+from .utils import format_language_instructions, get_fallback_llm, get_llm_with_logging, get_prompt
+
+if TYPE_CHECKING:
+    from .ai_rpg import GameSession
+
+SUGGESTIONS_PROMPT_FILENAME = "action-suggestions.yaml"
+
+# Words that don't change what the player does, e.g. "I look around" and "look around" are the same action
+_FILLER_WORDS = frozenset({"i", "a", "an", "the", "to", "my", "at", "try", "will", "let", "s", "me", "please"})
+_WORD_PATTERN = re.compile(r"\w+")
+_LIST_MARKER_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def normalize_action(action: str) -> str:
+    return " ".join(word for word in _WORD_PATTERN.findall(action.casefold()) if word not in _FILLER_WORDS)
+
+
+def actions_match(action: str, other: str, threshold: float) -> bool:
+    """Same action once normalized, or similar enough, e.g. "attack the goblin" and "Attack the goblins!"."""
+
+    action, other = normalize_action(action), normalize_action(other)
+    return action == other or difflib.SequenceMatcher(None, action, other).ratio() >= threshold
+
+
+def parse_suggestions(text: str, count: int) -> List[str]:
+    actions = [_LIST_MARKER_PATTERN.sub("", line).strip().strip('"') for line in text.splitlines()]
+    return [action for action in actions if action][:count]
+
+
+def response_cost(llm_response: LLMFunctionResponse) -> float:
+    return sum(c.value for c in llm_response.consumptions if c.kind.endswith(":total_tokens_cost"))
+
+
+def suggest_actions(language: Optional[str], scene: str, inventory: str, count: int) -> LLMFunctionResponse[str]:
+    """Likely next actions of the player from the fallback model, or the main one if there's none."""
+
+    prompt = get_prompt(SUGGESTIONS_PROMPT_FILENAME)
+    llm_function: LLMFunction[str] = LLMFunction(
+        llm=get_llm_with_logging(SUGGESTIONS_PROMPT_FILENAME[:-5], get_fallback_llm()),  # remove .yaml
+        response_parser=StringResponseParser.from_response,
+        system_message=prompt.system.format(count=count, language_instructions=format_language_instructions(language)),
+    )
+    return llm_function.execute_with_llm_response(
+        user_message=prompt.user_template().format(scene=scene, inventory=inventory)
+    )
+
+
+class SpeculationStats:
+    """Counts of speculated turns the player took or not, and the cost of those they didn't."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.wasted_cost = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def add_wasted_cost(self, cost: float) -> None:
+        with self._lock:
+            self.wasted_cost += cost
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class SpeculatedTurn:
+    action: str
+    budget: PromptBudget
+    future: "Future[LLMFunctionResponse[AIRPGResponse]]"
+
+
+@dataclass
+class Speculation:
+    """Turns generated ahead for the next action of a session, all with the same pre-rolled dice."""
+
+    history_length: int
+    last_response: str
+    roll: int
+    turns: List[SpeculatedTurn] = field(default_factory=list)
+    cancelled: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def continues(self, history: List[Dict[str, Any]]) -> bool:
+        """
+        Whether the history, without commands, is the one the turns were generated for.
+        It changes e.g. when a turn is retried.
+        """
+        return len(history) == self.history_length and bool(history) and history[-1]["content"] == self.last_response
+
+
+class Speculator:
+    """
+    Generates likely next turns of sessions in the background while their players think.
+
+    After each turn, the dice of the next one are rolled ahead and the game master runs for the configured actions
+    and those suggested by a cheap call. An action matching one of them is answered with its turn right away,
+    the others are discarded. A session stops speculating once its discarded turns and suggestions cost more than
+    its budget, and while real turns are queued.
+    """
+
+    def __init__(self, config: SpeculationConfig):
+        self.config = config
+        self.stats = SpeculationStats()
+        self._executor = ThreadPoolExecutor(max_workers=config.max_in_flight, thread_name_prefix="ai-rpg-speculation")
+
+    def start(self, session: "GameSession", history: List[Dict[str, Any]], roll: int) -> Speculation:
+        """Speculate the turns following `history`, which ends with the latest response."""
+
+        speculation = Speculation(
+            history_length=len(session.without_commands(history)), last_response=history[-1]["content"], roll=roll
+        )
+        self._executor.submit(self._run, session, speculation, list(history))
+        return speculation
+
+    def _run(self, session: "GameSession", speculation: Speculation, history: List[Dict[str, Any]]) -> None:
+        trace = TurnTrace(session.session_id)  # spans of speculated turns aren't recorded
+        with speculation.lock:
+            if speculation.cancelled:
+                return
+            base_messages = session.history_messages(history, trace)
+            inventory = session.inventory.format()
+
+        actions = list(self.config.actions)
+        if self.config.suggested_actions > 0:
+            actions.extend(self._suggest(session, history[-1]["content"], inventory))
+        llm_function = session.game.load_main_llm_function(response_parser=session.parse_response)
+        # charged as they return, the turns may never be taken and failed attempts are billed too
+        llm_function.add_middleware(UsageTrackingMiddleware(session.track_consumptions))
+        speculated: List[str] = []
+        for action in actions:
+            if any(actions_match(action, other, threshold=1.0) for other in speculated):
+                continue
+            speculated.append(action)
+            with speculation.lock:
+                if speculation.cancelled:
+                    return
+                action_messages = session.action_messages(action, history, speculation.roll, trace)
+                future = self._executor.submit(
+                    llm_function.execute_with_llm_response, messages=base_messages + action_messages
+                )
+                budget = session.count_budget(base_messages, action_messages)
+                speculation.turns.append(SpeculatedTurn(action=action, budget=budget, future=future))
+
+    def _suggest(self, session: "GameSession", scene: str, inventory: str) -> List[str]:
+        try:
+            llm_response = suggest_actions(
+                session.game.config.language, scene, inventory, count=self.config.suggested_actions
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Failed to suggest actions for session {session.session_id[:8]}: {e}")
+            return []
+        session.track_cost(llm_response)
+        self._add_wasted_cost(session, response_cost(llm_response))
+        return parse_suggestions(llm_response.response, self.config.suggested_actions)
+
+    def _add_wasted_cost(self, session: "GameSession", cost: float) -> None:
+        session.speculation_stats.add_wasted_cost(cost)
+        self.stats.add_wasted_cost(cost)
+
+    def can_speculate(self, session: "GameSession") -> bool:
+        return (
+            session.speculation_stats.wasted_cost < self.config.max_cost_per_session
+            and session.check_usage().full
+            and session.game.request_limiter.pending <= session.game.config.concurrency.max_in_flight
+        )
+
+    def _discard(self, session: "GameSession", turn: SpeculatedTurn) -> None:
+        if turn.future.cancel():
+            return
+
+        def on_done(future: "Future[LLMFunctionResponse[AIRPGResponse]]") -> None:
+            if future.exception() is None:
+                self._add_wasted_cost(session, response_cost(future.result()))
+
+        turn.future.add_done_callback(on_done)
+
+    def resolve(
+        self, session: "GameSession", speculation: Speculation, action: str, history: List[Dict[str, Any]]
+    ) -> Optional[Tuple[LLMFunctionResponse[AIRPGResponse], PromptBudget, float]]:
+        """
+        The speculated response to the action, its prompt budget and how long it was waited for, None if there's none.
+        No more turns are speculated from here on, those that don't match are discarded.
+        """
+
+        with speculation.lock:
+            speculation.cancelled = True
+            turns = list(speculation.turns)
+
+        threshold = self.config.match_threshold
+        # commands played since don't change the game, the turns still follow it
+        continues = speculation.continues(session.without_commands(history))
+        matched = next((turn for turn in turns if continues and actions_match(turn.action, action, threshold)), None)
+        for turn in turns:
+            if turn is not matched:
+                self._discard(session, turn)
+
+        llm_response = None
+        start = time.perf_counter()
+        if matched is not None:
+            try:
+                llm_response = matched.future.result()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print(f"Speculated turn of session {session.session_id[:8]} failed: {e}")
+
+        session.speculation_stats.record(hit=llm_response is not None)
+        self.stats.record(hit=llm_response is not None)
+        if llm_response is None or matched is None:
+            return None
+        return llm_response, matched.budget, time.perf_counter() - start
@@ -0,0 +1,228 @@
+import glob
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import yaml
+from council.contexts import Consumption, LLMContext
+from council.llm import (
+    LLMBase,
+    LLMConfigSpec,
+    LLMConfigurationBase,
+    LLMMessage,
+    LLMMessageRole,
+    LLMParsingException,
+    LLMResult,
+)
+from council.utils import CodeParser
+
+from .llm_client import LLMStream
+from .llm_logging import LOG_FILE_EXTENSION, LOG_FILE_PREFIX, read_call_records
+from .response import AIRPGResponse
+
+STAND_IN_SPEC_KEY = "standInSpec"
+
+
+class StandInLLMConfiguration(LLMConfigurationBase):
+    """
+    Configuration of the local stand-in LLM.
+
+    In `synthetic` mode it writes valid responses for every prompt of the game,
+    in `replay` mode game master responses and their latencies are replayed from LLM logs.
+    Latency of synthetic responses follows a lognormal distribution with a given median.
+    """
+
+    MODES = {"synthetic", "replay"}
+
+    def __init__(
+        self,
+        mode: str,
+        latency_median: float,
+        latency_sigma: float,
+        stream_chunk_chars: int,
+        logs_path: str,
+        seed: Optional[int] = None,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid stand-in mode: '{mode}'. Must be one of {self.MODES}")
+
+        self.mode = mode
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.stream_chunk_chars = stream_chunk_chars
+        self.logs_path = logs_path
+        self.seed = seed
+
+    def model_name(self) -> str:
+        return f"stand-in-{self.mode}"
+
+    @classmethod
+    def from_env(cls, *args: Any, **kwargs: Any) -> "StandInLLMConfiguration":
+        raise NotImplementedError("StandInLLMConfiguration doesn't support from_env() initialization.")
+
+    @classmethod
+    def from_spec(cls, spec: LLMConfigSpec) -> "StandInLLMConfiguration":
+        raise NotImplementedError("Council doesn't know the stand-in provider, use from_dict() instead.")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], default_logs_path: str) -> "StandInLLMConfiguration":
+        return cls(
+            mode=data["mode"],
+            latency_median=data["latency"]["median"],
+            latency_sigma=data["latency"]["sigma"],
+            stream_chunk_chars=data["streamChunkChars"],
+            logs_path=data.get("logsPath") or default_logs_path,
+            seed=data.get("seed"),
+        )
+
+
+class RecordedResponse:
+    def __init__(self, text: str, duration: float):
+        self.text = text
+        self.duration = duration
+
+
+def _read_text_logs(logs_path: str, component_name: str) -> Iterator[Tuple[str, float]]:
+    """Responses and durations from the per-call logs of LLMTimestampFileLoggingMiddleware."""
+
+    pattern = re.compile(
+        rf"LLM output for {re.escape(component_name)} received in ([\d.]+) seconds, \d+ choice\(s\) returned:\n"
+        r"(.*?)(?=\nConsumption for |\nLLM input for |\Z)",
+        re.DOTALL,
+    )
+    for path in sorted(glob.glob(os.path.join(logs_path, "*.log"))):
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        for match in pattern.finditer(content):
+            yield match.group(2).strip(), float(match.group(1))
+
+
+def _read_call_logs(logs_path: str, component_name: str) -> Iterator[Tuple[str, float]]:
+    """Responses and durations from the compressed JSONL logs of the background LLM log writer."""
+
+    for path in sorted(glob.glob(os.path.join(logs_path, f"{LOG_FILE_PREFIX}*{LOG_FILE_EXTENSION}"))):
+        for record in read_call_records(path):
+            if record["component"] == component_name and record["response"] is not None:
+                yield record["response"].strip(), record["duration"]
+
+
+def read_recorded_responses(logs_path: str, component_name: str = "ai-game-master") -> List[RecordedResponse]:
+    """Extract valid game master responses and their durations from the LLM logs."""
+
+    responses = []
+    for text, duration in itertools.chain(
+        _read_text_logs(logs_path, component_name), _read_call_logs(logs_path, component_name)
+    ):
+        yaml_block = CodeParser.find_first("yaml", text)
+        try:
+            if yaml_block is None:
+                continue
+            AIRPGResponse.create_and_validate(**AIRPGResponse.parse(yaml_block.code))
+        except (LLMParsingException, TypeError, ValueError):
+            continue
+        responses.append(RecordedResponse(text=text, duration=duration))
+    return responses
+
+
+class StandInLLMStream(LLMStream):
+    def __init__(self, text: str, latency: float, chunk_chars: int, consumptions: List[Consumption]):
+        super().__init__()
+        self._text = text
+        self._latency = latency
+        self._chunk_chars = chunk_chars
+        self._consumptions = consumptions
+
+    def _iter_deltas(self) -> Iterator[str]:
+        chunks = [self._text[i : i + self._chunk_chars] for i in range(0, len(self._text), self._chunk_chars)]
+        # roughly a third of the latency is spent before the first token
+        time.sleep(self._latency / 3)
+        for chunk in chunks:
+            time.sleep(2 * self._latency / 3 / max(len(chunks), 1))
+            yield chunk
+        self.consumptions = self._consumptions
+
+
+class StandInLLM(LLMBase[StandInLLMConfiguration]):
+    """
+    Deterministic local LLM for offline tests and load tests of the game, no API calls are made.
+    Responses depend on the kind of prompt: JSON inventory or item names, game master YAML block or plain text.
+    """
+
+    _INVENTORY_ITEM_PATTERN = re.compile(r"^- (.+): (-?\d+)$", re.MULTILINE)
+    _ACTION_PATTERN = re.compile(r"# Action\s+(.+)\s*$", re.DOTALL)
+
+    def __init__(self, config: StandInLLMConfiguration):
+        super().__init__(configuration=config, name=config.model_name())
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._recorded = read_recorded_responses(config.logs_path) if config.mode == "replay" else []
+        if config.mode == "replay" and not self._recorded:
+            raise ValueError(f"No game master responses to replay found in {config.logs_path}")
+
+    def _sample_latency(self) -> float:
+        with self._lock:
+            return self._rng.lognormvariate(0.0, self.configuration.latency_sigma) * self.configuration.latency_median
+
+    def _game_master_response(self, messages: Sequence[LLMMessage]) -> Tuple[str, float]:
+        if self._recorded:
+            with self._lock:
+                recorded = self._rng.choice(self._recorded)
+            return recorded.text, recorded.duration
+
+        last_message = messages[-1].content
+        items = self._INVENTORY_ITEM_PATTERN.findall(last_message)
+        action_match = self._ACTION_PATTERN.search(last_message)
+        action = action_match.group(1).strip() if action_match else "wait"
+
+        with self._lock:
+            inventory_changes = []
+            if items and self._rng.random() < 0.3:
+                item, amount = self._rng.choice(items)
+                if int(amount) > 0:
+                    inventory_changes.append({"name": item, "amount": -1})
+            sentences = self._rng.randint(6, 12)
+
+        message = " ".join([f"You decide to {action.lower().rstrip('.')}."] + ["The world reacts to you."] * sentences)
+        response = {"reasoning": "Stand-in reasoning.", "inventory_changes": inventory_changes, "message": message}
+        return "\n".join(["```yaml", yaml.safe_dump(response, sort_keys=False, allow_unicode=True), "```"]), -1.0
+
+    def _respond(self, messages: Sequence[LLMMessage], **kwargs: Any) -> Tuple[str, float]:
+        system_prompt = next((m.content for m in messages if m.is_of_role(LLMMessageRole.System)), "")
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            if "item_names" in system_prompt:
+                names = json.loads(messages[-1].content)
+                return json.dumps({"item_names": {name: f"{name} (stand-in)" for name in names}}), -1.0
+            return '{"inventory": {"Torch": 2, "Rope": 1, "Rations": 3}}', -1.0
+        if "```yaml" in system_prompt:
+            return self._game_master_response(messages)
+        return "Stand-in text. " * 20, -1.0
+
+    def _consumptions(self, messages: Sequence[LLMMessage], text: str, latency: float) -> List[Consumption]:
+        model = self.configuration.model_name()
+        prompt_tokens = sum(len(m.content) for m in messages) // 4
+        completion_tokens = len(text) // 4
+        return [
+            Consumption.call(1, model),
+            Consumption.duration(latency, model),
+            Consumption.token(prompt_tokens, f"{model}:prompt_tokens"),
+            Consumption.token(completion_tokens, f"{model}:completion_tokens"),
+            Consumption.token(prompt_tokens + completion_tokens, f"{model}:total_tokens"),
+        ]
+
+    def _post_chat_request(self, context: LLMContext, messages: Sequence[LLMMessage], **kwargs: Any) -> LLMResult:
+        text, latency = self._respond(messages, **kwargs)
+        latency = latency if latency >= 0 else self._sample_latency()
+        time.sleep(latency)
+        return LLMResult(choices=[text], consumptions=self._consumptions(messages, text, latency))
+
+    def stream_chat_request(self, messages: Sequence[LLMMessage], **kwargs: Any) -> LLMStream:
+        text, latency = self._respond(messages, **kwargs)
+        latency = latency if latency >= 0 else self._sample_latency()
+        return StandInLLMStream(
+            text, latency, self.configuration.stream_chunk_chars, self._consumptions(messages, text, latency)
+        )
@@ -0,0 +1,198 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from council.contexts import Consumption
+
+from .config import TelemetryConfig
+from .paths import LOGS_PATH
+
+# Upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class Span:
+    name: str
+    duration: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    hedges: int = 0
+    fallbacks: int = 0
+
+
+@dataclass
+class TurnTrace:
+    """Spans of a single turn of a session, recorded in the order they happened."""
+
+    session_id: str
+    start: float = field(default_factory=time.time)
+    spans: List[Span] = field(default_factory=list)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        """Time the block as a span, token counts can be filled in through the yielded object."""
+
+        span = Span(name=name, duration=0.0)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - start
+            self.spans.append(span)
+
+    def add_span(self, name: str, duration: float, consumptions: Sequence[Consumption] = ()) -> Span:
+        """Add a span measured elsewhere, with token counts and retries taken from LLM consumptions."""
+
+        span = Span(name=name, duration=duration)
+        add_consumptions(span, consumptions)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration(self) -> float:
+        return sum(span.duration for span in self.spans)
+
+    def to_dict(self) -> dict:
+        return {"session_id": self.session_id, "start": self.start, "spans": [asdict(span) for span in self.spans]}
+
+
+def add_consumptions(span: Span, consumptions: Sequence[Consumption]) -> None:
+    """Accumulate prompt/completion tokens and self-correction retries of LLM calls into the span."""
+
+    calls = 0
+    for consumption in consumptions:
+        if consumption.unit == "call":
+            calls += int(consumption.value)
+        elif consumption.kind.endswith(":prompt_tokens"):
+            span.prompt_tokens += int(consumption.value)
+        elif consumption.kind.endswith(":completion_tokens"):
+            span.completion_tokens += int(consumption.value)
+    span.retries += max(calls - 1, 0)
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, in the Prometheus sense."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def format(self, name: str, labels: str) -> List[str]:
+        separator = "," if labels else ""
+        lines, cumulative = [], 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Telemetry:
+    """
+    Aggregates per-turn traces into latency histograms and token counters.
+
+    Metrics are exposed in the Prometheus text format through `format_metrics` or the HTTP endpoint,
+    and traces are optionally appended to a JSONL file, one turn per line.
+    """
+
+    def __init__(self, config: TelemetryConfig, gauges: Optional[Dict[str, Callable[[], float]]] = None):
+        self.config = config
+        self.gauges = gauges or {}
+        self.turn_latency = Histogram()
+        self.span_latency: Dict[str, Histogram] = {}
+        self.tokens: Dict[str, int] = {"prompt": 0, "completion": 0}
+        self.retries = 0
+        self.hedges = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._trace_path = os.path.join(LOGS_PATH, config.trace_file) if config.trace_file else None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def record(self, trace: TurnTrace) -> None:
+        with self._lock:
+            self.turn_latency.observe(trace.duration)
+            for span in trace.spans:
+                self.span_latency.setdefault(span.name, Histogram()).observe(span.duration)
+                self.tokens["prompt"] += span.prompt_tokens
+                self.tokens["completion"] += span.completion_tokens
+                self.retries += span.retries
+                self.hedges += span.hedges
+                self.fallbacks += span.fallbacks
+
+            if self._trace_path is not None:
+                with open(self._trace_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict()) + "\n")
+
+    def format_metrics(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+
+        with self._lock:
+            lines = ["# TYPE ai_rpg_turn_seconds histogram", *self.turn_latency.format("ai_rpg_turn_seconds", "")]
+            lines.append("# TYPE ai_rpg_turn_span_seconds histogram")
+            for name, histogram in sorted(self.span_latency.items()):
+                lines.extend(histogram.format("ai_rpg_turn_span_seconds", f'span="{name}"'))
+            lines.append("# TYPE ai_rpg_llm_tokens_total counter")
+            for kind, value in self.tokens.items():
+                lines.append(f'ai_rpg_llm_tokens_total{{kind="{kind}"}} {value}')
+            lines.extend(["# TYPE ai_rpg_llm_retries_total counter", f"ai_rpg_llm_retries_total {self.retries}"])
+            lines.extend(["# TYPE ai_rpg_llm_hedges_total counter", f"ai_rpg_llm_hedges_total {self.hedges}"])
+            lines.extend(["# TYPE ai_rpg_llm_fallbacks_total counter", f"ai_rpg_llm_fallbacks_total {self.fallbacks}"])
+        for name, gauge in self.gauges.items():
+            lines.extend([f"# TYPE {name} gauge", f"{name} {gauge()}"])
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self) -> str:
+        """Mean duration of each span, to see where turn latency goes at a glance."""
+
+        with self._lock:
+            return "\n".join(
+                f"- {name}: {histogram.mean:.3f}s mean over {histogram.count}"
+                for name, histogram in self.span_latency.items()
+            )
+
+    def start_server(self) -> None:
+        """Serve metrics at /metrics on the configured port from a background thread."""
+
+        if self.config.metrics_port is None or self._server is not None:
+            return
+
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.format_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass  # keep the console for the game
+
+        self._server = ThreadingHTTPServer(("localhost", self.config.metrics_port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="ai-rpg-metrics", daemon=True).start()
+        print(f"Serving metrics on http://localhost:{self.config.metrics_port}/metrics")
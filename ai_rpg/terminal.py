@@ -0,0 +1,27 @@
+from .ai_rpg import AIRPG
+from .session import DEFAULT_SESSION_ID
+
+QUIT_COMMANDS = {"/quit", "/exit"}
+
+
+def run_terminal(game: AIRPG, session_id: str = DEFAULT_SESSION_ID) -> None:
+    """Play in the terminal, one action per line, until `/quit` or the end of input. The game is saved on exit."""
+
+    session = game.sessions.get(session_id)
+    for message in session.transcript:
+        print(f"\n> {message['content']}" if message["role"] == "user" else f"\n{message['content']}")
+
+    while True:
+        try:
+            action = input("\n> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if action in QUIT_COMMANDS:
+            break
+        if action:
+            result = session.play(action)
+            if result is not None:
+                print(f"\n{result.format()}")
+
+    if session.turns:
+        print(f"\n{session.save_game_state()}")
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from .paths import TOKENIZERS_PATH, get_llm_config_path
+from .prompts import get_prompt_registry
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+# Encoding of models tiktoken doesn't know, e.g. other providers', closer to them than the 4 characters estimate
+DEFAULT_ENCODING = "o200k_base"
+
+# tiktoken downloads encodings from there and caches each one under the SHA-1 of its URL
+ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/{}.tiktoken"
+
+_encodings: Dict[Optional[str], Optional["Encoding"]] = {}  # model -> its tokenizer, None if it can't be loaded
+_loading: Set[Optional[str]] = set()
+_lock = threading.Lock()
+
+
+def _configured_model() -> Optional[str]:
+    return get_prompt_registry().llm_config(get_llm_config_path()).model
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count estimate, ~4 characters per token for English text."""
+    return len(text) // 4 + 1
+
+
+def _is_cached(encoding_name: str) -> bool:
+    cache_key = hashlib.sha1(ENCODING_URL.format(encoding_name).encode()).hexdigest()
+    return os.path.exists(os.path.join(os.environ["TIKTOKEN_CACHE_DIR"], cache_key))
+
+
+def _load_encoding(model: Optional[str], download: bool) -> Optional["Encoding"]:
+    # tiktoken caches the encodings it downloads there, `headless.py tokenizer` fetches them ahead to ship with the game
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", TOKENIZERS_PATH)
+    try:
+        import tiktoken  # pylint: disable=import-outside-toplevel
+
+        try:
+            encoding_name = tiktoken.encoding_name_for_model(model) if model else DEFAULT_ENCODING
+        except KeyError:
+            encoding_name = DEFAULT_ENCODING
+        if not download and not _is_cached(encoding_name):
+            print(
+                f"Tokenizer {encoding_name} not cached, token counts are estimated. "
+                "Run `python headless.py tokenizer` once online to cache it in data/tokenizers"
+            )
+            return None
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(
+            f"Tokenizer not available ({type(e).__name__}), token counts are estimated. "
+            "Run `python headless.py tokenizer` once online to cache it in data/tokenizers"
+        )
+        return None
+
+
+def load_tokenizer(model: Optional[str] = None, download: bool = False) -> bool:
+    """
+    Load the tokenizer of the model, the configured one by default, if its encoding is cached
+    or `download` allows fetching it. Meant for startup, returns whether token counts are exact.
+    """
+
+    model = model if model is not None else _configured_model()
+    if model not in _encodings:
+        encoding = _load_encoding(model, download)
+        with _lock:
+            _encodings[model] = encoding
+            _loading.discard(model)
+    return _encodings[model] is not None
+
+
+def _get_encoding() -> Optional["Encoding"]:
+    """Tokenizer of the configured model, loaded in the background if it wasn't at startup, e.g. after a reload."""
+
+    model = _configured_model()
+    if model in _encodings:
+        return _encodings[model]
+    with _lock:
+        if model not in _loading:
+            _loading.add(model)
+            threading.Thread(target=load_tokenizer, args=(model,), name="ai-rpg-tokenizer", daemon=True).start()
+    return None
+
+
+def tokens_exact() -> bool:
+    """Whether token counts come from the model's tokenizer rather than estimates."""
+    return _get_encoding() is not None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of the text for the configured model, estimated while its tokenizer isn't available."""
+
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """The leading whole paragraphs of the text that fit into `max_tokens`, or its cut first paragraph."""
+
+    if count_tokens(text) <= max_tokens:
+        return text
+    paragraphs = text.split("\n\n")
+    kept = 0
+    while kept < len(paragraphs) and count_tokens("\n\n".join(paragraphs[: kept + 1])) <= max_tokens:
+        kept += 1
+    if kept:
+        return "\n\n".join(paragraphs[:kept])
+    # roughly as many characters as fit, tokens of any encoding are at least one character long
+    cut = paragraphs[0][: max_tokens * 4]
+    while cut and count_tokens(cut) > max_tokens:
+        cut = cut[: int(len(cut) * 0.9)]
+    return cut
@@ -0,0 +1,40 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .inventory import Inventory
+from .response import InventoryChange
+
+
+@dataclass
+class TurnResult:
+    """
+    Outcome of a player's action, independent of how it's presented.
+    Commands like `/inventory` have no roll and their output as the message.
+    """
+
+    action: str
+    message: str
+    roll: Optional[int] = None
+    inventory_changes: List[InventoryChange] = field(default_factory=list)
+    cost: float = 0.0  # LLM cost of this turn, including history summaries
+    total_cost: float = 0.0  # LLM cost of the session so far
+    projected_cost: Optional[float] = None  # cost projected from the prompt's tokens before it was sent
+
+    @property
+    def is_command(self) -> bool:
+        return self.roll is None
+
+    def format(self) -> str:
+        """Text shown to the player in a chat, with the roll and inventory changes."""
+
+        if self.roll is None:
+            return self.message
+        response_parts = [f"You roll {self.roll}.", self.message, ""]
+        if self.inventory_changes:
+            response_parts.append(Inventory.format_changes(self.inventory_changes))
+        return "\n".join(response_parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["inventory_changes"] = [{"name": c.name, "amount": c.amount} for c in self.inventory_changes]
+        return data
@@ -1,23 +1,88 @@
-from typing import Callable
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import gradio as gr  # type: ignore
 from gradio.components.chatbot import Message
 
+from .session import DEFAULT_SESSION_ID
 
-def start_game_ui(main_loop: Callable, greeting_message: str, share=False):
-    """Launch the Gradio chat interface."""
-
-    demo = gr.ChatInterface(
-        main_loop,
-        chatbot=gr.Chatbot(
-            value=[Message(role="assistant", content=greeting_message)],  # type: ignore
-            placeholder="The story begins... ",
-            type="messages",
-        ),
-        textbox=gr.Textbox(placeholder="What do you do next?", container=False, scale=8),
-        title="AI RPG",
-        theme="soft",
-        examples=["Look around", "/inventory", "/save"],
-        cache_examples=False,
-    )
+
+def with_session_id(main_loop: Callable[[str, List[Dict[str, Any]], str], Any]) -> Callable:
+    """Adapt a session-aware game loop (sync, async or streaming) to Gradio's ChatInterface, keyed by the browser session hash."""
+
+    if inspect.iscoroutinefunction(main_loop):
+
+        async def async_chat_fn(message: str, history: List[Dict[str, Any]], request: gr.Request):
+            return await main_loop(message, history, request.session_hash or DEFAULT_SESSION_ID)
+
+        return async_chat_fn
+
+    if inspect.isasyncgenfunction(main_loop):
+
+        async def async_stream_chat_fn(message: str, history: List[Dict[str, Any]], request: gr.Request):
+            async for update in main_loop(message, history, request.session_hash or DEFAULT_SESSION_ID):
+                yield update
+
+        return async_stream_chat_fn
+
+    if inspect.isgeneratorfunction(main_loop):
+
+        def stream_chat_fn(message: str, history: List[Dict[str, Any]], request: gr.Request):
+            yield from main_loop(message, history, request.session_hash or DEFAULT_SESSION_ID)
+
+        return stream_chat_fn
+
+    def chat_fn(message: str, history: List[Dict[str, Any]], request: gr.Request):
+        return main_loop(message, history, request.session_hash or DEFAULT_SESSION_ID)
+
+    return chat_fn
+
+
+def start_game_ui(
+    main_loop: Callable,
+    greeting_messages: Callable[[str], List[Dict[str, str]]],
+    share=False,
+    concurrency_limit: Optional[int] = None,
+    earlier_turns_pager: Optional[Callable[[int, str, str], Tuple[str, int]]] = None,
+    earlier_turns_offset: int = 0,
+) -> None:
+    """
+    Launch the Gradio chat interface. `concurrency_limit` of None lets any number of turns run at once.
+    The chat of each browser session starts with the `greeting_messages` of its session id.
+
+    With `earlier_turns_pager`, the chat only starts with the latest turns of a resumed game,
+    older ones are paged in on demand into a separate panel, starting from `earlier_turns_offset`.
+    """
+
+    with gr.Blocks(title="AI RPG", theme="soft") as demo:
+        if earlier_turns_pager is not None:
+            pager = earlier_turns_pager
+
+            def load_earlier_turns(offset: int, shown: str, request: gr.Request) -> Tuple[str, int]:
+                return pager(offset, shown, request.session_hash or DEFAULT_SESSION_ID)
+
+            with gr.Accordion("Earlier turns", open=False):
+                load_button = gr.Button("Load earlier turns", size="sm")
+                earlier_turns = gr.Markdown()
+                offset = gr.State(earlier_turns_offset)
+            load_button.click(  # pylint: disable=no-member
+                load_earlier_turns, inputs=[offset, earlier_turns], outputs=[earlier_turns, offset]
+            )
+
+        chatbot = gr.Chatbot(placeholder="The story begins... ", type="messages")
+
+        def greet(request: gr.Request) -> List[Message]:
+            messages = greeting_messages(request.session_hash or DEFAULT_SESSION_ID)
+            return [Message(role=m["role"], content=m["content"]) for m in messages]  # type: ignore
+
+        demo.load(greet, outputs=chatbot)  # pylint: disable=no-member
+        gr.ChatInterface(
+            main_loop,
+            chatbot=chatbot,
+            textbox=gr.Textbox(placeholder="What do you do next?", container=False, scale=8),
+            title="AI RPG",
+            examples=["Look around", "/inventory", "/save"],
+            cache_examples=False,
+            concurrency_limit=concurrency_limit,
+        )
     demo.launch(share=share, server_name="localhost")
@@ -0,0 +1,155 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from .config import UsageLimitsConfig
+
+SECONDS_PER_MINUTE = 60
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously up to its capacity over `period` seconds.
+    LLM calls report their usage once they're done, so it's charged after the fact and the level can go below zero.
+    """
+
+    def __init__(self, capacity: float, period: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period  # per second
+        self._clock = clock
+        self._level = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> float:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._level
+
+    @property
+    def level(self) -> float:
+        with self._lock:
+            return self._refill()
+
+    def charge(self, amount: float) -> None:
+        with self._lock:
+            self._level = self._refill() - amount
+
+    def seconds_until_available(self) -> float:
+        """Seconds until the level is above zero again."""
+        return max(-self.level, 0.0) / self.rate
+
+
+@dataclass(frozen=True)
+class Admission:
+    """How a turn may be played: normally, degraded to save budget, or not at all with a message to the player."""
+
+    degraded: bool = False
+    refusal: Optional[str] = None
+
+    @property
+    def full(self) -> bool:
+        return not self.degraded and self.refusal is None
+
+
+@dataclass
+class UsageQuota:
+    """Tokens per minute and dollars per day of a session or of the whole process, None when they're not limited."""
+
+    tokens: Optional[TokenBucket]
+    dollars: Optional[TokenBucket]
+
+    @classmethod
+    def create(
+        cls,
+        tokens_per_minute: Optional[float],
+        dollars_per_day: Optional[float],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> "UsageQuota":
+        return cls(
+            tokens=TokenBucket(tokens_per_minute, SECONDS_PER_MINUTE, clock) if tokens_per_minute is not None else None,
+            dollars=TokenBucket(dollars_per_day, SECONDS_PER_DAY, clock) if dollars_per_day is not None else None,
+        )
+
+    def charge(self, tokens: int, cost: float) -> None:
+        if self.tokens is not None:
+            self.tokens.charge(tokens)
+        if self.dollars is not None:
+            self.dollars.charge(cost)
+
+    def format(self) -> str:
+        lines = []
+        if self.tokens is not None:
+            lines.append(f"Tokens left this minute: {max(self.tokens.level, 0):,.0f} of {self.tokens.capacity:,.0f}")
+        if self.dollars is not None:
+            lines.append(f"Budget left today: ${max(self.dollars.level, 0):.4f} of ${self.dollars.capacity:.2f}")
+        return "\n".join(lines)
+
+
+class UsageLimiter:
+    """
+    Budgets of LLM usage per session and for the whole process, in tokens per minute and dollars per day.
+
+    Each budget is a token bucket charged with the consumptions of every LLM call, including history summaries
+    and speculated turns. Turns are played normally while all budgets have room, degraded to the fallback model
+    and a shorter history once one of them runs low, and refused once one is used up until it refills.
+    """
+
+    def __init__(self, config: UsageLimitsConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self.global_quota = UsageQuota.create(config.global_tokens_per_minute, config.global_dollars_per_day, clock)
+        self.degraded_turns = 0
+        self.refused_turns = 0
+        self._lock = threading.Lock()
+
+    def session_quota(self) -> UsageQuota:
+        return UsageQuota.create(
+            self.config.session_tokens_per_minute, self.config.session_dollars_per_day, self._clock
+        )
+
+    def charge(self, session_quota: UsageQuota, tokens: int, cost: float) -> None:
+        session_quota.charge(tokens, cost)
+        self.global_quota.charge(tokens, cost)
+
+    def check(self, session_quota: UsageQuota) -> Admission:
+        """How the next turn of the session may be played, without counting it."""
+
+        # the player's own budgets first, so a player using theirs up isn't told it's someone else's fault
+        buckets: List[Tuple[Optional[TokenBucket], str]] = [
+            (session_quota.tokens, "You're acting faster than the game master can keep up. Please wait {wait}."),
+            (session_quota.dollars, "You've used up today's budget of your game. Please come back in {wait}."),
+            (self.global_quota.tokens, "The game master is busy with other players. Please try again in {wait}."),
+            (self.global_quota.dollars, "The game has used up today's budget. Please come back in {wait}."),
+        ]
+        degraded = False
+        for bucket, refusal in buckets:
+            if bucket is None:
+                continue
+            level = bucket.level
+            if level <= 0:
+                return Admission(refusal=refusal.format(wait=format_wait(bucket.seconds_until_available())))
+            degraded = degraded or level < self.config.degrade_below * bucket.capacity
+        return Admission(degraded=degraded)
+
+    def admit(self, session_quota: UsageQuota) -> Admission:
+        """How the next turn of the session may be played, counted into the degraded and refused turns."""
+
+        admission = self.check(session_quota)
+        with self._lock:
+            if admission.refusal is not None:
+                self.refused_turns += 1
+            elif admission.degraded:
+                self.degraded_turns += 1
+        return admission
+
+
+def format_wait(seconds: float) -> str:
+    if seconds < SECONDS_PER_MINUTE:
+        return f"{max(seconds, 1):.0f} seconds"
+    if seconds < 60 * SECONDS_PER_MINUTE:
+        return f"{seconds / SECONDS_PER_MINUTE:.0f} minutes"
+    return f"{seconds / (60 * SECONDS_PER_MINUTE):.1f} hours"
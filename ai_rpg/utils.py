@@ -1,66 +1,125 @@
+import functools
+import itertools
 import os
+import threading
 from datetime import datetime
-from typing import Any, Final, Optional
+from typing import Any, Dict, Optional, Sequence
 
 import yaml
 from council.llm import (
     LLMBase,
+    LLMFallback,
     LLMFunction,
     LLMFunctionResponse,
-    LLMLoggingStrategy,
+    LLMMessage,
     LLMMiddlewareChain,
-    LLMTimestampFileLoggingMiddleware,
     StringResponseParser,
-    get_llm_from_config,
+    get_llm_from_config_obj,
 )
 from council.llm.llm_function.llm_response_parser import LLMResponseParser
-from council.prompt import LLMPromptConfigObject
 
-# Base paths
-BASE_PATH: Final[str] = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
-DATA_PATH: Final[str] = os.path.join(BASE_PATH, "data")
+from .config import LLMLoggingConfig
+from .llm_client import LLMStream, stream_chat_request, with_connection_pool
+from .llm_logging import AsyncLLMLoggingMiddleware, LLMLogWriter
+from .paths import GENERATION_PATH, LOGS_PATH, get_llm_config_path
+from .prompts import LLMConfig, Prompt, get_prompt_registry
+from .standin import STAND_IN_SPEC_KEY, StandInLLM, StandInLLMConfiguration
 
-# Data subdirectories
-CONFIG_PATH: Final[str] = os.path.join(DATA_PATH, "config")
-PROMPTS_PATH: Final[str] = os.path.join(DATA_PATH, "prompts")
-GENERATION_PATH: Final[str] = os.path.join(DATA_PATH, "generation")
 
-# Log directory
-LOGS_PATH: Final[str] = os.path.join(BASE_PATH, "logs")
+def get_llm() -> LLMBase:
+    """
+    LLM client shared by all components and sessions, connections to the provider are pooled.
+    It's built again only once the LLM config is reloaded, sessions keep the client they started with.
+    """
 
-# Config files
-LLM_CONFIG_PATH: Final[str] = os.path.join(CONFIG_PATH, "llm-config.yaml")
-AI_RPG_CONFIG_PATH: Final[str] = os.path.join(CONFIG_PATH, "ai-rpg-config.yaml")
+    return _build_llm(get_prompt_registry().llm_config(get_llm_config_path()))
 
 
-def get_llm() -> LLMBase:
-    return get_llm_from_config(LLM_CONFIG_PATH)
+@functools.lru_cache(maxsize=1)
+def _build_llm(llm_config: LLMConfig) -> LLMBase:
+    if llm_config.is_stand_in:
+        # council doesn't know the stand-in provider, so it's built here
+        return StandInLLM(
+            StandInLLMConfiguration.from_dict(llm_config.provider[STAND_IN_SPEC_KEY], default_logs_path=LOGS_PATH)
+        )
 
+    return with_connection_pool(get_llm_from_config_obj(llm_config.to_config_object()))
+
+
+def get_fallback_llm() -> Optional[LLMBase]:
+    """Model declared with `fallbackProvider` in the LLM config, used by the shared LLM once its calls fail."""
+    llm = get_llm()
+    return llm.fallback if isinstance(llm, LLMFallback) else None
+
+
+_llm_log_writers: Dict[str, LLMLogWriter] = {}  # logs path -> writer
+_llm_log_lock = threading.Lock()
+
+
+def configure_llm_logging(config: LLMLoggingConfig) -> Optional[LLMLogWriter]:
+    """
+    Start the background writer of the LLM call logs shared by all components, None if logging is disabled.
+    The writer of a different earlier config is closed, components log into the new one from then on.
+    """
+
+    with _llm_log_lock:
+        writer = _llm_log_writers.get(LOGS_PATH)
+        if writer is not None and writer.config == config:
+            return writer
+        if writer is not None:
+            del _llm_log_writers[LOGS_PATH]
+            writer.close()
+        if not config.enabled:
+            return None
+        writer = _llm_log_writers[LOGS_PATH] = LLMLogWriter(config, LOGS_PATH)
+        return writer
+
+
+def get_llm_log_writer() -> Optional[LLMLogWriter]:
+    """Writer started by `configure_llm_logging`, None until then or if logging is disabled."""
+    return _llm_log_writers.get(LOGS_PATH)
+
+
+def get_llm_with_logging(component_name: str, llm: Optional[LLMBase] = None) -> LLMMiddlewareChain:
+    writer = get_llm_log_writer()
+    middlewares = [AsyncLLMLoggingMiddleware(writer, component_name)] if writer is not None else []
+    return LLMMiddlewareChain(llm=llm or get_llm(), middlewares=middlewares)
 
-def get_llm_with_logging(component_name: str) -> LLMMiddlewareChain:
-    logging_middleware = LLMTimestampFileLoggingMiddleware(
-        path=LOGS_PATH, strategy=LLMLoggingStrategy.VerboseWithConsumptions, component_name=component_name
-    )
-    return LLMMiddlewareChain(llm=get_llm(), middlewares=[logging_middleware])
 
+def stream_with_logging(
+    component_name: str, messages: Sequence[LLMMessage], llm: Optional[LLMBase] = None
+) -> LLMStream:
+    """Stream a completion of the shared LLM by default, logged like calls of `get_llm_with_logging` chains."""
 
-def get_prompt(filename: str) -> LLMPromptConfigObject:
-    return LLMPromptConfigObject.from_yaml(os.path.join(PROMPTS_PATH, filename))
+    stream = stream_chat_request(llm or get_llm(), messages)
+    writer = get_llm_log_writer()
+    return AsyncLLMLoggingMiddleware(writer, component_name).log_stream(messages, stream) if writer else stream
+
+
+def get_prompt(filename: str) -> Prompt:
+    """Prompt from the prompts directory, loaded and compiled once per process."""
+    return get_prompt_registry().prompt(filename)
+
+
+def format_system_prompt(prompt_filename: str, **kwargs) -> str:
+    return get_prompt(prompt_filename).system.format(**kwargs)
 
 
 def get_llm_function(
     prompt_filename: str, response_parser: Optional[LLMResponseParser] = None, **kwargs
 ) -> LLMFunction:
-    prompt = get_prompt(prompt_filename)
-    system_prompt_template = prompt.get_system_prompt_template()
     parser = response_parser or StringResponseParser.from_response
     return LLMFunction(
         llm=get_llm_with_logging(prompt_filename[:-5]),  # remove .yaml
         response_parser=parser,
-        system_message=system_prompt_template.format(**kwargs),
+        system_message=format_system_prompt(prompt_filename, **kwargs),
     )
 
 
+def format_language_instructions(language: Optional[str]) -> str:
+    return f"- Respond in {language}" if language is not None else ""
+
+
 def format_duration_and_cost(llm_response: LLMFunctionResponse) -> str:
     message = f"in {llm_response.duration:.2f} seconds"
     for consumption in llm_response.consumptions:
@@ -87,15 +146,36 @@ def save_yaml(*, content: Any, path: str) -> None:
         yaml.dump(content, f, sort_keys=False, default_flow_style=False, allow_unicode=True, Dumper=CustomDumper)
 
 
+def read_yaml(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def unique_filename(*, path: str, prefix: str, extension: str) -> str:
+    """
+    Timestamped filename that doesn't exist in `path` yet.
+    The file is created empty right away, so parallel generations never pick the same name.
+    """
+
+    filename_without_extension = f"{prefix}{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+    for i in itertools.count():
+        filename = f"{filename_without_extension}{f'_{i}' if i else ''}{extension}"
+        try:
+            with open(os.path.join(path, filename), "x", encoding="utf-8"):
+                return filename
+        except FileExistsError:
+            continue
+    raise AssertionError("unreachable")
+
+
 def save_generation(*, content: Any, prefix: str) -> str:
     """Save a generation to a file, either as a markdown or a yaml."""
 
-    filename_without_extension = f"{prefix}{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
     if isinstance(content, str):
-        filename = f"{filename_without_extension}.md"
+        filename = unique_filename(path=GENERATION_PATH, prefix=prefix, extension=".md")
         save_str(content=content, path=os.path.join(GENERATION_PATH, filename))
     else:
-        filename = f"{filename_without_extension}.yaml"
+        filename = unique_filename(path=GENERATION_PATH, prefix=prefix, extension=".yaml")
         save_yaml(content=content, path=os.path.join(GENERATION_PATH, filename))
 
     print(f"\nSaved into {filename}")
@@ -0,0 +1,35 @@
+"""
+Odds of each outcome of the dice legend for the configured difficulty or a given dice expression, to tune it offline.
+The distribution is exact when the dice allow it, otherwise it's estimated with vectorized Monte Carlo rolls.
+"""
+
+import argparse
+import time
+
+from ai_rpg import AIRPGConfig
+from ai_rpg.dice import BATCH_CHUNK_SIZE, DiceExpression, analyze_difficulty
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-d", "--dice", help="Dice expression such as 2d20kh1 or 4d6kh3+2, the configured one by default"
+    )
+    parser.add_argument("-n", "--samples", type=int, default=BATCH_CHUNK_SIZE, help="Number of Monte Carlo rolls")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the Monte Carlo rolls")
+    parser.add_argument(
+        "--monte-carlo", action="store_true", help="Estimate the distribution even if it can be computed exactly"
+    )
+    args = parser.parse_args()
+
+    config = AIRPGConfig.load()
+    expression = DiceExpression.parse(args.dice) if args.dice else DiceExpression.from_config(config.difficulty)
+
+    start = time.perf_counter()
+    odds = analyze_difficulty(
+        config.difficulty, expression, samples=args.samples, seed=args.seed, exact=not args.monte_carlo
+    )
+    duration = time.perf_counter() - start
+
+    print(odds.format())
+    if odds.samples is not None:
+        print(f"\nRolled {odds.samples * expression.dice_count / duration:,.0f} dice per second")
@@ -0,0 +1,178 @@
+"""
+Headless entry point: play in the terminal, serve the HTTP/JSON API, generate games, load test or replay saved games.
+It never imports Gradio, and each command only imports what it uses, so it starts as fast as possible.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+from typing import TYPE_CHECKING
+
+import dotenv
+
+if TYPE_CHECKING:
+    from ai_rpg.ai_rpg import AIRPG
+
+# Modules each command imports, profiled with --profile-imports
+COMMAND_MODULES = {
+    "play": ["ai_rpg.terminal"],
+    "serve": ["ai_rpg.api"],
+    "generate": ["ai_rpg.generators.pool"],
+    "benchmark": ["ai_rpg.benchmark"],
+    "replay": ["ai_rpg.replay"],
+    "simulate": ["ai_rpg.simulation"],
+    "tokenizer": ["ai_rpg.tokens"],
+}
+
+
+def load_game(args: argparse.Namespace) -> "AIRPG":
+    from ai_rpg.ai_rpg import AIRPG
+    from ai_rpg.config import AIRPGConfig
+
+    return AIRPG(AIRPGConfig.load(), resume_from=args.resume)
+
+
+def play(args: argparse.Namespace) -> None:
+    from ai_rpg.terminal import run_terminal
+
+    run_terminal(load_game(args))
+
+
+def serve(args: argparse.Namespace) -> None:
+    from ai_rpg.api import serve_api
+
+    serve_api(load_game(args), args.host, args.port)
+
+
+def generate(args: argparse.Namespace) -> None:
+    from ai_rpg.config import AIRPGConfig
+    from ai_rpg.generators.pool import pregenerate_bundles
+    from ai_rpg.utils import configure_llm_logging
+
+    config = AIRPGConfig.load()
+    configure_llm_logging(config.llm_logging)
+    filenames = pregenerate_bundles(args.count, args.setting, config.language, max_workers=args.workers)
+    print(f"\nAdded {len(filenames)} bundles to the pool: {', '.join(filenames)}")
+
+
+def benchmark(args: argparse.Namespace) -> None:
+    from ai_rpg.benchmark import load_benchmark_game, run_benchmark
+
+    with tempfile.TemporaryDirectory(prefix="ai-rpg-benchmark-") as saves_path:
+        game = load_benchmark_game(args.players, args.llm_config, saves_path)
+        report = asyncio.run(run_benchmark(game, args.players, args.turns, seed=args.seed))
+    print(f"\n{report.format()}")
+    if game.telemetry is not None:
+        print(f"Turn spans:\n{game.telemetry.format_summary()}")
+
+
+def simulate(args: argparse.Namespace) -> None:
+    from ai_rpg.benchmark import load_benchmark_game
+    from ai_rpg.simulation import load_report, run_simulation
+
+    with tempfile.TemporaryDirectory(prefix="ai-rpg-simulation-") as saves_path:
+        game = load_benchmark_game(args.games, args.llm_config, saves_path)
+        report = run_simulation(game, args.games, args.turns, player=args.player, seed=args.seed, label=args.label)
+    print(f"\n{report.format()}")
+    print(f"Report saved to {report.save()}")
+    if args.compare:
+        print(f"\n{report.format_comparison(load_report(args.compare))}")
+
+
+def tokenizer(args: argparse.Namespace) -> None:
+    from ai_rpg.paths import LLM_CONFIG_ENV_VAR, TOKENIZERS_PATH
+    from ai_rpg.tokens import load_tokenizer
+
+    if args.llm_config is not None:
+        os.environ[LLM_CONFIG_ENV_VAR] = args.llm_config
+    if load_tokenizer(download=True):
+        print(f"Tokenizer cached in {TOKENIZERS_PATH}")
+
+
+def replay(args: argparse.Namespace) -> None:
+    from ai_rpg.ai_rpg import AIRPG
+    from ai_rpg.config import AIRPGConfig
+    from ai_rpg.journal import SAVES_PATH
+    from ai_rpg.paths import LLM_CONFIG_ENV_VAR
+    from ai_rpg.replay import replay_game
+
+    if args.llm_config is not None:
+        os.environ[LLM_CONFIG_ENV_VAR] = args.llm_config
+    journal_path = os.path.join(SAVES_PATH, args.journal)
+    with tempfile.TemporaryDirectory(prefix="ai-rpg-replay-") as saves_path:
+        # the saved game is resumed by its full path, the replayed turns are saved into the temporary directory
+        game = AIRPG(AIRPGConfig.load(), resume_from=journal_path, saves_path=saves_path)
+        for action, response in replay_game(game, journal_path):
+            print(f"\n> {action}\n{response}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--profile-imports",
+        action="store_true",
+        help="Report import time per module of the command instead of running it",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    play_parser = commands.add_parser("play", help="Play in the terminal")
+    play_parser.add_argument("--resume", help="Journal filename from data/generation/saves to continue the game from")
+    play_parser.set_defaults(run=play)
+
+    serve_parser = commands.add_parser("serve", help="Serve the HTTP/JSON API")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    serve_parser.add_argument("--resume", help="Journal filename from data/generation/saves to continue the game from")
+    serve_parser.set_defaults(run=serve)
+
+    generate_parser = commands.add_parser("generate", help="Generate complete games into the pool")
+    generate_parser.add_argument("-n", "--count", type=int, default=1, help="Number of bundles to generate")
+    generate_parser.add_argument(
+        "--setting", default="", help="World setting to use as a starting seed, random if empty"
+    )
+    generate_parser.add_argument("--workers", type=int, default=4, help="Number of bundles generated at the same time")
+    generate_parser.set_defaults(run=generate)
+
+    benchmark_parser = commands.add_parser("benchmark", help="Load test the game loop with simulated players")
+    benchmark_parser.add_argument("-p", "--players", type=int, default=32, help="Number of concurrent players")
+    benchmark_parser.add_argument("-t", "--turns", type=int, default=10, help="Number of turns played by each player")
+    benchmark_parser.add_argument(
+        "--llm-config", default="llm-standin-config.yaml", help="LLM config file from the data/config directory"
+    )
+    benchmark_parser.add_argument("--seed", type=int, default=0, help="Seed of the simulated players' actions")
+    benchmark_parser.set_defaults(run=benchmark)
+
+    simulate_parser = commands.add_parser("simulate", help="Auto-play games and report their tokens, failures and cost")
+    simulate_parser.add_argument("-g", "--games", type=int, default=8, help="Number of games played in parallel")
+    simulate_parser.add_argument("-t", "--turns", type=int, default=10, help="Number of turns of each game")
+    simulate_parser.add_argument("--player", choices=["llm", "scripted"], default="scripted", help="Player agent")
+    simulate_parser.add_argument(
+        "--llm-config", default="llm-standin-config.yaml", help="LLM config file from the data/config directory"
+    )
+    simulate_parser.add_argument("--seed", type=int, default=0, help="Seed of the players' actions and the dice")
+    simulate_parser.add_argument(
+        "--label", help="Name of the report in data/generation/simulations, the time by default"
+    )
+    simulate_parser.add_argument("--compare", help="Label or path of an earlier report to compare with")
+    simulate_parser.set_defaults(run=simulate)
+
+    tokenizer_parser = commands.add_parser(
+        "tokenizer", help="Download the tokenizer of the model into data/tokenizers, to ship it with the game"
+    )
+    tokenizer_parser.add_argument("--llm-config", help="LLM config file from the data/config directory")
+    tokenizer_parser.set_defaults(run=tokenizer)
+
+    replay_parser = commands.add_parser("replay", help="Play the actions of a saved game again and print the responses")
+    replay_parser.add_argument("journal", help="Journal filename from data/generation/saves")
+    replay_parser.add_argument("--llm-config", help="LLM config file from the data/config directory")
+    replay_parser.set_defaults(run=replay)
+
+    args = parser.parse_args()
+    if args.profile_imports:
+        from ai_rpg.profiling import format_import_profile, profile_imports
+
+        print(format_import_profile(profile_imports(COMMAND_MODULES[args.command])))
+    else:
+        dotenv.load_dotenv()
+        args.run(args)
@@ -3,12 +3,25 @@ The main entry point for the AI RPG.
 Loads environment variables, configures the game, and starts the Gradio UI.
 """
 
+import argparse
+
 import dotenv
 
 from ai_rpg import AIRPG, AIRPGConfig
+from ai_rpg.profiling import format_import_profile, profile_imports
 
 if __name__ == "__main__":
-    dotenv.load_dotenv()
-    config = AIRPGConfig.load()
-    game = AIRPG(config)
-    game.run()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resume", help="Journal filename from data/generation/saves to continue the game from")
+    parser.add_argument(
+        "--profile-imports", action="store_true", help="Report import time per module at startup instead of running"
+    )
+    args = parser.parse_args()
+
+    if args.profile_imports:
+        print(format_import_profile(profile_imports(["ai_rpg.ai_rpg", "ai_rpg.ui"])))
+    else:
+        dotenv.load_dotenv()
+        config = AIRPGConfig.load()
+        game = AIRPG(config, resume_from=args.resume)
+        game.run()
@@ -9,4 +9,6 @@ def test_main_loop(message: str, history: List[List[str]]) -> str:
 
 
 if __name__ == "__main__":
-    start_game_ui(test_main_loop, greeting_message="Test greeting message")
+    start_game_ui(
+        test_main_loop, greeting_messages=lambda _: [{"role": "assistant", "content": "Test greeting message"}]
+    )
@@ -0,0 +1,73 @@
+from typing import Callable, Optional
+
+import pytest
+
+from ai_rpg.ai_rpg import AIRPG
+from ai_rpg.config import AIRPGConfig
+from ai_rpg.paths import LLM_CONFIG_ENV_VAR
+from ai_rpg.standin import StandInLLM, StandInLLMConfiguration
+
+StandInLLMFactory = Callable[..., StandInLLM]
+
+
+@pytest.fixture
+def make_stand_in_llm(tmp_path) -> StandInLLMFactory:
+    """Synthetic stand-in LLMs with a constant latency, deterministic for a given seed."""
+
+    def make(latency: float = 0.0, seed: int = 1) -> StandInLLM:
+        return StandInLLM(
+            StandInLLMConfiguration(
+                mode="synthetic",
+                latency_median=latency,
+                latency_sigma=0.0,
+                stream_chunk_chars=16,
+                logs_path=str(tmp_path),
+                seed=seed,
+            )
+        )
+
+    return make
+
+
+STAND_IN_LLM_CONFIG = """
+kind: LLMConfig
+version: 0.1
+metadata:
+  name: llm-test
+spec:
+  description: "Stand-in without latency for tests"
+  provider:
+    name: StandIn
+    standInSpec:
+      mode: synthetic
+      latency:
+        median: 0.0
+        sigma: 0.0
+      streamChunkChars: 16
+      seed: 1
+"""
+
+GameFactory = Callable[..., AIRPG]
+
+
+@pytest.fixture
+def stand_in_llm_config(tmp_path, monkeypatch) -> str:
+    """Path of a stand-in LLM config without latency, selected for the test."""
+
+    path = tmp_path / "llm-test.yaml"
+    path.write_text(STAND_IN_LLM_CONFIG, encoding="utf-8")
+    monkeypatch.setenv(LLM_CONFIG_ENV_VAR, str(path))  # an absolute path is joined to the config directory as is
+    return str(path)
+
+
+@pytest.fixture
+def make_game(tmp_path, stand_in_llm_config) -> GameFactory:
+    """Games against the stand-in LLM, saving into a temporary directory instead of the players' saves."""
+
+    def make(config: Optional[AIRPGConfig] = None, resume_from: Optional[str] = None) -> AIRPG:
+        if config is None:
+            config = AIRPGConfig.load()
+            config.cache.enabled = False
+        return AIRPG(config, resume_from=resume_from, saves_path=str(tmp_path / "saves"))
+
+    return make
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from ai_rpg.api import GameAPI
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        pass
+
+
+def serve(api: GameAPI, request: bytes):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(request)
+        reader.feed_eof()
+        writer = RecordingWriter()
+        keep_alive = await api._serve_request(await reader.readline(), reader, writer)
+        return writer.data, keep_alive
+
+    data, keep_alive = asyncio.run(run())
+    head, _, body = data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body), keep_alive
+
+
+def post(path: str, body: bytes) -> bytes:
+    return f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+
+
+@pytest.fixture
+def api(make_game):
+    return GameAPI(make_game())
+
+
+def test_turn_is_played(api):
+    status, body, keep_alive = serve(api, post("/sessions", b""))
+    assert status == 201 and keep_alive
+
+    status, body, _ = serve(api, post(f"/sessions/{body['session_id']}/turns", b'{"action": "Look around"}'))
+    assert status == 200
+    assert body["roll"] is not None
+
+
+@pytest.mark.parametrize(
+    "request_bytes",
+    [
+        b"GARBAGE\r\n\r\n",
+        b"POST /sessions HTTP/1.1\r\nContent-Length: many\r\n\r\n",
+        b"POST / HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+    ],
+)
+def test_malformed_requests_are_rejected(api, request_bytes):
+    status, body, keep_alive = serve(api, request_bytes)
+    assert status == 400
+    assert body == {"error": "Malformed request"}
+    assert not keep_alive
+
+
+def test_turns_of_unknown_sessions_are_not_found(api):
+    status, _, keep_alive = serve(api, post("/sessions/unknown/turns", b'{"action": "Look around"}'))
+
+    assert status == 404 and keep_alive
+    assert len(api.game.sessions) == 0  # looking it up didn't start one
+
+
+def test_invalid_action_is_a_bad_request(api):
+    _, body, _ = serve(api, post("/sessions", b""))
+    status, _, keep_alive = serve(api, post(f"/sessions/{body['session_id']}/turns", b"not json"))
+    assert status == 400 and keep_alive
+
+
+def test_internal_value_errors_are_server_errors(api, monkeypatch):
+    async def fail(session, action):
+        raise ValueError("broken game state")
+
+    monkeypatch.setattr(api.game, "aplay", fail)
+    _, body, _ = serve(api, post("/sessions", b""))
+
+    status, body, keep_alive = serve(api, post(f"/sessions/{body['session_id']}/turns", b'{"action": "Look around"}'))
+    assert status == 500
+    assert body == {"error": "Internal server error"}
+    assert keep_alive
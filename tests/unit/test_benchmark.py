@@ -0,0 +1,23 @@
+import asyncio
+import os
+
+from ai_rpg.benchmark import load_benchmark_game, run_benchmark
+from ai_rpg.journal import SAVES_PATH
+from ai_rpg.simulation import run_simulation
+
+
+def list_saves():
+    return set(os.listdir(SAVES_PATH)) if os.path.isdir(SAVES_PATH) else set()
+
+
+def test_benchmark_and_simulation_save_outside_the_players_saves(stand_in_llm_config, tmp_path):
+    saves_before = list_saves()
+    game = load_benchmark_game(2, stand_in_llm_config, str(tmp_path / "benchmark"))
+
+    report = asyncio.run(run_benchmark(game, players=2, turns=2))
+    simulation = run_simulation(game, games=2, turns=2)
+
+    assert report.completed_turns == 4
+    assert len(simulation.completed_turns) == 4
+    assert len(os.listdir(tmp_path / "benchmark")) >= 4  # a journal per session, with its memory index if enabled
+    assert list_saves() == saves_before
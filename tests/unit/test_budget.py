@@ -0,0 +1,66 @@
+import hashlib
+import threading
+
+import tiktoken
+from council.contexts import Consumption
+
+from ai_rpg import tokens
+from ai_rpg.budget import CompletionEstimate, PromptBudget
+
+
+def test_budget_reports_sections_and_whether_counts_are_exact():
+    budget = PromptBudget(sections={"world": 100, "action": 20}, completion_tokens=50, cost_card=None, exact=False)
+    assert budget.prompt_tokens == 120
+    assert budget.projected_cost is None
+    text = budget.format()
+    assert "Prompt      120 tokens" in text
+    assert "Token counts: estimated" in text
+    assert "Token counts: exact" in PromptBudget(sections={"world": 1}, completion_tokens=1, cost_card=None).format()
+
+
+def test_completion_estimate_averages_observed_responses():
+    estimate = CompletionEstimate(initial=300)
+    assert estimate.tokens == 300
+    estimate.observe([Consumption.token(100, "model:completion_tokens"), Consumption.token(7, "model:prompt_tokens")])
+    estimate.observe([Consumption.token(200, "model:completion_tokens")])
+    assert estimate.tokens == 150
+
+
+def test_tokenizer_is_never_loaded_on_the_request_path(monkeypatch):
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load(model, download):
+        loading.set()
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(tokens, "_encodings", {})
+    monkeypatch.setattr(tokens, "_loading", set())
+    monkeypatch.setattr(tokens, "_load_encoding", slow_load)
+    monkeypatch.setattr(tokens, "_configured_model", lambda: "some-model")
+
+    # counted right away with the estimate while the tokenizer loads in the background
+    assert tokens.count_tokens("Look around the room") == tokens.estimate_tokens("Look around the room")
+    assert not tokens.tokens_exact()
+    assert loading.wait(5)
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == "ai-rpg-tokenizer":
+            thread.join(5)
+    assert "some-model" in tokens._encodings  # pylint: disable=protected-access
+
+
+def test_tokenizer_is_only_downloaded_on_request(tmp_path, monkeypatch):
+    loaded = []
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(tiktoken, "get_encoding", loaded.append)
+
+    assert tokens._load_encoding("gpt-4o-mini", download=False) is None  # pylint: disable=protected-access
+    assert not loaded
+
+    tokens._load_encoding("gpt-4o-mini", download=True)  # pylint: disable=protected-access
+    cache_key = hashlib.sha1(tokens.ENCODING_URL.format("o200k_base").encode()).hexdigest()
+    (tmp_path / cache_key).write_bytes(b"")
+    tokens._load_encoding("gpt-4o-mini", download=False)  # pylint: disable=protected-access
+    assert loaded == ["o200k_base", "o200k_base"]
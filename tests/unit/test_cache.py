@@ -0,0 +1,46 @@
+import pytest
+
+from ai_rpg.config import CacheConfig
+from ai_rpg.generators.cache import GenerationCache
+
+PROMPT_FILENAME = "world-generation.yaml"
+GENERATION = "x" * 800  # each entry takes a bit over 800 bytes
+
+
+@pytest.fixture
+def make_cache(tmp_path, stand_in_llm_config):
+    def make() -> GenerationCache:
+        # room for two entries
+        config = CacheConfig(enabled=True, mode="exact", variants=1, max_size_mb=2000 / 1024 / 1024)
+        return GenerationCache(config, path=str(tmp_path / "cache"))
+
+    return make
+
+
+def generate(cache: GenerationCache, input_text: str) -> None:
+    cache.get_or_generate(PROMPT_FILENAME, input_text, lambda: GENERATION)
+
+
+def test_least_recently_used_entries_are_evicted_once_the_cache_is_full(make_cache):
+    cache = make_cache()
+    generate(cache, "first")
+    generate(cache, "second")
+    generate(cache, "first")  # reused, so "second" is now the least recently used
+    generate(cache, "third")
+
+    assert cache.stats() == {"hits": 1, "misses": 3}
+    generate(cache, "first")
+    generate(cache, "second")
+    assert cache.stats() == {"hits": 2, "misses": 4}
+
+
+def test_entries_cached_by_an_earlier_process_count_towards_the_size(make_cache):
+    generate(make_cache(), "first")
+    generate(make_cache(), "second")
+
+    cache = make_cache()
+    generate(cache, "third")  # evicts "first", the oldest
+
+    generate(cache, "second")
+    generate(cache, "first")
+    assert cache.stats() == {"hits": 1, "misses": 2}
@@ -0,0 +1,159 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence
+
+import pytest
+from council.contexts import Consumption
+from council.llm import LLMFunction, LLMMessage, LLMParsingException, StringResponseParser
+from council.llm.llm_function.llm_function import FunctionOutOfRetryError
+
+from ai_rpg.call_policy import LatencyTracker, LLMCallPolicy
+from ai_rpg.config import LLMCallsConfig
+
+MESSAGES = [LLMMessage.user_message("Look around")]
+
+
+def make_config(max_retries: int = 2, hedging: bool = False) -> LLMCallsConfig:
+    return LLMCallsConfig(
+        max_retries=max_retries,
+        fallback_on_parse_failure=True,
+        hedging=hedging,
+        hedge_percentile=95.0,
+        hedge_min_samples=5,
+    )
+
+
+def make_function(llm, parser=StringResponseParser.from_response, max_retries: int = 2) -> LLMFunction:
+    return LLMFunction(llm, parser, system_message="You are the game master.", max_retries=max_retries)
+
+
+def always_invalid(response):
+    raise LLMParsingException("invalid response")
+
+
+class ChargedCalls:
+    def __init__(self) -> None:
+        self.calls: List[Sequence[Consumption]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, consumptions: Sequence[Consumption]) -> None:
+        with self._lock:
+            self.calls.append(consumptions)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(int(c.value) for call in self.calls for c in call if c.kind.endswith(":prompt_tokens"))
+
+
+def test_failed_attempts_and_fallback_are_all_charged(make_stand_in_llm):
+    charged = ChargedCalls()
+    policy = LLMCallPolicy(
+        config=make_config(),
+        llm_function_factory=lambda: make_function(make_stand_in_llm(), always_invalid),
+        fallback_llm_function_factory=lambda: make_function(make_stand_in_llm()),
+        on_consumptions=charged,
+        latencies=LatencyTracker(),
+        executor=None,
+    )
+    outcome = policy.execute(MESSAGES)
+    assert outcome.fell_back
+    assert len(charged.calls) == 3 + 1  # the first attempt and two self-corrections, then the fallback
+    assert charged.prompt_tokens > 0
+
+
+def test_calls_running_out_of_retries_are_charged(make_stand_in_llm):
+    charged = ChargedCalls()
+    policy = LLMCallPolicy(
+        config=make_config(max_retries=1),
+        llm_function_factory=lambda: make_function(make_stand_in_llm(), always_invalid, max_retries=1),
+        fallback_llm_function_factory=None,
+        on_consumptions=charged,
+        latencies=LatencyTracker(),
+        executor=None,
+    )
+    with pytest.raises(FunctionOutOfRetryError):
+        policy.execute(MESSAGES)
+    assert len(charged.calls) == 2
+
+
+def test_final_response_is_charged_once(make_stand_in_llm):
+    charged = ChargedCalls()
+    policy = LLMCallPolicy(
+        config=make_config(),
+        llm_function_factory=lambda: make_function(make_stand_in_llm()),
+        fallback_llm_function_factory=None,
+        on_consumptions=charged,
+        latencies=LatencyTracker(),
+        executor=None,
+    )
+    outcome = policy.execute(MESSAGES)
+    assert len(charged.calls) == 1
+    assert list(charged.calls[0]) == list(outcome.llm_response.consumptions)
+
+
+def test_losing_hedged_request_is_charged_once_it_returns(make_stand_in_llm):
+    charged = ChargedCalls()
+    latencies = LatencyTracker()
+    for _ in range(5):
+        latencies.observe(0.01)
+    # the policy's own function is never used when hedging, each request gets a new one
+    llms = iter([make_stand_in_llm(), make_stand_in_llm(latency=0.3), make_stand_in_llm()])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        policy = LLMCallPolicy(
+            config=make_config(hedging=True),
+            llm_function_factory=lambda: make_function(next(llms)),
+            fallback_llm_function_factory=None,
+            on_consumptions=charged,
+            latencies=latencies,
+            executor=executor,
+        )
+        outcome = policy.execute(MESSAGES)
+        assert outcome.hedged
+        assert len(charged.calls) == 1
+        time.sleep(0.4)
+    assert len(charged.calls) == 2
+
+
+def test_stream_is_charged_once_exhausted(make_stand_in_llm):
+    charged = ChargedCalls()
+    llm = make_stand_in_llm()
+    policy = LLMCallPolicy(
+        config=make_config(),
+        llm_function_factory=lambda: make_function(llm),
+        fallback_llm_function_factory=None,
+        on_consumptions=charged,
+        latencies=LatencyTracker(),
+        executor=None,
+        stream_factory=llm.stream_chat_request,
+    )
+    outcome = policy.stream(MESSAGES)
+    assert not charged.calls
+    text = "".join(outcome.stream)
+    assert text.startswith("Stand-in text.")
+    assert len(charged.calls) == 1
+    assert list(charged.calls[0]) == list(outcome.stream.consumptions)
+
+
+def test_losing_hedged_stream_is_charged_once_drained(make_stand_in_llm):
+    charged = ChargedCalls()
+    latencies = LatencyTracker()
+    for _ in range(5):
+        latencies.observe(0.01)
+    llms = iter([make_stand_in_llm(latency=0.6), make_stand_in_llm()])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        policy = LLMCallPolicy(
+            config=make_config(hedging=True),
+            llm_function_factory=lambda: make_function(make_stand_in_llm()),
+            fallback_llm_function_factory=None,
+            on_consumptions=charged,
+            latencies=latencies,
+            executor=executor,
+            stream_factory=lambda messages: next(llms).stream_chat_request(messages),
+        )
+        outcome = policy.stream(MESSAGES)
+        assert outcome.hedged
+        "".join(outcome.stream)
+        assert len(charged.calls) == 1
+        time.sleep(0.8)
+    assert len(charged.calls) == 2
@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+
+from ai_rpg.concurrency import RequestLimiter, ServerBusyError
+from ai_rpg.config import ConcurrencyConfig
+
+
+def make_limiter(max_in_flight: int = 1, max_queued: int = 10, request_timeout: float = 5.0) -> RequestLimiter:
+    return RequestLimiter(
+        ConcurrencyConfig(max_in_flight=max_in_flight, max_queued=max_queued, request_timeout=request_timeout)
+    )
+
+
+def sleeper(seconds: float, result: str = "done"):
+    def fn(cancelled):
+        time.sleep(seconds)
+        return result
+
+    return fn
+
+
+def test_timed_out_work_keeps_its_slot_until_done():
+    async def scenario():
+        limiter = make_limiter(request_timeout=0.1)
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.run(sleeper(0.4))
+        assert limiter.running == 1  # still executing in its worker thread
+        await asyncio.sleep(0.5)
+        assert limiter.running == 0
+        assert await limiter.run(sleeper(0.01, "next")) == "next"
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_request_sets_cancelled():
+    events = []
+
+    def fn(cancelled):
+        events.append(cancelled)
+        time.sleep(0.3)
+
+    async def scenario():
+        limiter = make_limiter(request_timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.run(fn)
+        await asyncio.sleep(0.35)
+
+    asyncio.run(scenario())
+    assert events[0].is_set()
+
+
+def test_rejects_requests_over_the_queue_limit():
+    async def scenario():
+        limiter = make_limiter(max_in_flight=1, max_queued=1)
+        first = asyncio.create_task(limiter.run(sleeper(0.2)))
+        second = asyncio.create_task(limiter.run(sleeper(0.01)))
+        await asyncio.sleep(0)
+        with pytest.raises(ServerBusyError):
+            await limiter.run(sleeper(0.01))
+        assert await asyncio.gather(first, second) == ["done", "done"]
+
+    asyncio.run(scenario())
+
+
+def test_slots_go_to_waiting_sessions_in_turn():
+    order = []
+
+    def job(name):
+        def fn(cancelled):
+            time.sleep(0.01)
+            order.append(name)
+
+        return fn
+
+    async def scenario():
+        limiter = make_limiter(max_in_flight=1, max_queued=20)
+        tasks = [asyncio.create_task(limiter.run(job(f"a{i}"), "a")) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(limiter.run(job("b0"), "b")))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    # a0 was running and a1 waiting when b0 arrived, b0 is served before the rest of a's requests
+    assert order == ["a0", "a1", "b0", "a2", "a3"]
+
+
+def test_stream_holds_its_slot_until_exhausted():
+    def updates(cancelled):
+        for i in range(3):
+            time.sleep(0.02)
+            yield i
+
+    async def scenario():
+        limiter = make_limiter()
+        received = []
+        async for update in limiter.stream(updates):
+            assert limiter.running == 1
+            received.append(update)
+        assert received == [0, 1, 2]
+        assert limiter.running == 0 and limiter.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_stream_times_out_between_updates():
+    events = []
+    closed = []
+
+    def updates(cancelled):
+        events.append(cancelled)
+        try:
+            yield "first"
+            time.sleep(0.3)
+            yield "late"
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        limiter = make_limiter(request_timeout=0.1)
+        received = []
+        with pytest.raises(asyncio.TimeoutError):
+            async for update in limiter.stream(updates):
+                received.append(update)
+        assert received == ["first"]
+        assert limiter.running == 1  # the slow update is still being produced
+        await asyncio.sleep(0.3)
+        assert limiter.running == 0
+
+    asyncio.run(scenario())
+    assert events[0].is_set()
+    assert closed == [True]  # closed once the slow update was produced
+
+
+def test_stream_left_early_closes_its_iterator_before_releasing_the_slot():
+    closed = []
+
+    def updates(cancelled):
+        try:
+            for i in range(10):
+                time.sleep(0.02)
+                yield i
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        limiter = make_limiter()
+        stream = limiter.stream(updates)
+        async for update in stream:
+            if update == 1:
+                break
+        await stream.aclose()
+        await asyncio.sleep(0.1)
+        assert closed == [True]
+        assert limiter.running == 0 and limiter.pending == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+from ai_rpg.config import AIRPGConfig
+
+MINIMAL_CONFIG = """
+generation:
+  world: world_example.md
+  story: story_example.md
+  starting_inventory: inventory_example.yaml
+difficulty:
+  number_of_dice: 1
+  dice_combine_method: "avg"
+  dice_legend: "- 1-20: Anything goes."
+language: null
+"""
+
+
+def load(tmp_path, text: str) -> AIRPGConfig:
+    path = tmp_path / "ai-rpg-config.yaml"
+    path.write_text(text, encoding="utf-8")
+    return AIRPGConfig.from_yaml(str(path))
+
+
+def test_config_without_memory_section_loads_with_memory_off(tmp_path):
+    config = load(tmp_path, MINIMAL_CONFIG)
+
+    assert not config.memory.enabled
+    assert config.memory.top_k == 4
+    assert config.memory.setup_in_system_prompt
+
+
+def test_memory_settings_missing_from_the_section_take_defaults(tmp_path):
+    assert load(tmp_path, MINIMAL_CONFIG + "memory:\n").memory.max_tokens == 1000
+
+    config = load(tmp_path, MINIMAL_CONFIG + "memory:\n  enabled: true\n  top_k: 2\n")
+
+    assert config.memory.enabled
+    assert config.memory.top_k == 2
+    assert config.memory.chunk_tokens == 200
+
+
+def test_shipped_config_keeps_memory_opt_in():
+    assert not AIRPGConfig.load().memory.enabled
@@ -0,0 +1,58 @@
+import dataclasses
+
+import pytest
+
+from ai_rpg.config import DifficultyConfig
+from ai_rpg.dice import DiceExpression, DiceRoller
+
+
+@pytest.mark.parametrize(
+    "text, modifier",
+    [("2d6+3", 3), ("2d6 + 3", 3), ("  2d6 - 1 ", -1), ("2d6 +3", 3), ("2d6", 0), ("1d20 + 2d6kh1 - 2", -2)],
+)
+def test_parse_allows_spaces_around_operators(text, modifier):
+    expression = DiceExpression.parse(text)
+    assert expression.modifier == modifier
+    assert expression.terms[0].count == int(text.strip()[0])
+
+
+@pytest.mark.parametrize("text", ["2d6 3", "2 d6", "2d 6", "4d6kh 3", "2d6 +", "", "3", "1d20 2d6", "2d6kh3"])
+def test_parse_rejects_invalid_expressions(text):
+    with pytest.raises(ValueError):
+        DiceExpression.parse(text)
+
+
+def test_parse_keeps_and_averages():
+    term = DiceExpression.parse("4d6KL3").terms[0]
+    assert (term.count, term.sides, term.keep, term.keep_lowest) == (4, 6, 3, True)
+    assert DiceExpression.parse("3d20avg").terms[0].average
+
+
+def test_exact_distribution_of_a_sum():
+    distribution = DiceExpression.parse("2d6 + 1").exact_distribution()
+    assert distribution is not None
+    assert (distribution.low, distribution.high) == (3, 13)
+    assert distribution.mean == pytest.approx(8.0)
+    assert distribution.probability(8, 8) == pytest.approx(6 / 36)
+
+
+def make_difficulty(seed):
+    return DifficultyConfig(
+        number_of_dice=3, dice_combine_method="avg", dice_expression=None, dice_seed=seed, dice_legend=""
+    )
+
+
+def test_sessions_with_the_same_seed_roll_differently():
+    config = make_difficulty(42)
+    first, second = DiceRoller.from_config(config, "a"), DiceRoller.from_config(config, "b")
+    assert [first.roll_dice() for _ in range(20)] != [second.roll_dice() for _ in range(20)]
+
+
+def test_session_rolls_are_reproducible():
+    config = make_difficulty(42)
+    first, second = DiceRoller.from_config(config, "a"), DiceRoller.from_config(config, "a")
+    assert [first.roll_dice() for _ in range(20)] == [second.roll_dice() for _ in range(20)]
+    other_seed = DiceRoller.from_config(dataclasses.replace(config, dice_seed=43), "a")
+    assert [other_seed.roll_dice() for _ in range(20)] != [
+        DiceRoller.from_config(config, "a").roll_dice() for _ in range(20)
+    ]
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+from ai_rpg.config import AIRPGConfig, HistoryConfig
+from ai_rpg.history import HistoryCompressor
+from ai_rpg.prompts import PromptTemplate
+
+
+class Summarizer:
+    """Summary LLM function that records the events it's asked to fold."""
+
+    def __init__(self):
+        self.calls = []
+
+    def execute_with_llm_response(self, user_message):
+        self.calls.append(user_message)
+        return SimpleNamespace(response=f"Summary {len(self.calls)}")
+
+
+def make_compressor(summarizer, verbatim_turns=2, summary_refresh_turns=2, max_tokens=10_000):
+    return HistoryCompressor(
+        config=HistoryConfig(
+            verbatim_turns=verbatim_turns, summary_refresh_turns=summary_refresh_turns, max_tokens=max_tokens
+        ),
+        summary_llm_func=summarizer,
+        summary_user_prompt_template=PromptTemplate("{summary}\n---\n{events}"),
+        on_llm_response=lambda llm_response: None,
+    )
+
+
+def make_history(turns):
+    return [
+        message
+        for i in range(turns)
+        for message in [{"role": "user", "content": f"Action {i}"}, {"role": "assistant", "content": f"Response {i}"}]
+    ]
+
+
+def test_long_history_folds_into_a_summary_and_the_latest_turns():
+    summarizer = Summarizer()
+    compressor = make_compressor(summarizer)
+
+    messages = compressor.to_messages(make_history(5))
+
+    assert compressor.summary == "Summary 1"
+    assert compressor.summarized_messages == 6  # the 3 turns before the 2 verbatim ones
+    assert "User: Action 2" in summarizer.calls[0] and "Action 3" not in summarizer.calls[0]
+    assert messages[0].content == f"{HistoryCompressor.SUMMARY_HEADER}\n\nSummary 1"
+    assert [m.content for m in messages[1:]] == ["Action 3", "Response 3", "Action 4", "Response 4"]
+
+
+def test_summary_is_only_refreshed_once_enough_turns_accumulated():
+    summarizer = Summarizer()
+    compressor = make_compressor(summarizer)
+    compressor.to_messages(make_history(5))
+
+    compressor.to_messages(make_history(6))
+    assert len(summarizer.calls) == 1 and compressor.summarized_messages == 6
+
+    compressor.to_messages(make_history(7))
+    assert len(summarizer.calls) == 2 and compressor.summarized_messages == 10
+    assert summarizer.calls[1].startswith("Summary 1\n---\nUser: Action 3")
+
+
+def test_edited_history_resets_the_summary():
+    compressor = make_compressor(Summarizer())
+    compressor.to_messages(make_history(5))
+
+    messages = compressor.to_messages(make_history(2))
+
+    assert compressor.summary == "" and compressor.summarized_messages == 0
+    assert len(messages) == 4
+
+
+def test_shorten_keeps_the_summary_and_the_latest_turns():
+    compressor = make_compressor(Summarizer(), verbatim_turns=3)
+    messages = compressor.to_messages(make_history(6))
+
+    shortened = compressor.shorten(messages, turns=1)
+
+    assert shortened[0] is messages[0]
+    assert [m.content for m in shortened[1:]] == ["Action 5", "Response 5"]
+    assert compressor.shorten(messages, turns=10) == messages
+
+
+def test_session_counts_the_turns_covered_by_the_summary_without_commands(make_game):
+    config = AIRPGConfig.load()
+    config.cache.enabled = False
+    config.history.verbatim_turns = 2
+    config.history.summary_refresh_turns = 1
+    session = make_game(config).sessions.get("player")
+
+    session.play("/inventory")
+    for i in range(5):
+        session.play(f"Look around the room number {i}")
+
+    # the last turn was prompted with the intro, the command and 4 turns, the 2 latest turns verbatim
+    assert session.history.summarized_messages == 1 + 2 * 3
+    assert session.summarized_turns == 2
@@ -0,0 +1,56 @@
+import pytest
+
+from ai_rpg.inventory import Inventory, InventoryError, item_key
+from ai_rpg.response import InventoryChange
+
+
+def change(name: str, amount: int) -> InventoryChange:
+    return InventoryChange(name=name, amount=amount)
+
+
+def test_item_key_folds_case_accents_whitespace_and_plurals():
+    assert item_key("  Healing   Potions ") == item_key("healing potion")
+    assert item_key("Torches") == item_key("Torch")
+    assert item_key("Keys to Room 13") == item_key("Key to Room 13")
+    assert item_key("Épée") == item_key("epee")
+    assert item_key("Glass") == "glass"
+
+
+def test_plural_changes_apply_to_the_existing_item():
+    inventory = Inventory({"Torch": 2})
+    assert inventory.update([change("Torches", 1)]) == [change("Torch", 1)]
+    assert inventory.items == {"Torch": 3}
+
+
+def test_additions_never_match_a_similar_item():
+    inventory = Inventory({"Key to Room 12": 1, "Iron Keg": 1})
+    inventory.update([change("Key to Room 13", 1), change("Iron Key", 1)])
+    assert inventory.items == {"Key to Room 12": 1, "Iron Keg": 1, "Key to Room 13": 1, "Iron Key": 1}
+
+
+def test_removals_match_misspellings_of_long_words():
+    inventory = Inventory({"Healing Potion": 2})
+    assert inventory.update([change("Healing Potoin", -1)]) == [change("Healing Potion", -1)]
+    assert inventory.items == {"Healing Potion": 1}
+
+
+def test_removals_need_numbers_and_short_words_spelled_right():
+    inventory = Inventory({"Key to Room 12": 1, "Iron Keg": 1})
+    assert inventory.resolve("Key to Room 13", fuzzy=True) is None
+    assert inventory.resolve("Iron Key", fuzzy=True) is None
+    with pytest.raises(InventoryError):
+        inventory.update([change("Iron Key", -1)])
+
+
+def test_batches_are_applied_atomically():
+    inventory = Inventory({"Gold Coin": 5})
+    with pytest.raises(InventoryError):
+        inventory.update([change("Gold Coins", -3), change("Rope", 1), change("gold coin", -3)])
+    assert inventory.items == {"Gold Coin": 5}
+
+
+def test_aliases_resolve_to_the_displayed_names():
+    inventory = Inventory({"Espada": 1}, aliases={"Sword": "Espada"})
+    assert inventory.resolve("swords") == "Espada"
+    assert inventory.update([change("Shield", 1), change("Sword", -1)]) == [change("Shield", 1), change("Espada", -1)]
+    assert inventory.items == {"Shield": 1}
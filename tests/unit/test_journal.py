@@ -0,0 +1,66 @@
+import pytest
+
+from ai_rpg import utils
+from ai_rpg.config import SavesConfig
+from ai_rpg.journal import SessionJournal, compact_records, export_game_state, load_resumed_state, read_journal
+from ai_rpg.response import InventoryChange
+
+HEADER = {"world_description": "A cave.", "story": "Find the exit.", "starting_inventory": {"torch": 1}}
+
+
+@pytest.fixture
+def journal(tmp_path) -> SessionJournal:
+    config = SavesConfig(autosave=True, fsync_every=10, snapshot_every=50)
+    return SessionJournal.create("player", HEADER, config, saves_path=str(tmp_path))
+
+
+def play(journal: SessionJournal, turns: int, total_cost: float) -> float:
+    for _ in range(turns):
+        total_cost += 0.01
+        journal.append_turn("Look around", 10, "You see a cave.", [InventoryChange(name="torch", amount=1)], total_cost)
+    return total_cost
+
+
+def test_compact_records_keep_only_the_latest_snapshot_in_place():
+    records = [
+        {"type": "header"},
+        {"type": "turn", "action": "a"},
+        {"type": "snapshot", "turn": 1},
+        {"type": "turn", "action": "b"},
+        {"type": "snapshot", "turn": 2},
+        {"type": "turn", "action": "c"},
+    ]
+
+    assert compact_records(records) == [records[0], records[1], records[3], records[4], records[5]]
+    assert compact_records(records[:2]) == records[:2]
+
+
+def test_compact_rewrites_the_journal_and_keeps_appending_to_it(journal):
+    total_cost = play(journal, 2, 0.0)
+    journal.append_snapshot({"torch": 3}, total_cost, "", 0)
+    total_cost = play(journal, 2, total_cost)
+    journal.append_snapshot({"torch": 5}, total_cost, "", 0)
+
+    journal.compact()
+    total_cost = play(journal, 1, total_cost)
+    journal.close()
+
+    records = read_journal(journal.path)
+    assert [record["type"] for record in records] == ["header"] + ["turn"] * 4 + ["snapshot", "turn"]
+    assert records[5]["inventory"] == {"torch": 5}
+    assert load_resumed_state(journal.path).inventory == {"torch": 6}
+
+
+def test_export_counts_the_cost_of_turns_after_the_latest_snapshot(journal, tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "GENERATION_PATH", str(tmp_path))
+    total_cost = play(journal, 2, 0.0)
+    journal.append_snapshot({"torch": 3}, total_cost, "", 0)
+    total_cost = play(journal, 3, total_cost)
+    journal.save()
+
+    game_state = utils.read_generation(export_game_state(journal.path))
+
+    assert game_state["total_cost"] == pytest.approx(total_cost) == pytest.approx(0.05)
+    assert len(game_state["history"]) == 10
+    assert game_state["starting_inventory"] == {"torch": 1}
+    assert load_resumed_state(journal.path).total_cost == pytest.approx(total_cost)
@@ -0,0 +1,35 @@
+import dataclasses
+
+import pytest
+
+from ai_rpg import utils
+from ai_rpg.config import AIRPGConfig
+
+
+@pytest.fixture
+def logging_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "LOGS_PATH", str(tmp_path))
+    yield dataclasses.replace(AIRPGConfig.load().llm_logging, enabled=True)
+    utils.configure_llm_logging(dataclasses.replace(AIRPGConfig.load().llm_logging, enabled=False))
+
+
+def test_log_writer_follows_the_configured_game(logging_config):
+    writer = utils.configure_llm_logging(logging_config)
+
+    assert writer is not None and utils.get_llm_log_writer() is writer
+    assert utils.configure_llm_logging(dataclasses.replace(logging_config)) is writer
+    resized = utils.configure_llm_logging(dataclasses.replace(logging_config, queue_size=10))
+    assert resized is not writer and utils.get_llm_log_writer() is resized
+    assert utils.configure_llm_logging(dataclasses.replace(logging_config, enabled=False)) is None
+    assert utils.get_llm_log_writer() is None
+
+
+def test_game_logs_with_its_own_config(make_game, logging_config):
+    config = AIRPGConfig.load()
+    config.cache.enabled = False
+    config.llm_logging = logging_config
+
+    game = make_game(config)
+
+    assert game.llm_log_writer is not None and game.llm_log_writer.config == logging_config
+    assert utils.get_llm_log_writer() is game.llm_log_writer
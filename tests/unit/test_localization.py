@@ -0,0 +1,81 @@
+import pytest
+
+from ai_rpg import ai_rpg
+from ai_rpg.config import AIRPGConfig
+from ai_rpg.generators import localization
+from ai_rpg.generators.localization import localize_setup
+from ai_rpg.journal import read_header
+
+INVENTORY = {"Rope": 1, "Torch": 2}
+
+
+@pytest.fixture
+def localizations_path(tmp_path, monkeypatch, stand_in_llm_config):
+    monkeypatch.setattr(localization, "GENERATION_PATH", str(tmp_path))
+    return tmp_path
+
+
+def make_config(language=None, localize=True) -> AIRPGConfig:
+    config = AIRPGConfig.load()
+    config.cache.enabled = False
+    config.language = language
+    config.localize = localize
+    return config
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("the setup was translated")
+
+
+@pytest.mark.parametrize("language, localize", [(None, True), ("French", False)])
+def test_setup_is_not_translated_without_localization(make_game, monkeypatch, language, localize):
+    monkeypatch.setattr(ai_rpg, "localize_setup", fail)
+
+    game = make_game(make_config(language, localize))
+
+    assert not game.localizes
+    assert game.item_names == {}
+
+
+def test_setup_is_translated_once_per_language(localizations_path, monkeypatch):
+    localized = localize_setup("A cave.", "Find the exit.", INVENTORY, "French", source="story.md")
+
+    assert localized.item_names == {"Rope": "Rope (stand-in)", "Torch": "Torch (stand-in)"}
+    assert localized.starting_inventory == {"Rope (stand-in)": 1, "Torch (stand-in)": 2}
+    assert localized.world_description and localized.story
+    assert (localizations_path / "story.french.yaml").exists()
+
+    monkeypatch.setattr(localization, "localize_item_names", fail)
+    monkeypatch.setattr(localization, "localize_text", fail)
+    assert localize_setup("A cave.", "Find the exit.", INVENTORY, "French", source="story.md") == localized
+
+
+def test_edited_setup_keeps_the_translations_of_its_items(localizations_path, monkeypatch):
+    localize_setup("A cave.", "Find the exit.", INVENTORY, "French", source="story.md")
+    translated = []
+
+    def localize_item_names(names, language):
+        translated.extend(names)
+        return {name: f"{name} ({language})" for name in names}
+
+    monkeypatch.setattr(localization, "localize_item_names", localize_item_names)
+    localized = localize_setup("A dark cave.", "Find the exit.", {**INVENTORY, "Map": 1}, "French", source="story.md")
+
+    assert translated == ["Map"]
+    assert localized.item_names == {"Rope": "Rope (stand-in)", "Torch": "Torch (stand-in)", "Map": "Map (French)"}
+
+
+def test_translated_setup_is_journaled_and_resumed(make_game, localizations_path):
+    game = make_game(make_config("French"))
+    session = game.sessions.get("player")
+    session.play("Look around")
+    session.save_game_state()
+
+    header = read_header(session.journal.path)
+    assert game.item_names and set(game.item_names.values()) == set(game.starting_inventory)
+    assert header["starting_inventory"] == game.starting_inventory
+    assert header["world_description"] == game.world_description
+
+    resumed = make_game(make_config("French"), resume_from=session.journal.filename).sessions.get("player")
+    assert resumed.inventory.items == session.inventory.items
+    assert resumed.game.starting_inventory == game.starting_inventory
@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_rpg.generators import pool
+from ai_rpg.generators.pool import GameBundle, save_bundle, take_bundle
+
+
+@pytest.fixture
+def pool_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(pool, "POOL_PATH", str(tmp_path))
+    monkeypatch.setattr(pool, "USED_POOL_PATH", str(tmp_path / "used"))
+    return tmp_path
+
+
+def make_bundle(story: str, language=None) -> GameBundle:
+    return GameBundle(
+        world_description="A cave.",
+        story=story,
+        starting_inventory={"Torch": 1},
+        starting_message="You wake up.",
+        language=language,
+    )
+
+
+def test_taken_bundle_is_moved_out_of_the_pool(pool_path):
+    filename = save_bundle(make_bundle("Find the exit."))
+
+    assert take_bundle(None) == make_bundle("Find the exit.")
+    assert not (pool_path / filename).exists()
+    assert (pool_path / "used" / filename).exists()
+
+
+def test_bundles_are_only_taken_for_their_language(pool_path):
+    save_bundle(make_bundle("Trouvez la sortie.", language="French"))
+
+    assert take_bundle(None) is None
+    assert take_bundle("French") == make_bundle("Trouvez la sortie.", language="French")
+
+
+def test_empty_pool_has_no_bundle(pool_path):
+    assert take_bundle(None) is None
+    assert take_bundle("French") is None
+
+
+def test_concurrent_games_never_take_the_same_bundle(pool_path):
+    for i in range(4):
+        save_bundle(make_bundle(f"Story {i}"))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        taken = list(executor.map(take_bundle, [None] * 8))
+
+    stories = [bundle.story for bundle in taken if bundle is not None]
+    assert sorted(stories) == [f"Story {i}" for i in range(4)]
+    assert taken.count(None) == 4
+    assert len(os.listdir(pool_path / "used")) == 4
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+
+from ai_rpg.prompts import PromptRegistry, PromptTemplate
+
+PROMPT = """kind: LLMPrompt
+version: 0.1
+metadata:
+  name: Greeting
+spec:
+  system:
+    - model: default
+      template: |
+        {system}
+  user:
+    - model: default
+      template: |
+        Hello {name}
+"""
+
+
+def write_prompt(path, system: str, text: str = PROMPT) -> None:
+    previous = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    path.write_text(text.replace("{system}", system), encoding="utf-8")
+    # a distinct modification time even on file systems with a coarse clock
+    os.utime(path, ns=(previous + 10**9, previous + 10**9))
+
+
+@pytest.fixture
+def prompts_path(tmp_path):
+    write_prompt(tmp_path / "greeting.yaml", "Be kind.")
+    return tmp_path
+
+
+def system_prompt(registry: PromptRegistry) -> str:
+    return registry.prompt("greeting.yaml").system.format().strip()
+
+
+def test_prompt_templates_only_take_named_fields():
+    assert PromptTemplate("{a}, {b!r:>5}").format(a=1, b="x") == "1,   'x'"
+    with pytest.raises(ValueError):
+        PromptTemplate("{0}")
+
+
+def test_edited_prompt_is_swapped_in(prompts_path):
+    registry = PromptRegistry(str(prompts_path))
+    digest = registry.digests()["greeting.yaml"]
+
+    assert registry.reload_changed() == []
+    write_prompt(prompts_path / "greeting.yaml", "Be brief.")
+
+    assert registry.reload_changed() == [str(prompts_path / "greeting.yaml")]
+    assert system_prompt(registry) == "Be brief."
+    assert registry.prompt("greeting.yaml").user_template().format(name="Ada").strip() == "Hello Ada"
+    assert registry.digests()["greeting.yaml"] != digest
+
+
+def test_invalid_prompt_keeps_the_last_good_version(prompts_path):
+    registry = PromptRegistry(str(prompts_path))
+
+    write_prompt(prompts_path / "greeting.yaml", "", text="kind: LLMPrompt\nspec: [unclosed")
+    assert registry.reload_changed() == []
+    assert system_prompt(registry) == "Be kind."
+
+    write_prompt(prompts_path / "greeting.yaml", "Be brief.")
+    assert registry.reload_changed() == [str(prompts_path / "greeting.yaml")]
+    assert system_prompt(registry) == "Be brief."
+
+
+def test_new_prompt_files_are_picked_up(prompts_path):
+    registry = PromptRegistry(str(prompts_path))
+    with pytest.raises(ValueError):
+        registry.prompt("farewell.yaml")
+
+    write_prompt(prompts_path / "farewell.yaml", "Say goodbye.")
+    registry.reload_changed()
+
+    assert registry.prompt("farewell.yaml").system.format().strip() == "Say goodbye."
+
+
+def test_watcher_reloads_edited_prompts(prompts_path):
+    registry = PromptRegistry(str(prompts_path))
+    registry.watch(0.01)
+
+    write_prompt(prompts_path / "greeting.yaml", "Be brief.")
+
+    deadline = time.monotonic() + 5
+    while system_prompt(registry) != "Be brief.":
+        assert time.monotonic() < deadline, "the edited prompt was not reloaded"
+        time.sleep(0.01)
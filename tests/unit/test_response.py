@@ -0,0 +1,83 @@
+import pytest
+from council.llm import LLMParsingException
+
+from ai_rpg.response import AIRPGResponseStreamParser
+
+RESPONSE = """Here's the next scene.
+```yaml
+reasoning: The roll is high, so the search succeeds.
+inventory_changes:
+  - name: Torch
+    amount: -1
+  - name: Silver key
+    amount: 1
+message: |
+  You find a silver key under the loose stone.
+
+  Your torch burns out.
+```
+"""
+
+
+def feed_in_chunks(parser: AIRPGResponseStreamParser, text: str, size: int = 7):
+    for start in range(0, len(text), size):
+        parser.feed(text[start : start + size])
+        yield parser
+
+
+def test_message_grows_without_reasoning_and_changes_arrive_before_it():
+    parser = AIRPGResponseStreamParser()
+    messages = []
+    for state in feed_in_chunks(parser, RESPONSE):
+        if state.message:
+            assert state.inventory_changes is not None
+        assert "roll" not in state.message
+        messages.append(state.message)
+
+    assert all(later.startswith(earlier.rstrip()) for earlier, later in zip(messages, messages[1:]))
+    assert parser.message == "You find a silver key under the loose stone.\n\nYour torch burns out."
+    assert [(change.name, change.amount) for change in parser.inventory_changes] == [
+        ("Torch", -1),
+        ("Silver key", 1),
+    ]
+
+    response = parser.finish()
+    assert response.message.strip() == parser.message
+    assert [change.name for change in response.inventory_changes] == ["Torch", "Silver key"]
+
+
+def test_inline_message_wrapped_over_lines():
+    parser = AIRPGResponseStreamParser()
+    parser.feed('```yaml\nreasoning: r\ninventory_changes: []\nmessage: "You step\n  into the hall."\n```\n')
+
+    assert parser.inventory_changes == []
+    assert parser.message == "You step into the hall."
+    assert parser.finish().message == "You step into the hall."
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "No yaml block at all",
+        "```yaml\nreasoning: r\nmessage: Missing inventory changes\n```\n",
+        "```yaml\nreasoning: r\ninventory_changes:\n  - name: Torch\n    amount: many\nmessage: m\n```\n",
+    ],
+)
+def test_invalid_responses_fail_when_finished(text):
+    parser = AIRPGResponseStreamParser()
+    parser.feed(text)
+
+    with pytest.raises(LLMParsingException):
+        parser.finish()
+
+
+def test_streamed_turn_is_saved_like_a_played_one(make_game):
+    game = make_game()
+    session = game.sessions.get("player")
+
+    updates = list(session.game_loop_stream("Look around", []))
+
+    assert updates and all(later.startswith(earlier[:20]) for earlier, later in zip(updates, updates[1:]))
+    assert session.turns == 1
+    with open(session.journal.path, "r", encoding="utf-8") as f:
+        assert '"action":"Look around"' in f.read()
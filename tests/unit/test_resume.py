@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_rpg.config import AIRPGConfig
+from ai_rpg.memory import memory_path
+
+
+def make_config(memory: bool = True) -> AIRPGConfig:
+    config = AIRPGConfig.load()
+    config.cache.enabled = False
+    config.memory.enabled = memory
+    config.saves.snapshot_every = 3
+    config.history.verbatim_turns = 2
+    return config
+
+
+def play_saved_game(make_game, turns: int = 7, memory: bool = True):
+    game = make_game(make_config(memory))
+    session = game.sessions.get("player")
+    for i in range(turns):
+        session.play(f"Look around the room number {i}")
+    session.save_game_state()
+    return session
+
+
+def test_resumed_game_continues_from_the_saved_state(make_game):
+    saved = play_saved_game(make_game)
+
+    game = make_game(make_config(), resume_from=saved.journal.path)
+    session = game.sessions.get("player")
+
+    assert session.resumed
+    assert session.turns == saved.turns == 7
+    assert session.inventory.items == saved.inventory.items
+    assert session.total_cost == saved.total_cost
+    assert session.history.summary == saved.history.summary
+    assert session.memory is not None and session.memory.turns == 7
+    assert session.transcript[-1] == saved.transcript[-1]
+
+    session.play("Walk towards the exit")
+    assert session.turns == 8
+    assert session.memory.turns == 8
+
+
+def test_resumes_a_filename_from_the_games_saves_directory(make_game):
+    saved = play_saved_game(make_game, turns=2)
+
+    game = make_game(make_config(), resume_from=saved.journal.filename)
+
+    assert os.path.dirname(saved.journal.path) == game.saves_path
+    assert game.sessions.get("player").turns == 2
+
+
+def test_memory_is_rebuilt_from_the_journal_tail(make_game):
+    saved = play_saved_game(make_game, memory=False)
+    assert not os.path.exists(memory_path(saved.journal.path))
+
+    game = make_game(make_config(memory=True), resume_from=saved.journal.path)
+    memory = game.sessions.get("player").memory
+
+    assert memory is not None and memory.turns == 7
+    assert memory.search("room number 3", top_k=1)[0].turn is not None
+
+
+def test_only_one_session_continues_the_resumed_game(make_game):
+    saved = play_saved_game(make_game, turns=2)
+    game = make_game(make_config(), resume_from=saved.journal.path)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(game.sessions.get, [f"player-{i}" for i in range(8)]))
+
+    resumed = [session for session in sessions if session.resumed]
+    assert len(resumed) == 1
+    other = next(session for session in sessions if not session.resumed)
+    assert game.greeting_messages(resumed[0].session_id)[-1] == saved.transcript[-1]
+    assert game.greeting_messages(other.session_id) == [{"role": "assistant", "content": game.starting_message}]
+    shown, _ = game.load_earlier_turns(game.resumed_state.tail_offset, "", other.session_id)
+    assert "Look around" not in shown
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_rpg.config import SessionConfig
+from ai_rpg.session import SessionManager
+
+
+def make_manager(factory, max_sessions=10, evicted=None):
+    config = SessionConfig(idle_ttl_minutes=60, max_sessions=max_sessions)
+    return SessionManager(factory, config, on_evict=evicted.append if evicted is not None else None)
+
+
+def test_sessions_are_built_outside_the_lock():
+    building = threading.Event()
+    release = threading.Event()
+
+    def factory(session_id):
+        if session_id == "slow":
+            building.set()
+            release.wait(timeout=5)
+        return f"session {session_id}"
+
+    manager = make_manager(factory)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        slow = executor.submit(manager.get, "slow")
+        assert building.wait(timeout=5)
+        waiting = executor.submit(manager.get, "slow")
+
+        assert manager.get("fast") == "session fast"
+        assert not slow.done() and not waiting.done()
+        assert manager.sessions() == {"fast": "session fast"}
+        release.set()
+        assert slow.result(timeout=5) == waiting.result(timeout=5) == "session slow"
+
+
+def test_concurrent_gets_build_a_session_once():
+    calls = []
+    manager = make_manager(lambda session_id: calls.append(session_id) or object())
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(lambda _: manager.get("player"), range(32)))
+
+    assert calls == ["player"]
+    assert all(session is sessions[0] for session in sessions)
+
+
+def test_find_does_not_create_sessions():
+    manager = make_manager(lambda session_id: session_id.upper())
+
+    assert manager.find("a") is None
+    assert len(manager) == 0
+    manager.get("a")
+    assert manager.find("a") == "A"
+
+
+def test_evicted_sessions_are_passed_to_on_evict():
+    evicted = []
+    manager = make_manager(lambda session_id: f"session {session_id}", max_sessions=2, evicted=evicted)
+
+    for session_id in ["a", "b", "c"]:
+        manager.get(session_id)
+    manager.remove("b")
+
+    assert evicted == ["session a", "session b"]
+    assert manager.sessions() == {"c": "session c"}
+
+
+def test_failed_build_is_retried_on_the_next_get():
+    attempts = []
+
+    def factory(session_id):
+        attempts.append(session_id)
+        if len(attempts) == 1:
+            raise RuntimeError("no game")
+        return f"session {session_id}"
+
+    manager = make_manager(factory)
+    with pytest.raises(RuntimeError):
+        manager.get("player")
+
+    assert "player" not in manager
+    assert manager.get("player") == "session player"
+
+
+def test_dropped_game_sessions_write_their_pending_turns(make_game):
+    game = make_game()
+    game.config.saves.autosave = False
+    session = game.sessions.get("player")
+    session.play("Look around")
+    with open(session.journal.path, "r", encoding="utf-8") as f:
+        assert '"type":"turn"' not in f.read()
+
+    game.sessions.remove("player")
+
+    with open(session.journal.path, "r", encoding="utf-8") as f:
+        assert '"type":"turn"' in f.read()
+
+
+def test_turns_of_a_session_wait_for_its_streamed_turn(make_game):
+    session = make_game().sessions.get("player")
+    stream = session.game_loop_stream("Look around", [])
+    next(stream)  # the streamed turn holds the session from its first update
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        turn = executor.submit(session.game_loop, "Open the door", [])
+        time.sleep(0.1)
+        assert not turn.done()
+        stream.close()
+        assert turn.result(timeout=5)
+
+    assert session.turns == 1
@@ -0,0 +1,80 @@
+import pytest
+
+from ai_rpg import simulation
+from ai_rpg.simulation import SimulationReport, TurnRecord, load_report, run_simulation
+
+
+def make_report(label="baseline", **kwargs):
+    turns = [
+        TurnRecord(game=0, turn=1, action="a", latency=1.0, prompt_tokens=100, cost=0.01, parse_failures=1),
+        TurnRecord(game=0, turn=2, action="b", latency=3.0, prompt_tokens=300, cost=0.03, inventory_anomalies=1),
+        TurnRecord(game=1, turn=1, action="c", latency=2.0, prompt_tokens=200, cost=0.02),
+        TurnRecord(game=1, turn=2, action="d", latency=9.0, cost=0.005, error="TimeoutError: "),
+    ]
+    values = {
+        "label": label,
+        "model": "stand-in",
+        "player": "scripted",
+        "games": 2,
+        "turns_per_game": 2,
+        "seed": 0,
+        "wall_time": 5.0,
+        "prompts": {"ai-game-master.yaml": "abc"},
+        "turns": turns,
+        **kwargs,
+    }
+    return SimulationReport(**values)
+
+
+def test_metrics_aggregate_completed_turns():
+    metrics = make_report().metrics()
+
+    assert metrics["completed_turns"] == 3
+    assert metrics["failed_turns"] == 1
+    assert metrics["prompt_tokens"] == 200
+    assert metrics["last_turn_prompt_tokens"] == 300
+    assert metrics["latency_p50"] == 2.0
+    assert metrics["parse_failure_rate"] == pytest.approx(1 / 3)
+    assert metrics["inventory_anomaly_rate"] == pytest.approx(1 / 3)
+    assert metrics["cost_per_turn"] == pytest.approx(0.02)
+    assert metrics["total_cost"] == pytest.approx(0.065)  # failed turns are billed too
+
+
+def test_comparison_reports_changes_and_changed_prompts():
+    baseline = make_report()
+    changed = make_report(label="shorter", prompts={"ai-game-master.yaml": "def"}, seed=1)
+    changed.turns[0].prompt_tokens = 400
+
+    text = changed.format_comparison(baseline)
+
+    assert "prompt_tokens" in text and "+50%" in text
+    assert "Changed prompts: ai-game-master.yaml" in text
+    assert "Not comparable turn for turn: seed 0 -> 1" in text
+
+
+def test_reports_are_saved_and_loaded_by_label(tmp_path, monkeypatch):
+    monkeypatch.setattr(simulation, "SIMULATIONS_PATH", str(tmp_path))
+    report = make_report()
+
+    report.save()
+
+    assert load_report("baseline") == report
+
+
+def test_simulation_plays_every_game_in_its_own_session(make_game):
+    game = make_game()
+
+    report = run_simulation(game, games=2, turns=3, seed=7, label="parallel")
+
+    assert len(report.completed_turns) == 6
+    assert report.model == "stand-in"
+    assert {turn.game for turn in report.turns} == {0, 1}
+    assert all(turn.response_words > 0 and turn.budget_tokens > 0 for turn in report.turns)
+    assert [game.sessions.find(f"simulation-{i}").turns for i in range(2)] == [3, 3]
+
+
+def test_simulations_with_the_same_seed_play_the_same_game(make_game):
+    first = run_simulation(make_game(), games=1, turns=4, seed=7, label="first")
+    second = run_simulation(make_game(), games=1, turns=4, seed=7, label="second")
+
+    assert [(t.action, t.roll) for t in first.turns] == [(t.action, t.roll) for t in second.turns]
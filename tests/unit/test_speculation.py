@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from ai_rpg.config import AIRPGConfig
+from ai_rpg.speculation import actions_match, normalize_action, parse_suggestions
+
+
+@pytest.mark.parametrize(
+    "action, other, threshold, expected",
+    [
+        ("I look around.", "Look around", 1.0, True),
+        ("Attack the goblin", "attack the goblins!", 0.9, True),
+        ("Attack the goblin", "attack the goblins!", 1.0, False),
+        ("Open the door", "Close the door", 0.9, False),
+    ],
+)
+def test_actions_match_once_normalized(action, other, threshold, expected):
+    assert actions_match(action, other, threshold) is expected
+
+
+def test_normalize_action_drops_filler_words():
+    assert normalize_action("Let me try to open the chest, please") == "open chest"
+
+
+def test_parse_suggestions_strips_list_markers():
+    text = '1. Open the chest\n- "Talk to the guard"\n\n* Run away\n2) Hide'
+    assert parse_suggestions(text, 3) == ["Open the chest", "Talk to the guard", "Run away"]
+
+
+def make_config() -> AIRPGConfig:
+    config = AIRPGConfig.load()
+    config.cache.enabled = False
+    config.speculation.enabled = True
+    config.speculation.actions = ["Look around"]
+    config.speculation.suggested_actions = 0
+    return config
+
+
+def wait_for_speculated_turns(session, count: int = 1) -> None:
+    deadline = time.monotonic() + 5
+    while session._speculation is None or len(session._speculation.turns) < count:
+        assert time.monotonic() < deadline, "no turn was speculated"
+        time.sleep(0.01)
+
+
+def test_matching_action_takes_the_speculated_turn(make_game):
+    session = make_game(make_config()).sessions.get("player")
+    session.play("Walk towards the exit")
+    wait_for_speculated_turns(session)
+    speculated = session._speculation.turns[0]
+    roll = session._speculation.roll
+
+    result = session.play("I look around.")
+
+    assert session.speculation_stats.hits == 1 and session.speculation_stats.misses == 0
+    assert result.roll == roll
+    assert result.message == speculated.future.result().response.message
+    assert session.turns == 2
+
+
+def test_other_action_discards_the_speculated_turn_but_keeps_the_roll(make_game):
+    session = make_game(make_config()).sessions.get("player")
+    session.play("Walk towards the exit")
+    wait_for_speculated_turns(session)
+    roll = session._speculation.roll
+
+    result = session.play("Attack the closest enemy")
+
+    assert session.speculation_stats.hits == 0 and session.speculation_stats.misses == 1
+    assert result.roll == roll  # pre-rolled, so speculating doesn't change the player's luck
+    assert session.turns == 2
+
+
+def test_speculation_stops_once_the_session_budget_is_spent(make_game):
+    config = make_config()
+    config.speculation.max_cost_per_session = 0.0
+    session = make_game(config).sessions.get("player")
+
+    session.play("Walk towards the exit")
+
+    assert session._speculation is None
+
+
+def test_commands_keep_the_speculated_turn_for_the_next_action(make_game):
+    session = make_game(make_config()).sessions.get("player")
+    session.play("Walk towards the exit")
+    wait_for_speculated_turns(session)
+    roll = session._speculation.roll
+
+    session.play("/inventory")
+    session.play("/odds")
+    assert session._speculation is not None
+    assert session.speculation_stats.hits == 0 and session.speculation_stats.misses == 0
+
+    result = session.play("Look around")
+
+    assert session.speculation_stats.hits == 1 and session.speculation_stats.misses == 0
+    assert result.roll == roll
+    assert session.turns == 2
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from council.contexts import Consumption
+
+from ai_rpg import telemetry
+from ai_rpg.benchmark import BenchmarkReport
+from ai_rpg.config import TelemetryConfig
+from ai_rpg.telemetry import Histogram, Telemetry, TurnTrace
+
+
+def test_histogram_counts_values_up_to_each_bound():
+    histogram = Histogram(buckets=[0.1, 1.0])
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.mean == pytest.approx(2.65 / 4)
+    assert histogram.format("latency", 'span="llm"') == [
+        'latency_bucket{span="llm",le="0.1"} 2',
+        'latency_bucket{span="llm",le="1.0"} 3',
+        'latency_bucket{span="llm",le="+Inf"} 4',
+        'latency_sum{span="llm"} 2.65',
+        'latency_count{span="llm"} 4',
+    ]
+    assert Histogram().mean == 0.0
+
+
+def test_trace_spans_take_tokens_and_retries_from_consumptions():
+    trace = TurnTrace("player")
+    span = trace.add_span(
+        "llm",
+        1.5,
+        [
+            Consumption.call(2, "model"),
+            Consumption.token(100, "model:prompt_tokens"),
+            Consumption.token(20, "model:completion_tokens"),
+        ],
+    )
+    with trace.span("inventory"):
+        pass
+
+    assert (span.prompt_tokens, span.completion_tokens, span.retries) == (100, 20, 1)
+    assert [span.name for span in trace.spans] == ["llm", "inventory"]
+    assert trace.duration >= 1.5
+
+
+def test_telemetry_exposes_turns_in_the_prometheus_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "LOGS_PATH", str(tmp_path))
+    metrics = Telemetry(
+        TelemetryConfig(enabled=True, metrics_port=None, trace_file="traces.jsonl"), {"sessions": lambda: 3}
+    )
+    for duration in [0.2, 0.4]:
+        trace = TurnTrace("player")
+        trace.add_span("llm", duration, [Consumption.token(10, "model:prompt_tokens")])
+        trace.spans[-1].hedges = 1
+        metrics.record(trace)
+
+    text = metrics.format_metrics()
+
+    assert "# TYPE ai_rpg_turn_seconds histogram" in text
+    assert 'ai_rpg_turn_seconds_bucket{le="0.25"} 1' in text
+    assert 'ai_rpg_turn_seconds_bucket{le="+Inf"} 2' in text
+    assert "ai_rpg_turn_seconds_count{} 2" in text
+    assert 'ai_rpg_turn_span_seconds_count{span="llm"} 2' in text
+    assert 'ai_rpg_llm_tokens_total{kind="prompt"} 20' in text
+    assert "ai_rpg_llm_hedges_total 2" in text
+    assert text.endswith("# TYPE sessions gauge\nsessions 3\n")
+    assert metrics.format_summary() == "- llm: 0.300s mean over 2"
+    traces = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    assert [t["spans"][0]["duration"] for t in traces] == [0.2, 0.4]
+
+
+def test_benchmark_percentiles_of_turn_latencies():
+    def report(latencies):
+        return BenchmarkReport(
+            players=1,
+            turns_per_player=len(latencies),
+            completed_turns=len(latencies),
+            failed_turns=0,
+            wall_time=1.0,
+            latencies=latencies,
+            memory_per_session_kb=0.0,
+        )
+
+    latencies = [float(i) for i in range(1, 102)]
+    assert report(latencies).percentile(50) == 51.0
+    assert report(latencies).percentile(99) == 100.0
+    assert report([0.5]).percentile(99) == 0.5
+    assert report([]).percentile(50) == 0.0
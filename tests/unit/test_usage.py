@@ -0,0 +1,90 @@
+import pytest
+
+from ai_rpg.config import UsageLimitsConfig
+from ai_rpg.usage import TokenBucket, UsageLimiter, format_wait
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(clock, **limits):
+    config = UsageLimitsConfig.from_yaml({"enabled": True, "degrade_below": 0.2, **limits})
+    return UsageLimiter(config, clock=clock)
+
+
+def test_bucket_refills_continuously_up_to_its_capacity():
+    clock = Clock()
+    bucket = TokenBucket(capacity=600, period=60, clock=clock)
+
+    bucket.charge(900)  # charged after the fact, so it can go below zero
+    assert bucket.level == -300
+    assert bucket.seconds_until_available() == 30
+
+    clock.now = 40
+    assert bucket.level == pytest.approx(100)
+    assert bucket.seconds_until_available() == 0
+
+    clock.now = 1000
+    assert bucket.level == 600
+
+
+def test_bucket_allows_bursts_up_to_its_capacity():
+    clock = Clock()
+    bucket = TokenBucket(capacity=100, period=60, clock=clock)
+
+    for _ in range(4):
+        bucket.charge(25)
+
+    assert bucket.level == 0
+
+
+def test_turns_are_degraded_when_a_budget_runs_low_then_refused():
+    clock = Clock()
+    limiter = make_limiter(clock, session_tokens_per_minute=1000)
+    quota = limiter.session_quota()
+
+    assert limiter.admit(quota).full
+    limiter.charge(quota, tokens=850, cost=0.0)
+    assert limiter.admit(quota).degraded
+    limiter.charge(quota, tokens=200, cost=0.0)
+    refused = limiter.admit(quota)
+    assert refused.refusal == "You're acting faster than the game master can keep up. Please wait 3 seconds."
+    assert (limiter.degraded_turns, limiter.refused_turns) == (1, 1)
+
+    clock.now = 30
+    assert limiter.check(quota).full
+
+
+def test_global_budgets_are_shared_by_sessions():
+    clock = Clock()
+    limiter = make_limiter(clock, session_dollars_per_day=1.0, global_dollars_per_day=1.5)
+    first, second = limiter.session_quota(), limiter.session_quota()
+
+    limiter.charge(first, tokens=0, cost=0.9)
+    limiter.charge(second, tokens=0, cost=0.7)
+
+    assert limiter.check(first).refusal == "The game has used up today's budget. Please come back in 1.6 hours."
+    # a session over its own budget is told so first
+    limiter.charge(first, tokens=0, cost=0.2)
+    assert limiter.check(first).refusal.startswith("You've used up today's budget of your game.")
+
+
+def test_unlimited_budgets_always_admit_turns():
+    limiter = make_limiter(Clock())
+    quota = limiter.session_quota()
+    limiter.charge(quota, tokens=10**9, cost=10**6)
+
+    assert limiter.admit(quota).full
+    assert quota.format() == ""
+
+
+@pytest.mark.parametrize(
+    "seconds, expected", [(0.2, "1 seconds"), (45, "45 seconds"), (600, "10 minutes"), (5400, "1.5 hours")]
+)
+def test_format_wait(seconds, expected):
+    assert format_wait(seconds) == expected